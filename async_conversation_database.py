@@ -0,0 +1,146 @@
+import asyncio
+import functools
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from conversation_database import ConversationDatabase, DATABASE_PATH, SQLITE_POOL_SIZE
+
+
+class AsyncConversationDatabase:
+    """asyncio-facing wrapper around ConversationDatabase.
+
+    Writes run on one dedicated writer thread, which matches SQLite's single
+    writer and keeps them in submission order. Reads run on a small thread pool
+    and, under WAL, proceed concurrently with the writer. The event loop never
+    blocks on sqlite3.
+    """
+
+    def __init__(self, db_path: str = DATABASE_PATH, readers: int = None, db: ConversationDatabase = None):
+        self.db = db or ConversationDatabase(db_path)
+        # Leave one pooled connection for the writer
+        readers = readers or max(1, SQLITE_POOL_SIZE - 1)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="conversation-db-reader")
+
+    async def _run(self, executor, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(method, *args, **kwargs))
+
+    def _read(self, method, *args, **kwargs):
+        return self._run(self._readers, method, *args, **kwargs)
+
+    def _write(self, method, *args, **kwargs):
+        return self._run(self._writer, method, *args, **kwargs)
+
+    async def close(self):
+        """Finish queued work, then release threads and connections"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._writer.shutdown)
+        await loop.run_in_executor(None, self._readers.shutdown)
+        self.db.close()
+        logging.info("✅ Async conversation database closed")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    # Writes
+
+    async def create_conversation(self, title: str, summary: str = None, tags: List[str] = None) -> int:
+        return await self._write(self.db.create_conversation, title, summary, tags)
+
+    async def add_message(self, conversation_id: int, role: str, content: str,
+                          message_type: str = "text", metadata: Dict = None) -> int:
+        return await self._write(self.db.add_message, conversation_id, role, content, message_type, metadata)
+
+    async def add_messages(self, messages: List[Dict]) -> List[int]:
+        return await self._write(self.db.add_messages, messages)
+
+    async def add_conversation_context(self, conversation_id: int, context_type: str, context_data: Dict) -> int:
+        return await self._write(self.db.add_conversation_context, conversation_id, context_type, context_data)
+
+    async def update_conversation_summary(self, conversation_id: int, summary: str):
+        return await self._write(self.db.update_conversation_summary, conversation_id, summary)
+
+    async def update_conversation_title(self, conversation_id: int, title: str):
+        return await self._write(self.db.update_conversation_title, conversation_id, title)
+
+    async def delete_conversation(self, conversation_id: int):
+        return await self._write(self.db.delete_conversation, conversation_id)
+
+    async def delete_conversations(self, conversation_ids: List[int]) -> int:
+        return await self._write(self.db.delete_conversations, conversation_ids)
+
+    async def purge_conversations(self, conversation_ids: List[int] = None, older_than_days: float = None,
+                                  chunk_size: int = 200, pause_seconds: float = 0.05) -> int:
+        """Await a chunked background purge (it runs on its own thread, not the writer)"""
+        return await asyncio.wrap_future(
+            self.db.purge_conversations(conversation_ids, older_than_days, chunk_size, pause_seconds)
+        )
+
+    async def restore_conversation(self, snapshot: Dict):
+        return await self._write(self.db.restore_conversation, snapshot)
+
+    # Reads
+
+    async def get_conversation(self, conversation_id: int, include_messages: bool = True) -> Optional[Dict]:
+        return await self._read(self.db.get_conversation, conversation_id, include_messages)
+
+    async def get_message_page(self, conversation_id: int, limit: int = 50,
+                               before: Optional[Tuple[str, int]] = None) -> Dict:
+        return await self._read(self.db.get_message_page, conversation_id, limit, before)
+
+    async def iter_messages(self, conversation_id: int, batch_size: int = 500) -> AsyncIterator[Dict]:
+        """Async generator over a conversation's messages, one batch per reader call"""
+        after = None
+        while True:
+            batch = await self._read(
+                lambda cursor: list(itertools.islice(self.db.iter_messages(conversation_id, batch_size, cursor), batch_size)),
+                after
+            )
+            for message in batch:
+                yield message
+            if len(batch) < batch_size:
+                return
+            after = (batch[-1]['timestamp'], batch[-1]['message_id'])
+
+    async def get_all_conversations(self, limit: int = 50) -> List[Dict]:
+        return await self._read(self.db.get_all_conversations, limit)
+
+    async def search_conversations(self, query: str, limit: int = 50) -> List[Dict]:
+        return await self._read(self.db.search_conversations, query, limit)
+
+    async def search_conversations_page(self, query: str, page_size: int = 20,
+                                        cursor: Optional[Tuple[str, int]] = None) -> Dict:
+        return await self._read(self.db.search_conversations_page, query, page_size, cursor)
+
+    async def get_conversation_context(self, conversation_id: int, context_type: str = None) -> List[Dict]:
+        return await self._read(self.db.get_conversation_context, conversation_id, context_type)
+
+    async def get_relevant_context(self, current_query: str, limit: int = 5) -> List[Dict]:
+        return await self._read(self.db.get_relevant_context, current_query, limit)
+
+    async def find_conversations_by_context(self, product_interest: str = None, min_budget: float = None,
+                                            max_budget: float = None, order_related: bool = None,
+                                            limit: int = 50) -> List[Dict]:
+        return await self._read(self.db.find_conversations_by_context, product_interest, min_budget, max_budget,
+                                order_related, limit)
+
+    async def get_recent_context(self, limit: int = 500) -> List[Dict]:
+        return await self._read(self.db.get_recent_context, limit)
+
+    async def get_messages_after(self, message_id: int, limit: int = 1000, role: str = None) -> List[Dict]:
+        return await self._read(self.db.get_messages_after, message_id, limit, role)
+
+    async def get_next_sequence_number(self) -> int:
+        return await self._read(self.db.get_next_sequence_number)
+
+    async def get_conversation_statistics(self) -> Dict:
+        return await self._read(self.db.get_conversation_statistics)
+
+    async def get_hourly_statistics(self, hours: int = 24 * 7) -> List[Dict]:
+        return await self._read(self.db.get_hourly_statistics, hours)
@@ -0,0 +1,187 @@
+import shutil
+import struct
+import subprocess
+from typing import NamedTuple, Union
+
+import numpy as np
+
+WAV_HEADER_SIZE = 44
+# What Whisper works at internally; anything richer is wasted upload
+STT_SAMPLE_RATE = 16000
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def wav_header(data_size: int, sample_rate: int, channels: int = 1, sample_width: int = 2) -> bytes:
+    """Canonical 44-byte PCM WAV header for ``data_size`` bytes of samples"""
+    block_align = channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8,
+        b"data", data_size
+    )
+
+
+def pcm_to_wav(pcm: BytesLike, sample_rate: int, channels: int = 1, sample_width: int = 2) -> bytes:
+    """Wrap raw little-endian PCM in a WAV container"""
+    return wav_header(len(pcm), sample_rate, channels, sample_width) + pcm
+
+
+class PcmBuffer:
+    """Growable PCM buffer that reserves room for the WAV header up front.
+
+    Chunks are appended as they arrive; ``wav()`` fills in the header in place
+    and returns a view over header + samples, so the audio is never copied
+    into a second buffer. Finish writing before calling ``wav()``: a bytearray
+    cannot grow while a view of it is alive.
+    """
+
+    def __init__(self, sample_rate: int, channels: int = 1, sample_width: int = 2):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self._buffer = bytearray(WAV_HEADER_SIZE)
+
+    def write(self, chunk: BytesLike):
+        self._buffer += chunk
+
+    def __len__(self) -> int:
+        return len(self._buffer) - WAV_HEADER_SIZE
+
+    @property
+    def duration(self) -> float:
+        return len(self) / (self.sample_rate * self.channels * self.sample_width)
+
+    def pcm(self) -> memoryview:
+        return memoryview(self._buffer)[WAV_HEADER_SIZE:]
+
+    def wav(self) -> memoryview:
+        self._buffer[:WAV_HEADER_SIZE] = wav_header(len(self), self.sample_rate, self.channels, self.sample_width)
+        return memoryview(self._buffer)
+
+
+class WavAudio(NamedTuple):
+    sample_rate: int
+    channels: int
+    sample_width: int
+    pcm: memoryview
+
+
+def read_wav(data: BytesLike) -> WavAudio:
+    """Parse a PCM WAV held in memory; ``pcm`` is a view into ``data``, not a copy"""
+    view = memoryview(data).cast("B")
+    if len(view) < 12 or view[:4] != b"RIFF" or view[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        (chunk_size,) = struct.unpack_from("<I", view, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", view, body)
+            # 0xFFFE is WAVE_FORMAT_EXTENSIBLE, which browsers and some recorders use for plain PCM
+            if format_tag not in (1, 0xFFFE):
+                raise ValueError(f"Unsupported WAV encoding (format tag {format_tag}); expected PCM")
+            fmt = (sample_rate, channels, bits // 8)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk precedes its fmt chunk")
+            # Streamed recordings may leave the size unset; take the rest of the buffer
+            end = len(view) if chunk_size in (0, 0xFFFFFFFF) else min(body + chunk_size, len(view))
+            return WavAudio(*fmt, view[body:end])
+        offset = body + chunk_size + (chunk_size & 1)
+
+    raise ValueError("WAV file has no data chunk")
+
+
+# Delivery codecs: MIME type, file extension and ffmpeg encoder arguments
+AUDIO_MIME_TYPES = {"wav": "audio/wav", "mp3": "audio/mpeg", "opus": "audio/ogg", "flac": "audio/flac"}
+AUDIO_EXTENSIONS = {"wav": "wav", "mp3": "mp3", "opus": "ogg", "flac": "flac"}
+_FFMPEG_ENCODERS = {
+    "wav": ["-c:a", "pcm_s16le", "-f", "wav"],
+    "mp3": ["-c:a", "libmp3lame", "-f", "mp3"],
+    # "voip" tunes Opus for speech; Ogg is playable by every current browser
+    "opus": ["-c:a", "libopus", "-application", "voip", "-f", "ogg"],
+    # Lossless, roughly half the size of 16 kHz PCM; accepted by Whisper
+    "flac": ["-c:a", "flac", "-f", "flac"],
+}
+
+
+def encode_audio(audio: BytesLike, input_format: str, codec: str, bitrate: str = "64k") -> bytes:
+    """Transcode in-memory audio with ffmpeg over stdin/stdout, without temporary files"""
+    if codec not in _FFMPEG_ENCODERS:
+        raise ValueError(f"Unsupported codec: {codec}. Choose from {', '.join(_FFMPEG_ENCODERS)}")
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg is needed to encode audio; install it (see README) or use the wav codec")
+
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", input_format, "-i", "pipe:0", "-vn"]
+    command += _FFMPEG_ENCODERS[codec]
+    if codec not in ("wav", "flac"):
+        command += ["-b:a", bitrate]
+    command.append("pipe:1")
+    result = subprocess.run(command, input=audio, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to encode {codec}: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def pcm_samples(pcm: BytesLike, channels: int = 1, sample_width: int = 2) -> np.ndarray:
+    """View 16-bit PCM as float32 mono samples (downmixed by averaging channels)"""
+    if sample_width != 2:
+        raise ValueError(f"Only 16-bit PCM is supported, got {sample_width * 8}-bit")
+    samples = np.frombuffer(pcm, dtype="<i2", count=len(pcm) // 2)
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return samples.astype(np.float32, copy=False)
+
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """Resample float samples; downsampling low-passes first with a windowed-sinc FIR to avoid aliasing"""
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    if to_rate < from_rate:
+        # Cut off at 0.4 x the new rate so the 63-tap filter's transition band ends below Nyquist
+        cutoff = 0.4 * to_rate / from_rate
+        taps = np.arange(-31, 32, dtype=np.float32)
+        kernel = (np.sinc(2 * cutoff * taps) * np.hanning(63)).astype(np.float32)
+        samples = np.convolve(samples, kernel / kernel.sum(), mode="same")
+        if from_rate % to_rate == 0:
+            return samples[::from_rate // to_rate]
+    positions = np.arange(int(len(samples) * to_rate / from_rate)) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _decode_with_ffmpeg(audio: BytesLike, sample_rate: int) -> bytes:
+    """Decode any container ffmpeg understands straight to mono 16-bit PCM at ``sample_rate``"""
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg is needed to decode compressed audio")
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0", "-vn",
+         "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"],
+        input=audio, capture_output=True
+    )
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(f"ffmpeg failed to decode audio: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def normalize_for_stt(audio: BytesLike, sample_rate: int = STT_SAMPLE_RATE) -> BytesLike:
+    """Convert a recording to mono 16-bit PCM WAV at ``sample_rate``.
+
+    PCM WAV is downmixed and resampled in NumPy; other containers (MP3, M4A,
+    WebM from browsers) are decoded by ffmpeg. Input that is already in the
+    target format is returned unchanged.
+    """
+    try:
+        wav = read_wav(audio)
+    except ValueError:
+        return pcm_to_wav(_decode_with_ffmpeg(audio, sample_rate), sample_rate)
+
+    if wav.sample_rate == sample_rate and wav.channels == 1 and wav.sample_width == 2:
+        return audio
+    samples = resample(pcm_samples(wav.pcm, wav.channels, wav.sample_width), wav.sample_rate, sample_rate)
+    pcm = np.clip(np.rint(samples), -32768, 32767).astype("<i2")
+    return pcm_to_wav(pcm.tobytes(), sample_rate)
@@ -0,0 +1,112 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Sequence, Tuple
+
+from audio_utils import BytesLike, pcm_to_wav, read_wav
+from voice_activity import SpeechActivity
+
+# Speech spans shorter than this go up as a single request
+STT_CHUNK_MIN_SECONDS = float(os.environ.get("STT_CHUNK_MIN_SECONDS", 60))
+STT_CHUNK_SECONDS = float(os.environ.get("STT_CHUNK_SECONDS", 30))
+STT_CHUNK_OVERLAP_SECONDS = float(os.environ.get("STT_CHUNK_OVERLAP_SECONDS", 1.0))
+STT_CHUNK_WORKERS = int(os.environ.get("STT_CHUNK_WORKERS", 4))
+
+_WORD = re.compile(r"[\w']+")
+
+
+class AudioChunk(NamedTuple):
+    """Sample range of one chunk; ``overlaps_previous`` is set when it shares audio with the chunk before"""
+    start: int
+    end: int
+    overlaps_previous: bool
+
+
+def plan_chunks(activity: SpeechActivity, target_seconds: float = STT_CHUNK_SECONDS,
+                overlap_seconds: float = STT_CHUNK_OVERLAP_SECONDS) -> List[AudioChunk]:
+    """Split the speech span of a clip into chunks.
+
+    Each cut goes in the middle of the pause between speech segments closest
+    to ``target_seconds`` from the previous cut. Where speech runs on with no
+    pause in reach, the cut is made at the target length and both neighbours
+    are extended by ``overlap_seconds`` so the word under the cut is heard
+    whole in at least one chunk.
+    """
+    start, end = activity.bounds
+    rate = activity.sample_rate
+    target = int(target_seconds * rate)
+    overlap = int(overlap_seconds * rate)
+    pauses = [(previous_end + next_start) // 2
+              for (_, previous_end), (next_start, _) in zip(activity.segments, activity.segments[1:])]
+
+    cuts = []
+    position = start
+    # Stop once the remainder fits in one and a half chunks, so the last chunk is never a sliver
+    while end - position > target * 3 // 2:
+        reachable = [pause for pause in pauses if position + target // 2 <= pause <= position + target * 3 // 2]
+        if reachable:
+            cuts.append((min(reachable, key=lambda pause: abs(pause - position - target)), 0))
+        else:
+            cuts.append((position + target, overlap))
+        position = cuts[-1][0]
+
+    boundaries = [(start, 0)] + cuts + [(end, 0)]
+    return [
+        AudioChunk(max(start, cut_start - margin_start), min(end, cut_end + margin_end), margin_start > 0)
+        for (cut_start, margin_start), (cut_end, margin_end) in zip(boundaries, boundaries[1:])
+    ]
+
+
+def split_for_transcription(wav: BytesLike, activity: SpeechActivity,
+                            **plan_options) -> Tuple[List[bytes], List[bool]]:
+    """Cut a 16-bit PCM WAV into standalone WAV chunks following ``plan_chunks``.
+
+    Returns the chunks and, for each, whether it overlaps the one before.
+    """
+    audio = read_wav(wav)
+    frame_bytes = audio.channels * audio.sample_width
+    chunks = plan_chunks(activity, **plan_options)
+    return [
+        pcm_to_wav(audio.pcm[chunk.start * frame_bytes:chunk.end * frame_bytes], audio.sample_rate,
+                   audio.channels, audio.sample_width)
+        for chunk in chunks
+    ], [chunk.overlaps_previous for chunk in chunks]
+
+
+def _normalize_word(word: str) -> str:
+    return "".join(_WORD.findall(word.lower()))
+
+
+def stitch_transcripts(texts: Sequence[str], overlapped: Sequence[bool], max_overlap_words: int = 12) -> str:
+    """Join chunk transcripts in order, keeping words heard in an overlap once.
+
+    ``overlapped[i]`` says whether chunk ``i`` shares audio with the chunk
+    before it. Only there, the longest run of up to ``max_overlap_words``
+    words that ends the text so far and starts the next transcript is dropped
+    from the next transcript; words are compared ignoring case and
+    punctuation. Chunks cut at a pause are joined as they are, so a phrase
+    genuinely repeated across the pause survives.
+    """
+    words: List[str] = []
+    for text, overlaps_previous in zip(texts, overlapped):
+        incoming = text.split()
+        if not overlaps_previous:
+            words.extend(incoming)
+            continue
+        tail = [_normalize_word(word) for word in words[-max_overlap_words:]]
+        head = [_normalize_word(word) for word in incoming[:max_overlap_words]]
+        repeated = next((size for size in range(min(len(tail), len(head)), 0, -1)
+                         if tail[-size:] == head[:size]), 0)
+        words.extend(incoming[repeated:])
+    return " ".join(words)
+
+
+def transcribe_chunks(transcribe: Callable[[bytes], str], chunks: Sequence[bytes], overlapped: Sequence[bool],
+                      workers: int = STT_CHUNK_WORKERS) -> str:
+    """Transcribe chunks concurrently, at most ``workers`` at a time, and stitch them in order.
+
+    A failed chunk raises, so the caller can retry the clip with another provider.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+        texts = list(pool.map(transcribe, chunks))
+    return stitch_transcripts(texts, overlapped)
@@ -0,0 +1,132 @@
+import os
+import re
+import time
+import datetime
+import threading
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+from conversation_database import ConversationDatabase
+
+# Entry lifetime and size bound, tunable per deployment
+CONTEXT_CACHE_TTL_SECONDS = float(os.environ.get("CONTEXT_CACHE_TTL_SECONDS", 300))
+CONTEXT_CACHE_MAX_ENTRIES = int(os.environ.get("CONTEXT_CACHE_MAX_ENTRIES", 500))
+
+_WORD_PATTERN = re.compile(r"\w+")
+# Filler words that would otherwise match almost every cached title
+_STOPWORDS = {
+    "the", "and", "for", "you", "your", "are", "was", "what", "want", "with", "have",
+    "need", "can", "about", "any", "this", "that", "there", "how", "looking", "please"
+}
+
+
+class ContextCache:
+    """Session-scoped, write-through cache of prior conversation context.
+
+    The most recent ``max_entries`` context rows are loaded when a conversation
+    is started or loaded, and new rows are appended as they are written, so
+    per-turn lookups never touch SQLite. The snapshot is reloaded once it is
+    older than ``ttl_seconds`` to pick up writes from other sessions.
+    """
+
+    def __init__(self, db: ConversationDatabase, ttl_seconds: float = CONTEXT_CACHE_TTL_SECONDS,
+                 max_entries: int = CONTEXT_CACHE_MAX_ENTRIES):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = deque(maxlen=max_entries)
+        self._titles: Dict[int, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(Re)populate the cache from the database"""
+        contexts = self.db.get_recent_context(self.max_entries)
+        with self._lock:
+            self._entries.clear()
+            self._titles.clear()
+            for context in contexts:
+                self._entries.append(self._index_entry(context))
+                self._titles[context['conversation_id']] = context['conversation_title']
+            self._loaded_at = time.monotonic()
+        logging.info(f"✅ Context cache loaded {len(contexts)} entries")
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def remember_title(self, conversation_id: int, title: str):
+        """Record the title used for context written to this conversation"""
+        with self._lock:
+            self._titles[conversation_id] = title
+
+    def add_context(self, conversation_id: int, context_type: str, context_data: Dict) -> int:
+        """Write context to the database, then to the cache"""
+        context_id = self.db.add_conversation_context(conversation_id, context_type, context_data)
+        with self._lock:
+            context = {
+                'context_id': context_id,
+                'conversation_id': conversation_id,
+                'conversation_title': self._titles.get(conversation_id, ""),
+                'conversation_summary': None,
+                'context_type': context_type,
+                'context_data': context_data,
+                'created_at': datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+            }
+            # Newest first; the deque bound evicts the oldest entry
+            self._entries.appendleft(self._index_entry(context))
+        return context_id
+
+    def get_relevant_context(self, current_query: str, limit: int = 5) -> List[Dict]:
+        """Return cached context matching the query, newest first"""
+        if self.is_stale():
+            self.load()
+        query = current_query.lower().strip()
+        if not query:
+            return []
+        query_words = {word for word in _WORD_PATTERN.findall(query)
+                       if len(word) >= 3 and word not in _STOPWORDS}
+
+        contexts = []
+        with self._lock:
+            for entry in self._entries:
+                if query in entry['text'] or query_words & entry['words']:
+                    contexts.append(entry['context'])
+                    if len(contexts) >= limit:
+                        break
+        return contexts
+
+    def get_context_for_conversations(self, conversation_ids: List[int], limit: int = 5) -> List[Dict]:
+        """Return the newest cached context for each conversation, in the given order"""
+        if self.is_stale():
+            self.load()
+        wanted = set(conversation_ids)
+        newest = {}
+        with self._lock:
+            for entry in self._entries:
+                conversation_id = entry['context']['conversation_id']
+                if conversation_id in wanted and conversation_id not in newest:
+                    newest[conversation_id] = entry['context']
+        return [newest[conversation_id] for conversation_id in conversation_ids if conversation_id in newest][:limit]
+
+    @staticmethod
+    def _index_entry(context: Dict) -> Dict:
+        """Precompute the lowercase text and word set a context row is matched on"""
+        values = [context.get('conversation_title') or "", context.get('conversation_summary') or ""]
+        for value in context['context_data'].values():
+            if isinstance(value, list):
+                values.extend(str(item) for item in value)
+            elif isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                values.append(str(value))
+        text = " ".join(values).lower()
+        return {
+            'context': {
+                'conversation_id': context['conversation_id'],
+                'conversation_title': context['conversation_title'],
+                'context_type': context['context_type'],
+                'context_data': context['context_data'],
+                'created_at': context['created_at']
+            },
+            'text': text,
+            'words': set(_WORD_PATTERN.findall(text))
+        }
@@ -0,0 +1,283 @@
+import os
+import json
+import zlib
+import logging
+from typing import Dict, List, Optional
+
+from conversation_database import ConversationDatabase, ConnectionPool, DATABASE_PATH
+
+# Conversations idle for longer than this are moved out of the hot database
+ARCHIVE_AFTER_DAYS = float(os.environ.get("ARCHIVE_AFTER_DAYS", 90))
+
+
+def default_archive_path(db_path: str) -> str:
+    """Archive file that sits next to the hot database"""
+    return os.path.splitext(db_path)[0] + "_archive.db"
+
+
+class ConversationArchive:
+    """Cold-storage tier for old conversations.
+
+    Each archived conversation (header, messages and context) is stored as one
+    zlib-compressed JSON blob in a separate SQLite file, with a contentless
+    FTS5 index so archived conversations can still be searched on demand.
+    """
+
+    def __init__(self, db: ConversationDatabase, archive_path: str = None):
+        self.db = db
+        self.archive_path = archive_path or default_archive_path(db.db_path)
+        self.pool = ConnectionPool(self.archive_path, max_connections=2)
+        self.fts_enabled = False
+        self.init_archive()
+
+    def init_archive(self):
+        """Initialize archive tables"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS archived_conversations (
+                        conversation_id INTEGER PRIMARY KEY,
+                        title TEXT NOT NULL,
+                        summary TEXT,
+                        tags TEXT,
+                        created_at TIMESTAMP,
+                        updated_at TIMESTAMP,
+                        message_count INTEGER NOT NULL DEFAULT 0,
+                        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        payload BLOB NOT NULL
+                    )
+                """)
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_archived_updated ON archived_conversations(updated_at)")
+
+                try:
+                    # Contentless: only the index is stored, the text lives in the compressed payload
+                    cursor.execute("""
+                        CREATE VIRTUAL TABLE IF NOT EXISTS archived_fts USING fts5(
+                            title, body, content=''
+                        )
+                    """)
+                    self.fts_enabled = True
+                except Exception as e:
+                    logging.warning(f"⚠️ Archive search index unavailable: {e}")
+
+                conn.commit()
+                logging.info("✅ Archive initialized successfully")
+
+        except Exception as e:
+            logging.error(f"❌ Error initializing archive: {e}")
+            raise
+
+    def archive_conversations(self, older_than_days: float = ARCHIVE_AFTER_DAYS, batch_size: int = 100,
+                              max_batches: Optional[int] = None, vacuum_pages: int = 1000) -> int:
+        """Move conversations idle for ``older_than_days`` into the archive.
+
+        Works in batches: each batch is written to the archive and committed
+        before it is deleted from the hot database, then up to ``vacuum_pages``
+        freed pages are released with an incremental vacuum. Returns the number
+        of conversations archived.
+        """
+        self.db.enable_incremental_vacuum()
+        archived = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            conversation_ids = self.db.get_conversation_ids_older_than(older_than_days, limit=batch_size)
+            if not conversation_ids:
+                break
+            snapshots = [snapshot for snapshot in map(self._snapshot, conversation_ids) if snapshot]
+            self._store(snapshots)
+            # Only delete conversations nobody wrote to since the snapshot; archived copies
+            # of the others are dropped so they stay (only) in the hot database
+            deleted = set(self.db.delete_conversations_if_unchanged({
+                snapshot['conversation_id']: (snapshot['updated_at'], snapshot['message_count'])
+                for snapshot in snapshots
+            }))
+            self._discard([snapshot for snapshot in snapshots if snapshot['conversation_id'] not in deleted])
+            self.db.incremental_vacuum(vacuum_pages)
+            archived += len(deleted)
+            batches += 1
+
+        if archived:
+            logging.info(f"✅ Archived {archived} conversations older than {older_than_days} days")
+        return archived
+
+    def _snapshot(self, conversation_id: int) -> Optional[Dict]:
+        conversation = self.db.get_conversation(conversation_id)
+        if conversation:
+            conversation['context'] = self.db.get_conversation_context(conversation_id)
+        return conversation
+
+    def _store(self, snapshots: List[Dict]):
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+
+                for snapshot in snapshots:
+                    if self.fts_enabled:
+                        # Re-archiving (e.g. after a crash mid-batch) must not double-index
+                        previous = cursor.execute(
+                            "SELECT payload FROM archived_conversations WHERE conversation_id = ?",
+                            (snapshot['conversation_id'],)
+                        ).fetchone()
+                        if previous:
+                            self._unindex(cursor, json.loads(zlib.decompress(previous[0]).decode("utf-8")))
+
+                    payload = zlib.compress(json.dumps(snapshot).encode("utf-8"), 6)
+                    cursor.execute("""
+                        INSERT OR REPLACE INTO archived_conversations
+                            (conversation_id, title, summary, tags, created_at, updated_at, message_count, payload)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (snapshot['conversation_id'], snapshot['title'], snapshot['summary'],
+                          json.dumps(snapshot['tags']) if snapshot['tags'] else None,
+                          snapshot['created_at'], snapshot['updated_at'], snapshot['message_count'], payload))
+
+                    if self.fts_enabled:
+                        cursor.execute("""
+                            INSERT INTO archived_fts (rowid, title, body) VALUES (?, ?, ?)
+                        """, (snapshot['conversation_id'], *self._index_text(snapshot)))
+
+                conn.commit()
+
+        except Exception as e:
+            logging.error(f"❌ Error writing to archive: {e}")
+            raise
+
+    @staticmethod
+    def _index_text(snapshot: Dict):
+        title = f"{snapshot['title']} {snapshot.get('summary') or ''}"
+        body = "\n".join(message['content'] for message in snapshot.get('messages', []))
+        return title, body
+
+    def _discard(self, snapshots: List[Dict]):
+        """Remove stored snapshots whose conversation stayed in the hot database"""
+        if not snapshots:
+            return
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+
+                for snapshot in snapshots:
+                    cursor.execute("DELETE FROM archived_conversations WHERE conversation_id = ?",
+                                   (snapshot['conversation_id'],))
+                    if self.fts_enabled:
+                        self._unindex(cursor, snapshot)
+
+                conn.commit()
+                logging.info(f"✅ Kept {len(snapshots)} conversations that changed while being archived")
+
+        except Exception as e:
+            logging.error(f"❌ Error discarding archived conversations: {e}")
+            raise
+
+    def _unindex(self, cursor, snapshot: Dict):
+        """Remove a conversation from the contentless index (needs its original text)"""
+        cursor.execute("""
+            INSERT INTO archived_fts (archived_fts, rowid, title, body) VALUES ('delete', ?, ?, ?)
+        """, (snapshot['conversation_id'], *self._index_text(snapshot)))
+
+    def search_archive(self, query: str, limit: int = 20) -> List[Dict]:
+        """Ranked full-text search over archived conversations"""
+        match_expression = ConversationDatabase._build_match_expression(query)
+        if not match_expression:
+            return []
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+
+                if self.fts_enabled:
+                    cursor.execute("""
+                        SELECT a.conversation_id, a.title, a.created_at, a.updated_at, a.summary, a.tags,
+                               a.message_count, a.archived_at, bm25(archived_fts) AS rank
+                        FROM archived_fts
+                        JOIN archived_conversations a ON a.conversation_id = archived_fts.rowid
+                        WHERE archived_fts MATCH ?
+                        ORDER BY rank
+                        LIMIT ?
+                    """, (match_expression, limit))
+                else:
+                    cursor.execute("""
+                        SELECT conversation_id, title, created_at, updated_at, summary, tags,
+                               message_count, archived_at, NULL
+                        FROM archived_conversations
+                        WHERE title LIKE ? OR summary LIKE ?
+                        ORDER BY updated_at DESC
+                        LIMIT ?
+                    """, (f'%{query}%', f'%{query}%', limit))
+
+                conversations = []
+                for row in cursor.fetchall():
+                    conversation = {
+                        'conversation_id': row[0],
+                        'title': row[1],
+                        'created_at': row[2],
+                        'updated_at': row[3],
+                        'summary': row[4],
+                        'tags': json.loads(row[5]) if row[5] else [],
+                        'message_count': row[6],
+                        'archived_at': row[7],
+                        'rank': row[8],
+                        'archived': True
+                    }
+                    conversations.append(conversation)
+
+                return conversations
+
+        except Exception as e:
+            logging.error(f"❌ Error searching archive: {e}")
+            raise
+
+    def get_archived_conversation(self, conversation_id: int) -> Optional[Dict]:
+        """Decompress one archived conversation, including messages and context"""
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute(
+                    "SELECT payload FROM archived_conversations WHERE conversation_id = ?", (conversation_id,)
+                ).fetchone()
+                if not row:
+                    return None
+                return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+        except Exception as e:
+            logging.error(f"❌ Error reading archived conversation: {e}")
+            raise
+
+    def restore_conversation(self, conversation_id: int) -> bool:
+        """Move an archived conversation back into the hot database"""
+        snapshot = self.get_archived_conversation(conversation_id)
+        if not snapshot:
+            return False
+        self.db.restore_conversation(snapshot)
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM archived_conversations WHERE conversation_id = ?", (conversation_id,))
+                if self.fts_enabled:
+                    self._unindex(cursor, snapshot)
+                conn.commit()
+                logging.info(f"✅ Restored conversation {conversation_id} from archive")
+                return True
+
+        except Exception as e:
+            logging.error(f"❌ Error removing restored conversation from archive: {e}")
+            raise
+
+
+def main():
+    """Run the archival job from the command line (e.g. a cron or Render job)"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Archive cold Ecokart conversations')
+    parser.add_argument('--older-than-days', type=float, default=ARCHIVE_AFTER_DAYS,
+                        help=f'Archive conversations idle for this many days (default: {ARCHIVE_AFTER_DAYS:g})')
+    parser.add_argument('--batch-size', type=int, default=100, help='Conversations moved per transaction')
+    parser.add_argument('--db', default=DATABASE_PATH, help='Path to the conversation database')
+
+    args = parser.parse_args()
+
+    archive = ConversationArchive(ConversationDatabase(args.db))
+    count = archive.archive_conversations(args.older_than_days, batch_size=args.batch_size)
+    print(f"📦 Archived {count} conversations to {archive.archive_path}")
+
+if __name__ == "__main__":
+    main()
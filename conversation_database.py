@@ -1,9 +1,14 @@
 import sqlite3
 import json
 import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 import logging
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
 
 # Check for Render environment and set DB path accordingly
 IS_RENDER_ENV = 'RENDER' in os.environ
@@ -19,16 +24,129 @@ else:
     
 logging.basicConfig(level=logging.INFO)
 
+# Connection tuning, overridable per deployment
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", 8))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_CACHE_SIZE_KIB = int(os.environ.get("SQLITE_CACHE_SIZE_KIB", 20000))
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHED_STATEMENTS = int(os.environ.get("SQLITE_CACHED_STATEMENTS", 256))
+
+class ConnectionPool:
+    """Thread-safe pool of persistent, pre-tuned SQLite connections.
+    
+    Connections are opened once with WAL journaling, ``synchronous=NORMAL``,
+    a larger page cache, memory-mapped I/O and a busy timeout, and each keeps
+    its own prepared-statement cache. Under WAL, readers see a consistent
+    snapshot and never block the (single) writer.
+    """
+    
+    def __init__(self, db_path: str, max_connections: int = SQLITE_POOL_SIZE,
+                 busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS, cache_size_kib: int = SQLITE_CACHE_SIZE_KIB,
+                 mmap_size: int = SQLITE_MMAP_SIZE, cached_statements: int = SQLITE_CACHED_STATEMENTS):
+        self.db_path = db_path
+        # Every connection to ":memory:" would be a separate database
+        self.max_connections = 1 if db_path == ":memory:" else max_connections
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._all = []
+        self._lock = threading.Lock()
+    
+    def _create(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA foreign_keys=ON")
+        with self._lock:
+            self._all.append(conn)
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error"""
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._create()
+            try:
+                with conn:
+                    yield conn
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+    
+    def close(self):
+        """Close every connection the pool has opened"""
+        with self._lock:
+            connections, self._all = self._all, []
+        for conn in connections:
+            conn.close()
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
 class ConversationDatabase:
-    def __init__(self, db_path=DATABASE_PATH):
-        """Initialize the conversation database"""
+    def __init__(self, db_path=DATABASE_PATH, id_offset: int = 1, id_stride: int = 1):
+        """Initialize the conversation database.
+        
+        ``id_offset``/``id_stride`` make conversation and message IDs take the
+        values offset, offset + stride, ... so several shard files can share one
+        ID space; the defaults leave ID assignment to AUTOINCREMENT.
+        """
         self.db_path = db_path
+        self.id_offset = id_offset
+        self.id_stride = id_stride
+        self.pool = ConnectionPool(db_path)
         self.init_database()
     
+    def close(self):
+        """Close pooled connections"""
+        self.pool.close()
+    
+    # Tables owned by a conversation; deleting the conversation deletes their rows
+    _CHILD_TABLES = {
+        'messages': """
+            CREATE TABLE IF NOT EXISTS {name} (
+                message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id INTEGER,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                message_type TEXT DEFAULT 'text',
+                metadata TEXT,
+                FOREIGN KEY (conversation_id) REFERENCES conversations (conversation_id) ON DELETE CASCADE
+            )
+        """,
+        'conversation_context': """
+            CREATE TABLE IF NOT EXISTS {name} (
+                context_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id INTEGER,
+                context_type TEXT NOT NULL,
+                context_data TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (conversation_id) REFERENCES conversations (conversation_id) ON DELETE CASCADE
+            )
+        """
+    }
+    
     def init_database(self):
         """Initialize database tables"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Create conversations table
@@ -44,36 +162,28 @@ class ConversationDatabase:
                 """)
                 
                 # Create messages table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS messages (
-                        message_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        conversation_id INTEGER,
-                        role TEXT NOT NULL,
-                        content TEXT NOT NULL,
-                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        message_type TEXT DEFAULT 'text',
-                        metadata TEXT,
-                        FOREIGN KEY (conversation_id) REFERENCES conversations (conversation_id)
-                    )
-                """)
+                cursor.execute(self._CHILD_TABLES['messages'].format(name='messages'))
                 
                 # Create conversation context table for cross-references
+                cursor.execute(self._CHILD_TABLES['conversation_context'].format(name='conversation_context'))
+                
+                # Serves per-conversation message pages in timestamp order without a sort
                 cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS conversation_context (
-                        context_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        conversation_id INTEGER,
-                        context_type TEXT NOT NULL,
-                        context_data TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (conversation_id) REFERENCES conversations (conversation_id)
-                    )
+                    CREATE INDEX IF NOT EXISTS idx_messages_conversation_timestamp
+                    ON messages(conversation_id, timestamp, message_id)
                 """)
                 
-                # Create indexes for better performance
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_conversation_id ON messages(conversation_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON messages(timestamp)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_role ON messages(role)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_context_conversation ON conversation_context(conversation_id)")
+                # Denormalized counters so listings never count messages per row
+                self._init_conversation_counters(cursor)
+                
+                # Counters and hourly rollups so statistics never scan the tables
+                self._init_statistics(cursor)
+                
+                # Full-text search index over message content and conversation titles/summaries
+                self.fts_enabled = self._init_search_index(cursor)
+                
+                # Versioned index and schema changes
+                self._apply_migrations(cursor)
                 
                 conn.commit()
                 logging.info("✅ Database initialized successfully")
@@ -82,17 +192,371 @@ class ConversationDatabase:
             logging.error(f"❌ Error initializing database: {e}")
             raise
     
+    # Ordered schema migrations; PRAGMA user_version records the last one applied.
+    # Append new steps with the next version number and never edit a shipped one.
+    MIGRATIONS = [
+        (1, "composite indexes for hot queries", "_migrate_composite_indexes"),
+        (2, "indexed context facts", "_migrate_context_facts"),
+        (3, "cascading deletes from conversations", "_migrate_cascading_deletes"),
+        (4, "file context facts from lists under the list's key", "_migrate_context_fact_keys"),
+    ]
+    
+    @property
+    def schema_version(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def _apply_migrations(self, cursor):
+        """Run every migration newer than the file's user_version, in order"""
+        current = cursor.execute("PRAGMA user_version").fetchone()[0]
+        for version, description, method in self.MIGRATIONS:
+            if version <= current:
+                continue
+            getattr(self, method)(cursor)
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            logging.info(f"✅ Applied schema migration {version}: {description}")
+    
+    def _migrate_composite_indexes(self, cursor):
+        """Replace the original single-column indexes with ones shaped like the queries"""
+        # Prefix of idx_messages_conversation_timestamp, so it only cost writes
+        cursor.execute("DROP INDEX IF EXISTS idx_conversation_id")
+        # No query filters on timestamp alone
+        cursor.execute("DROP INDEX IF EXISTS idx_timestamp")
+        # get_messages_after(role=...): equality on role, then a message_id range in order
+        cursor.execute("DROP INDEX IF EXISTS idx_role")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_role_id ON messages(role, message_id)")
+        # get_conversation_context: one conversation's context, newest first
+        cursor.execute("DROP INDEX IF EXISTS idx_context_conversation")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_context_conversation_created
+            ON conversation_context(conversation_id, created_at)
+        """)
+        # get_recent_context: newest context across all conversations
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_context_created
+            ON conversation_context(created_at DESC, context_id DESC)
+        """)
+    
+    def _migrate_context_facts(self, cursor):
+        """Flatten context_data JSON into an indexed key/value table maintained by triggers"""
+        self._init_context_facts(cursor)
+        
+        # Backfill rows written before this migration
+        cursor.execute(f"""
+            INSERT INTO context_facts (context_id, conversation_id, key, value, number, created_at)
+            {self._CONTEXT_FACTS_SELECT.format(
+                row='cc', source='(SELECT * FROM conversation_context WHERE json_valid(context_data)) AS cc, '
+            )}
+        """)
+    
+    def _init_context_facts(self, cursor):
+        """Create context_facts with its indexes and sync triggers"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS context_facts (
+                context_id INTEGER NOT NULL,
+                conversation_id INTEGER,
+                key TEXT NOT NULL,
+                value TEXT COLLATE NOCASE,
+                number REAL,
+                created_at TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_context_facts_value ON context_facts(key, value, conversation_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_context_facts_number ON context_facts(key, number, conversation_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_context_facts_context ON context_facts(context_id)")
+        
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS context_facts_insert AFTER INSERT ON conversation_context
+            WHEN json_valid(new.context_data) BEGIN
+                INSERT INTO context_facts (context_id, conversation_id, key, value, number, created_at)
+                {self._CONTEXT_FACTS_SELECT.format(row='new', source='')};
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS context_facts_delete AFTER DELETE ON conversation_context BEGIN
+                DELETE FROM context_facts WHERE context_id = old.context_id;
+            END
+        """)
+    
+    def _migrate_cascading_deletes(self, cursor):
+        """Rebuild messages and conversation_context with ON DELETE CASCADE foreign keys"""
+        # Orphans would violate the constraint; deleting them here keeps FTS and counters in step
+        cursor.execute("DELETE FROM messages WHERE conversation_id NOT IN (SELECT conversation_id FROM conversations)")
+        cursor.execute("""
+            DELETE FROM conversation_context WHERE conversation_id NOT IN (SELECT conversation_id FROM conversations)
+        """)
+        
+        for table, schema in self._CHILD_TABLES.items():
+            on_delete = {row[6] for row in cursor.execute(f"PRAGMA foreign_key_list({table})").fetchall()}
+            if on_delete == {'CASCADE'}:
+                continue
+            # SQLite cannot add a constraint in place: copy into a new table and swap it in
+            columns = ", ".join(row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall())
+            sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+            cursor.execute(schema.format(name=f"{table}_rebuild"))
+            cursor.execute(f"INSERT INTO {table}_rebuild ({columns}) SELECT {columns} FROM {table}")
+            cursor.execute(f"DROP TABLE {table}")
+            cursor.execute(f"ALTER TABLE {table}_rebuild RENAME TO {table}")
+            if sequence:
+                # Keep AUTOINCREMENT from reusing IDs of rows deleted before the rebuild
+                cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence[0], table))
+        
+        # Dropping the old tables dropped their indexes and triggers
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_messages_conversation_timestamp
+            ON messages(conversation_id, timestamp, message_id)
+        """)
+        self._init_conversation_counters(cursor)
+        self._init_statistics(cursor)
+        self._init_search_index(cursor)
+        self._migrate_composite_indexes(cursor)
+        self._init_context_facts(cursor)
+    
+    def _migrate_context_fact_keys(self, cursor):
+        """Rebuild context_facts: list items used to be filed under the quoted JSON path"""
+        cursor.execute("DROP TRIGGER IF EXISTS context_facts_insert")
+        cursor.execute("DELETE FROM context_facts")
+        self._migrate_context_facts(cursor)
+    
+    # One fact per scalar in context_data, filed under its top-level key: list items go under the
+    # list's key ("product_interests"), booleans as 'true'/'false' and numbers in ``number``
+    _CONTEXT_FACTS_SELECT = """
+        SELECT {row}.context_id, {row}.conversation_id, field.key,
+               CASE fact.type WHEN 'text' THEN fact.atom WHEN 'true' THEN 'true' WHEN 'false' THEN 'false' END,
+               CASE WHEN fact.type IN ('integer', 'real') THEN fact.atom END,
+               COALESCE({row}.created_at, CURRENT_TIMESTAMP)
+        FROM {source}json_each({row}.context_data) AS field,
+             json_tree({row}.context_data, field.fullkey) AS fact
+        WHERE fact.type NOT IN ('object', 'array', 'null')
+    """
+    
+    def _init_conversation_counters(self, cursor):
+        """Add and backfill message_count/sequence_number, kept current by triggers and writes"""
+        cursor.execute("PRAGMA table_info(conversations)")
+        columns = {row[1] for row in cursor.fetchall()}
+        
+        if 'message_count' not in columns:
+            cursor.execute("ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+            cursor.execute("""
+                UPDATE conversations
+                SET message_count = (SELECT COUNT(*) FROM messages m WHERE m.conversation_id = conversations.conversation_id)
+            """)
+        if 'sequence_number' not in columns:
+            cursor.execute("ALTER TABLE conversations ADD COLUMN sequence_number INTEGER")
+            # IDs are monotonic, so they are a valid starting sequence for existing rows
+            cursor.execute("UPDATE conversations SET sequence_number = conversation_id")
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS messages_count_insert AFTER INSERT ON messages BEGIN
+                UPDATE conversations SET message_count = message_count + 1
+                WHERE conversation_id = new.conversation_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS messages_count_delete AFTER DELETE ON messages BEGIN
+                UPDATE conversations SET message_count = message_count - 1
+                WHERE conversation_id = old.conversation_id;
+            END
+        """)
+        
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_conversations_sequence ON conversations(sequence_number)")
+        # Listing reads newest conversations first; the index gives O(page) ordered scans
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_conversations_updated
+            ON conversations(updated_at DESC, conversation_id DESC)
+        """)
+    
+    def _init_statistics(self, cursor):
+        """Create the stats row and hourly rollups, kept current by triggers on every write"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'conversation_stats'")
+        needs_backfill = cursor.fetchone() is None
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS conversation_stats (
+                stats_id INTEGER PRIMARY KEY CHECK (stats_id = 1),
+                total_conversations INTEGER NOT NULL DEFAULT 0,
+                total_messages INTEGER NOT NULL DEFAULT 0,
+                conversations_with_messages INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # One row per hour (UTC) that has stored conversations or messages
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS hourly_stats (
+                hour TIMESTAMP PRIMARY KEY,
+                conversations_created INTEGER NOT NULL DEFAULT 0,
+                messages_added INTEGER NOT NULL DEFAULT 0,
+                user_messages INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stats_conversation_insert AFTER INSERT ON conversations BEGIN
+                UPDATE conversation_stats SET total_conversations = total_conversations + 1;
+                INSERT INTO hourly_stats (hour, conversations_created)
+                VALUES (strftime('%Y-%m-%d %H:00:00', COALESCE(new.created_at, CURRENT_TIMESTAMP)), 1)
+                ON CONFLICT(hour) DO UPDATE SET conversations_created = conversations_created + 1;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stats_conversation_delete AFTER DELETE ON conversations BEGIN
+                UPDATE conversation_stats SET total_conversations = total_conversations - 1;
+                UPDATE hourly_stats SET conversations_created = conversations_created - 1
+                WHERE hour = strftime('%Y-%m-%d %H:00:00', old.created_at);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stats_message_insert AFTER INSERT ON messages BEGIN
+                UPDATE conversation_stats SET
+                    total_messages = total_messages + 1,
+                    conversations_with_messages = conversations_with_messages + NOT EXISTS (
+                        SELECT 1 FROM messages
+                        WHERE conversation_id = new.conversation_id AND message_id <> new.message_id
+                    );
+                INSERT INTO hourly_stats (hour, messages_added, user_messages)
+                VALUES (strftime('%Y-%m-%d %H:00:00', COALESCE(new.timestamp, CURRENT_TIMESTAMP)), 1, new.role = 'user')
+                ON CONFLICT(hour) DO UPDATE SET
+                    messages_added = messages_added + 1,
+                    user_messages = user_messages + excluded.user_messages;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS stats_message_delete AFTER DELETE ON messages BEGIN
+                UPDATE conversation_stats SET
+                    total_messages = total_messages - 1,
+                    conversations_with_messages = conversations_with_messages - NOT EXISTS (
+                        SELECT 1 FROM messages WHERE conversation_id = old.conversation_id
+                    );
+                UPDATE hourly_stats SET
+                    messages_added = messages_added - 1,
+                    user_messages = user_messages - (old.role = 'user')
+                WHERE hour = strftime('%Y-%m-%d %H:00:00', old.timestamp);
+            END
+        """)
+        
+        if needs_backfill:
+            # One-off scan for databases created before the counters existed
+            cursor.execute("""
+                INSERT INTO conversation_stats (stats_id, total_conversations, total_messages, conversations_with_messages)
+                VALUES (1,
+                        (SELECT COUNT(*) FROM conversations),
+                        (SELECT COUNT(*) FROM messages),
+                        (SELECT COUNT(DISTINCT conversation_id) FROM messages))
+            """)
+            cursor.execute("""
+                INSERT INTO hourly_stats (hour, conversations_created)
+                SELECT strftime('%Y-%m-%d %H:00:00', created_at), COUNT(*)
+                FROM conversations WHERE created_at IS NOT NULL
+                GROUP BY 1
+            """)
+            cursor.execute("""
+                INSERT INTO hourly_stats (hour, messages_added, user_messages)
+                SELECT strftime('%Y-%m-%d %H:00:00', timestamp), COUNT(*), SUM(role = 'user')
+                FROM messages WHERE timestamp IS NOT NULL
+                GROUP BY 1
+                ON CONFLICT(hour) DO UPDATE SET
+                    messages_added = excluded.messages_added,
+                    user_messages = excluded.user_messages
+            """)
+    
+    def _init_search_index(self, cursor) -> bool:
+        """Create FTS5 tables and sync triggers; returns False if FTS5 is unavailable"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'")
+        needs_rebuild = cursor.fetchone() is None
+        
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    content, content='messages', content_rowid='message_id'
+                )
+            """)
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+                    title, summary, content='conversations', content_rowid='conversation_id'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            logging.warning(f"⚠️ FTS5 not available, falling back to LIKE search: {e}")
+            return False
+        
+        # Keep the external-content indexes in sync with their base tables
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts (rowid, content) VALUES (new.message_id, new.content);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.message_id, old.content);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.message_id, old.content);
+                INSERT INTO messages_fts (rowid, content) VALUES (new.message_id, new.content);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS conversations_fts_insert AFTER INSERT ON conversations BEGIN
+                INSERT INTO conversations_fts (rowid, title, summary) VALUES (new.conversation_id, new.title, new.summary);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS conversations_fts_delete AFTER DELETE ON conversations BEGIN
+                INSERT INTO conversations_fts (conversations_fts, rowid, title, summary)
+                VALUES ('delete', old.conversation_id, old.title, old.summary);
+            END
+        """)
+        # Only title/summary edits touch the index; updated_at bumps on every message do not
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS conversations_fts_update AFTER UPDATE OF title, summary ON conversations BEGIN
+                INSERT INTO conversations_fts (conversations_fts, rowid, title, summary)
+                VALUES ('delete', old.conversation_id, old.title, old.summary);
+                INSERT INTO conversations_fts (rowid, title, summary) VALUES (new.conversation_id, new.title, new.summary);
+            END
+        """)
+        
+        if needs_rebuild:
+            # Index rows written before the search index existed
+            cursor.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+            cursor.execute("INSERT INTO conversations_fts (conversations_fts) VALUES ('rebuild')")
+            logging.info("✅ Built full-text search index")
+        
+        return True
+    
+    @staticmethod
+    def _build_match_expression(query: str) -> Optional[str]:
+        """Turn free text into an FTS5 MATCH expression of quoted prefix terms"""
+        terms = [term.replace('"', '""') for term in query.split() if term.strip('"')]
+        if not terms:
+            return None
+        return " ".join(f'"{term}"*' for term in terms)
+    
+    def _next_id_sql(self, table: str, column: str) -> str:
+        """SQL for a new row ID; NULL lets AUTOINCREMENT choose unless IDs are strided.
+        
+        Strided IDs continue from the table's AUTOINCREMENT high-water mark in
+        sqlite_sequence rather than MAX(column), so deleting the newest row
+        never lets its ID be handed out again.
+        """
+        if self.id_stride == 1:
+            return "NULL"
+        offset, stride = int(self.id_offset), int(self.id_stride)
+        # Smallest ID above the high-water mark that is congruent to offset (mod stride)
+        return f"""(SELECT seq + ((({offset} - seq - 1) % {stride}) + {stride}) % {stride} + 1
+                    FROM (SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = '{table}'), 0) AS seq))"""
+    
     def create_conversation(self, title: str, summary: str = None, tags: List[str] = None) -> int:
         """Create a new conversation and return its ID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 tags_json = json.dumps(tags) if tags else None
                 
-                cursor.execute("""
-                    INSERT INTO conversations (title, summary, tags)
-                    VALUES (?, ?, ?)
+                cursor.execute(f"""
+                    INSERT INTO conversations (conversation_id, title, summary, tags, sequence_number)
+                    VALUES ({self._next_id_sql('conversations', 'conversation_id')}, ?, ?, ?,
+                            (SELECT COALESCE(MAX(sequence_number), 0) + 1 FROM conversations))
                 """, (title, summary, tags_json))
                 
                 conversation_id = cursor.lastrowid
@@ -105,18 +569,30 @@ class ConversationDatabase:
             logging.error(f"❌ Error creating conversation: {e}")
             raise
     
+    def get_next_sequence_number(self) -> int:
+        """Sequence number the next created conversation will receive"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COALESCE(MAX(sequence_number), 0) + 1 FROM conversations")
+                return cursor.fetchone()[0]
+                
+        except Exception as e:
+            logging.error(f"❌ Error getting next sequence number: {e}")
+            raise
+    
     def add_message(self, conversation_id: int, role: str, content: str, 
                    message_type: str = "text", metadata: Dict = None) -> int:
         """Add a message to a conversation"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 metadata_json = json.dumps(metadata) if metadata else None
                 
-                cursor.execute("""
-                    INSERT INTO messages (conversation_id, role, content, message_type, metadata)
-                    VALUES (?, ?, ?, ?, ?)
+                cursor.execute(f"""
+                    INSERT INTO messages (message_id, conversation_id, role, content, message_type, metadata)
+                    VALUES ({self._next_id_sql('messages', 'message_id')}, ?, ?, ?, ?, ?)
                 """, (conversation_id, role, content, message_type, metadata_json))
                 
                 message_id = cursor.lastrowid
@@ -137,16 +613,55 @@ class ConversationDatabase:
             logging.error(f"❌ Error adding message: {e}")
             raise
     
-    def get_conversation(self, conversation_id: int) -> Optional[Dict]:
-        """Get a conversation with all its messages"""
+    def add_messages(self, messages: List[Dict]) -> List[int]:
+        """Add many messages in a single transaction.
+        
+        Each item takes the keyword arguments of ``add_message``. Every touched
+        conversation gets one ``updated_at`` bump per batch.
+        """
+        if not messages:
+            return []
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                insert_sql = f"""
+                    INSERT INTO messages (message_id, conversation_id, role, content, message_type, metadata)
+                    VALUES ({self._next_id_sql('messages', 'message_id')}, ?, ?, ?, ?, ?)
+                """
+                message_ids = []
+                for message in messages:
+                    metadata = message.get('metadata')
+                    cursor.execute(insert_sql, (message['conversation_id'], message['role'], message['content'],
+                          message.get('message_type', 'text'), json.dumps(metadata) if metadata else None))
+                    message_ids.append(cursor.lastrowid)
+                
+                conversation_ids = {message['conversation_id'] for message in messages}
+                cursor.executemany("""
+                    UPDATE conversations 
+                    SET updated_at = CURRENT_TIMESTAMP 
+                    WHERE conversation_id = ?
+                """, [(conversation_id,) for conversation_id in conversation_ids])
+                
+                conn.commit()
+                
+                logging.info(f"✅ Added {len(message_ids)} messages to {len(conversation_ids)} conversations")
+                return message_ids
+                
+        except Exception as e:
+            logging.error(f"❌ Error adding messages: {e}")
+            raise
+    
+    def get_conversation(self, conversation_id: int, include_messages: bool = True) -> Optional[Dict]:
+        """Get a conversation, with all its messages unless ``include_messages`` is False"""
+        try:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Get conversation details
                 cursor.execute("""
-                    SELECT conversation_id, title, created_at, updated_at, summary, tags
-                    FROM conversations 
+                    SELECT conversation_id, title, created_at, updated_at, summary, tags, message_count
+                    FROM conversations c
                     WHERE conversation_id = ?
                 """, (conversation_id,))
                 
@@ -160,45 +675,114 @@ class ConversationDatabase:
                     'created_at': conv_row[2],
                     'updated_at': conv_row[3],
                     'summary': conv_row[4],
-                    'tags': json.loads(conv_row[5]) if conv_row[5] else []
+                    'tags': json.loads(conv_row[5]) if conv_row[5] else [],
+                    'message_count': conv_row[6]
                 }
                 
-                # Get all messages
+            if include_messages:
+                conversation['messages'] = list(self.iter_messages(conversation_id))
+            return conversation
+                
+        except Exception as e:
+            logging.error(f"❌ Error getting conversation: {e}")
+            raise
+    
+    @staticmethod
+    def _message_from_row(row) -> Dict:
+        return {
+            'message_id': row[0],
+            'role': row[1],
+            'content': row[2],
+            'timestamp': row[3],
+            'message_type': row[4],
+            'metadata': json.loads(row[5]) if row[5] else {}
+        }
+    
+    def iter_messages(self, conversation_id: int, batch_size: int = 500,
+                      after: Optional[Tuple[str, int]] = None) -> Iterator[Dict]:
+        """Yield a conversation's messages oldest first, fetching ``batch_size`` rows at a time.
+        
+        Pagination is keyset-based on (timestamp, message_id), so each batch is
+        an index range scan and no connection is held between batches.
+        """
+        cursor_timestamp, cursor_message_id = after if after else (None, None)
+        while True:
+            try:
+                with self.pool.connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                        SELECT message_id, role, content, timestamp, message_type, metadata
+                        FROM messages
+                        WHERE conversation_id = :conversation_id
+                          AND (:cursor_timestamp IS NULL
+                               OR (timestamp, message_id) > (:cursor_timestamp, :cursor_message_id))
+                        ORDER BY timestamp ASC, message_id ASC
+                        LIMIT :limit
+                    """, {
+                        'conversation_id': conversation_id,
+                        'cursor_timestamp': cursor_timestamp,
+                        'cursor_message_id': cursor_message_id,
+                        'limit': batch_size
+                    })
+                    rows = cursor.fetchall()
+            except Exception as e:
+                logging.error(f"❌ Error iterating messages: {e}")
+                raise
+            
+            for row in rows:
+                yield self._message_from_row(row)
+            if len(rows) < batch_size:
+                return
+            cursor_timestamp, cursor_message_id = rows[-1][3], rows[-1][0]
+    
+    def get_message_page(self, conversation_id: int, limit: int = 50,
+                         before: Optional[Tuple[str, int]] = None) -> Dict:
+        """Get the newest ``limit`` messages older than ``before``, in chronological order.
+        
+        With no cursor this is a "tail N" fetch. ``previous_cursor`` is set when
+        earlier messages exist and can be passed back as ``before``.
+        """
+        cursor_timestamp, cursor_message_id = before if before else (None, None)
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
                 cursor.execute("""
                     SELECT message_id, role, content, timestamp, message_type, metadata
-                    FROM messages 
-                    WHERE conversation_id = ?
-                    ORDER BY timestamp ASC
-                """, (conversation_id,))
+                    FROM messages
+                    WHERE conversation_id = :conversation_id
+                      AND (:cursor_timestamp IS NULL
+                           OR (timestamp, message_id) < (:cursor_timestamp, :cursor_message_id))
+                    ORDER BY timestamp DESC, message_id DESC
+                    LIMIT :limit
+                """, {
+                    'conversation_id': conversation_id,
+                    'cursor_timestamp': cursor_timestamp,
+                    'cursor_message_id': cursor_message_id,
+                    'limit': limit + 1
+                })
                 
-                messages = []
-                for row in cursor.fetchall():
-                    message = {
-                        'message_id': row[0],
-                        'role': row[1],
-                        'content': row[2],
-                        'timestamp': row[3],
-                        'message_type': row[4],
-                        'metadata': json.loads(row[5]) if row[5] else {}
-                    }
-                    messages.append(message)
+                rows = cursor.fetchall()
+                messages = [self._message_from_row(row) for row in reversed(rows[:limit])]
+                
+                previous_cursor = None
+                if len(rows) > limit and messages:
+                    previous_cursor = (messages[0]['timestamp'], messages[0]['message_id'])
                 
-                conversation['messages'] = messages
-                return conversation
+                return {'messages': messages, 'previous_cursor': previous_cursor}
                 
         except Exception as e:
-            logging.error(f"❌ Error getting conversation: {e}")
+            logging.error(f"❌ Error getting message page: {e}")
             raise
     
     def get_all_conversations(self, limit: int = 50) -> List[Dict]:
         """Get all conversations with basic info"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT conversation_id, title, created_at, updated_at, summary, tags,
-                           (SELECT COUNT(*) FROM messages WHERE conversation_id = c.conversation_id) as message_count
+                    SELECT conversation_id, title, created_at, updated_at, summary, tags, message_count
                     FROM conversations c
                     ORDER BY updated_at DESC
                     LIMIT ?
@@ -223,15 +807,139 @@ class ConversationDatabase:
             logging.error(f"❌ Error getting conversations: {e}")
             raise
     
-    def search_conversations(self, query: str) -> List[Dict]:
+    def search_conversations(self, query: str, limit: int = 50) -> List[Dict]:
         """Search conversations by content"""
+        if self.fts_enabled:
+            return self.search_conversations_page(query, page_size=limit)['conversations']
+        return self._search_conversations_like(query)
+    
+    def search_conversations_page(self, query: str, page_size: int = 20,
+                                  cursor: Optional[Tuple[str, int]] = None,
+                                  highlight: Tuple[str, str] = ("<mark>", "</mark>")) -> Dict:
+        """Ranked full-text search returning one page of conversations.
+        
+        Results are ordered by (updated_at, conversation_id) descending; pass the
+        returned ``next_cursor`` back in to fetch the following page.
+        """
+        if not self.fts_enabled:
+            return {'conversations': self._search_conversations_like(query), 'next_cursor': None}
+        
+        match_expression = self._build_match_expression(query)
+        if not match_expression:
+            return {'conversations': [], 'next_cursor': None}
+        
+        cursor_updated_at, cursor_conversation_id = cursor if cursor else (None, None)
+        
+        try:
+            with self.pool.connection() as conn:
+                db_cursor = conn.cursor()
+                
+                # Page on the set of matching conversations first; bm25() and snippet() are
+                # costly per hit, so they only run for hits in conversations on this page
+                db_cursor.execute("""
+                    WITH matches AS (
+                        SELECT m.conversation_id AS conversation_id
+                        FROM messages_fts
+                        JOIN messages m ON m.message_id = messages_fts.rowid
+                        WHERE messages_fts MATCH :match
+                        UNION
+                        SELECT rowid FROM conversations_fts WHERE conversations_fts MATCH :match
+                    )
+                    SELECT c.conversation_id, c.title, c.created_at, c.updated_at, c.summary, c.tags, c.message_count
+                    FROM conversations c
+                    JOIN matches h ON h.conversation_id = c.conversation_id
+                    WHERE :cursor_updated_at IS NULL
+                       OR (c.updated_at, c.conversation_id) < (:cursor_updated_at, :cursor_conversation_id)
+                    ORDER BY c.updated_at DESC, c.conversation_id DESC
+                    LIMIT :limit
+                """, {
+                    'match': match_expression,
+                    'cursor_updated_at': cursor_updated_at,
+                    'cursor_conversation_id': cursor_conversation_id,
+                    'limit': page_size + 1
+                })
+                
+                rows = db_cursor.fetchall()
+                best_hits = self._best_search_hits(db_cursor, match_expression, [row[0] for row in rows[:page_size]],
+                                                   highlight)
+                conversations = []
+                for row in rows[:page_size]:
+                    rank, snippet = best_hits.get(row[0], (None, None))
+                    conversation = {
+                        'conversation_id': row[0],
+                        'title': row[1],
+                        'created_at': row[2],
+                        'updated_at': row[3],
+                        'summary': row[4],
+                        'tags': json.loads(row[5]) if row[5] else [],
+                        'message_count': row[6],
+                        'rank': rank,
+                        'snippet': snippet
+                    }
+                    conversations.append(conversation)
+                
+                next_cursor = None
+                if len(rows) > page_size and conversations:
+                    next_cursor = (conversations[-1]['updated_at'], conversations[-1]['conversation_id'])
+                
+                return {'conversations': conversations, 'next_cursor': next_cursor}
+                
+        except Exception as e:
+            logging.error(f"❌ Error searching conversations: {e}")
+            raise
+    
+    @staticmethod
+    def _best_search_hits(db_cursor, match_expression: str, conversation_ids: List[int],
+                          highlight: Tuple[str, str]) -> Dict[int, Tuple[float, str]]:
+        """Rank and highlighted snippet of the best hit in each of the given conversations"""
+        if not conversation_ids:
+            return {}
+        placeholders = ",".join("?" * len(conversation_ids))
+        
+        # (conversation_id, rank, rowid, hit in title/summary) of every hit in these conversations
+        db_cursor.execute(f"""
+            SELECT m.conversation_id, bm25(messages_fts), messages_fts.rowid, 0
+            FROM messages_fts
+            JOIN messages m ON m.message_id = messages_fts.rowid
+            WHERE messages_fts MATCH ? AND m.conversation_id IN ({placeholders})
+            UNION ALL
+            SELECT rowid, bm25(conversations_fts), rowid, 1
+            FROM conversations_fts
+            WHERE conversations_fts MATCH ? AND +rowid IN ({placeholders})
+        """, (match_expression, *conversation_ids, match_expression, *conversation_ids))
+        best = {}
+        for conversation_id, rank, rowid, in_conversation in db_cursor.fetchall():
+            if conversation_id not in best or rank < best[conversation_id][0]:
+                best[conversation_id] = (rank, rowid, in_conversation)
+        
+        # Unary + keeps rowid a filter on one pass over the hits; as a constraint
+        # FTS5 would re-read the term's whole doclist for every rowid
+        snippets = {}
+        for in_conversation, table, column in ((0, "messages_fts", 0), (1, "conversations_fts", -1)):
+            rowids = [rowid for _, rowid, source in best.values() if source == in_conversation]
+            if not rowids:
+                continue
+            db_cursor.execute(f"""
+                SELECT rowid, snippet({table}, {column}, ?, ?, '…', 12)
+                FROM {table}
+                WHERE {table} MATCH ? AND +rowid IN ({",".join("?" * len(rowids))})
+            """, (highlight[0], highlight[1], match_expression, *rowids))
+            for rowid, snippet in db_cursor.fetchall():
+                snippets[(in_conversation, rowid)] = snippet
+        
+        return {
+            conversation_id: (rank, snippets.get((in_conversation, rowid)))
+            for conversation_id, (rank, rowid, in_conversation) in best.items()
+        }
+    
+    def _search_conversations_like(self, query: str) -> List[Dict]:
+        """Unindexed LIKE search, used when FTS5 is not compiled into SQLite"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
-                    SELECT DISTINCT c.conversation_id, c.title, c.created_at, c.updated_at, c.summary, c.tags,
-                           (SELECT COUNT(*) FROM messages WHERE conversation_id = c.conversation_id) as message_count
+                    SELECT DISTINCT c.conversation_id, c.title, c.created_at, c.updated_at, c.summary, c.tags, c.message_count
                     FROM conversations c
                     JOIN messages m ON c.conversation_id = m.conversation_id
                     WHERE c.title LIKE ? OR c.summary LIKE ? OR m.content LIKE ?
@@ -260,7 +968,7 @@ class ConversationDatabase:
     def get_conversation_context(self, conversation_id: int, context_type: str = None) -> List[Dict]:
         """Get context information for a conversation"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 if context_type:
@@ -294,10 +1002,10 @@ class ConversationDatabase:
             logging.error(f"❌ Error getting conversation context: {e}")
             raise
     
-    def add_conversation_context(self, conversation_id: int, context_type: str, context_data: Dict):
+    def add_conversation_context(self, conversation_id: int, context_type: str, context_data: Dict) -> int:
         """Add context information to a conversation"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 context_json = json.dumps(context_data)
@@ -307,8 +1015,10 @@ class ConversationDatabase:
                     VALUES (?, ?, ?)
                 """, (conversation_id, context_type, context_json))
                 
+                context_id = cursor.lastrowid
                 conn.commit()
                 logging.info(f"✅ Added context to conversation {conversation_id}")
+                return context_id
                 
         except Exception as e:
             logging.error(f"❌ Error adding conversation context: {e}")
@@ -317,7 +1027,7 @@ class ConversationDatabase:
     def get_relevant_context(self, current_query: str, limit: int = 5) -> List[Dict]:
         """Get relevant context from previous conversations based on current query"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Search for relevant conversations and their context
@@ -348,10 +1058,159 @@ class ConversationDatabase:
             logging.error(f"❌ Error getting relevant context: {e}")
             raise
     
+    def find_conversations_by_context(self, product_interest: str = None, min_budget: float = None,
+                                      max_budget: float = None, order_related: bool = None,
+                                      limit: int = 50) -> List[Dict]:
+        """Conversations whose extracted context matches every given filter, newest first.
+        
+        ``product_interest`` matches any recorded product interest case-insensitively;
+        budgets are inclusive bounds. Runs on the indexed context_facts table.
+        """
+        filters = []
+        params = []
+        if product_interest is not None:
+            filters.append("""
+                SELECT conversation_id FROM context_facts
+                WHERE key IN ('product_interest', 'product_interests') AND value = ?
+            """)
+            params.append(product_interest)
+        if min_budget is not None or max_budget is not None:
+            bounds = []
+            if min_budget is not None:
+                bounds.append("number >= ?")
+                params.append(min_budget)
+            if max_budget is not None:
+                bounds.append("number <= ?")
+                params.append(max_budget)
+            filters.append(f"""
+                SELECT conversation_id FROM context_facts
+                WHERE key = 'budget' AND {' AND '.join(bounds)}
+            """)
+        if order_related:
+            filters.append("SELECT conversation_id FROM context_facts WHERE key = 'order_related' AND value = 'true'")
+        
+        conditions = []
+        if filters:
+            conditions.append(f"conversation_id IN ({' INTERSECT '.join(filters)})")
+        if order_related is False:
+            conditions.append("""
+                conversation_id NOT IN (
+                    SELECT conversation_id FROM context_facts WHERE key = 'order_related' AND value = 'true'
+                )
+            """)
+        
+        if not conditions:
+            return self.get_all_conversations(limit)
+        
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f"""
+                    SELECT conversation_id, title, created_at, updated_at, summary, tags, message_count
+                    FROM conversations
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY updated_at DESC, conversation_id DESC
+                    LIMIT ?
+                """, (*params, limit))
+                
+                conversations = []
+                for row in cursor.fetchall():
+                    conversation = {
+                        'conversation_id': row[0],
+                        'title': row[1],
+                        'created_at': row[2],
+                        'updated_at': row[3],
+                        'summary': row[4],
+                        'tags': json.loads(row[5]) if row[5] else [],
+                        'message_count': row[6]
+                    }
+                    conversations.append(conversation)
+                
+                return conversations
+                
+        except Exception as e:
+            logging.error(f"❌ Error filtering conversations by context: {e}")
+            raise
+    
+    def get_messages_after(self, message_id: int, limit: int = 1000, role: str = None) -> List[Dict]:
+        """Get messages with an ID greater than ``message_id``, oldest first"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                if role:
+                    cursor.execute("""
+                        SELECT message_id, conversation_id, role, content, timestamp
+                        FROM messages
+                        WHERE message_id > ? AND role = ?
+                        ORDER BY message_id ASC
+                        LIMIT ?
+                    """, (message_id, role, limit))
+                else:
+                    cursor.execute("""
+                        SELECT message_id, conversation_id, role, content, timestamp
+                        FROM messages
+                        WHERE message_id > ?
+                        ORDER BY message_id ASC
+                        LIMIT ?
+                    """, (message_id, limit))
+                
+                messages = []
+                for row in cursor.fetchall():
+                    message = {
+                        'message_id': row[0],
+                        'conversation_id': row[1],
+                        'role': row[2],
+                        'content': row[3],
+                        'timestamp': row[4]
+                    }
+                    messages.append(message)
+                
+                return messages
+                
+        except Exception as e:
+            logging.error(f"❌ Error getting messages: {e}")
+            raise
+    
+    def get_recent_context(self, limit: int = 500) -> List[Dict]:
+        """Get the most recent context rows across all conversations, newest first"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    SELECT cc.context_id, c.conversation_id, c.title, c.summary,
+                           cc.context_type, cc.context_data, cc.created_at
+                    FROM conversation_context cc
+                    JOIN conversations c ON c.conversation_id = cc.conversation_id
+                    ORDER BY cc.created_at DESC, cc.context_id DESC
+                    LIMIT ?
+                """, (limit,))
+                
+                contexts = []
+                for row in cursor.fetchall():
+                    context = {
+                        'context_id': row[0],
+                        'conversation_id': row[1],
+                        'conversation_title': row[2],
+                        'conversation_summary': row[3],
+                        'context_type': row[4],
+                        'context_data': json.loads(row[5]),
+                        'created_at': row[6]
+                    }
+                    contexts.append(context)
+                
+                return contexts
+                
+        except Exception as e:
+            logging.error(f"❌ Error getting recent context: {e}")
+            raise
+    
     def update_conversation_summary(self, conversation_id: int, summary: str):
         """Update conversation summary"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -367,19 +1226,31 @@ class ConversationDatabase:
             logging.error(f"❌ Error updating conversation summary: {e}")
             raise
     
-    def delete_conversation(self, conversation_id: int):
-        """Delete a conversation and all its messages"""
+    def update_conversation_title(self, conversation_id: int, title: str):
+        """Update conversation title"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
-                # Delete messages first (due to foreign key constraint)
-                cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+                cursor.execute("""
+                    UPDATE conversations 
+                    SET title = ?
+                    WHERE conversation_id = ?
+                """, (title, conversation_id))
                 
-                # Delete context
-                cursor.execute("DELETE FROM conversation_context WHERE conversation_id = ?", (conversation_id,))
+                conn.commit()
+                logging.info(f"✅ Updated title for conversation {conversation_id}")
+                
+        except Exception as e:
+            logging.error(f"❌ Error updating conversation title: {e}")
+            raise
+    
+    def delete_conversation(self, conversation_id: int):
+        """Delete a conversation; its messages and context go with it (ON DELETE CASCADE)"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
                 
-                # Delete conversation
                 cursor.execute("DELETE FROM conversations WHERE conversation_id = ?", (conversation_id,))
                 
                 conn.commit()
@@ -389,47 +1260,352 @@ class ConversationDatabase:
             logging.error(f"❌ Error deleting conversation: {e}")
             raise
     
-    def get_conversation_statistics(self) -> Dict:
-        """Get database statistics"""
+    def delete_conversations(self, conversation_ids: List[int]) -> int:
+        """Delete several conversations in one statement and transaction; returns how many existed"""
+        if not conversation_ids:
+            return 0
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
-                # Get total conversations
-                cursor.execute("SELECT COUNT(*) FROM conversations")
-                total_conversations = cursor.fetchone()[0]
+                # One bound JSON array instead of one placeholder per ID
+                cursor.execute("""
+                    DELETE FROM conversations
+                    WHERE conversation_id IN (SELECT value FROM json_each(?))
+                """, (json.dumps([int(conversation_id) for conversation_id in conversation_ids]),))
+                deleted = cursor.rowcount
                 
-                # Get total messages
-                cursor.execute("SELECT COUNT(*) FROM messages")
-                total_messages = cursor.fetchone()[0]
+                conn.commit()
+                logging.info(f"✅ Deleted {deleted} conversations")
+                return deleted
+                
+        except Exception as e:
+            logging.error(f"❌ Error deleting conversations: {e}")
+            raise
+    
+    def delete_conversations_if_unchanged(self, versions: Dict[int, Tuple[str, int]]) -> List[int]:
+        """Delete conversations still at the (updated_at, message_count) they were read at.
+        
+        Lets a caller that copied conversations elsewhere delete the originals
+        without losing writes that landed after the copy. Returns the IDs deleted.
+        """
+        if not versions:
+            return []
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                # Take the write lock before checking, so nothing lands between check and delete
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("""
+                    SELECT c.conversation_id
+                    FROM json_each(?) v
+                    JOIN conversations c ON c.conversation_id = json_extract(v.value, '$[0]')
+                    WHERE c.updated_at IS json_extract(v.value, '$[1]')
+                      AND c.message_count = json_extract(v.value, '$[2]')
+                """, (json.dumps([[int(conversation_id), updated_at, message_count]
+                                  for conversation_id, (updated_at, message_count) in versions.items()]),))
+                unchanged = [row[0] for row in cursor.fetchall()]
+                cursor.execute("""
+                    DELETE FROM conversations
+                    WHERE conversation_id IN (SELECT value FROM json_each(?))
+                """, (json.dumps(unchanged),))
+                
+                conn.commit()
+                logging.info(f"✅ Deleted {len(unchanged)} of {len(versions)} conversations (others changed since read)")
+                return unchanged
+                
+        except Exception as e:
+            logging.error(f"❌ Error deleting conversations: {e}")
+            raise
+    
+    def purge_conversations(self, conversation_ids: List[int] = None, older_than_days: float = None,
+                            chunk_size: int = 200, pause_seconds: float = 0.05) -> Future:
+        """Delete conversations in the background, ``chunk_size`` per transaction.
+        
+        Pass either explicit ``conversation_ids`` or ``older_than_days`` (idle
+        conversations). The writer lock is released for ``pause_seconds``
+        between chunks so live traffic keeps flowing. The returned Future
+        resolves to the number of conversations deleted.
+        """
+        if (conversation_ids is None) == (older_than_days is None):
+            raise ValueError("Pass exactly one of conversation_ids or older_than_days")
+        
+        if conversation_ids is not None:
+            ids = list(conversation_ids)
+            chunks = (ids[start:start + chunk_size] for start in range(0, len(ids), chunk_size))
+        else:
+            chunks = iter(lambda: self.get_conversation_ids_older_than(older_than_days, chunk_size), [])
+        
+        future = Future()
+        
+        def run():
+            deleted = 0
+            try:
+                for chunk in chunks:
+                    deleted += self.delete_conversations(chunk)
+                    time.sleep(pause_seconds)
+                logging.info(f"✅ Purged {deleted} conversations")
+                future.set_result(deleted)
+            except Exception as e:
+                logging.error(f"❌ Error purging conversations: {e}")
+                future.set_exception(e)
+        
+        threading.Thread(target=run, name="conversation-purge", daemon=True).start()
+        return future
+    
+    def get_conversation_ids_older_than(self, days: float, limit: int = 100) -> List[int]:
+        """IDs of conversations not updated in ``days`` days, least recently updated first"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
                 
-                # Get recent activity
+                cursor.execute("""
+                    SELECT conversation_id FROM conversations
+                    WHERE updated_at < datetime('now', ?)
+                    ORDER BY updated_at ASC
+                    LIMIT ?
+                """, (f"-{float(days)} days", limit))
+                
+                return [row[0] for row in cursor.fetchall()]
+                
+        except Exception as e:
+            logging.error(f"❌ Error finding old conversations: {e}")
+            raise
+    
+    def get_existing_conversation_ids(self, conversation_ids: List[int]) -> List[int]:
+        """The subset of ``conversation_ids`` that has not been deleted"""
+        if not conversation_ids:
+            return []
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    SELECT conversation_id FROM conversations
+                    WHERE conversation_id IN (SELECT value FROM json_each(?))
+                """, (json.dumps([int(conversation_id) for conversation_id in conversation_ids]),))
+                
+                return [row[0] for row in cursor.fetchall()]
+                
+        except Exception as e:
+            logging.error(f"❌ Error checking conversation IDs: {e}")
+            raise
+    
+    def restore_conversation(self, snapshot: Dict):
+        """Re-insert a conversation exported by get_conversation, keeping its IDs and timestamps.
+        
+        ``snapshot`` may also carry a ``context`` list as returned by
+        get_conversation_context.
+        """
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    INSERT INTO conversations (conversation_id, title, created_at, updated_at, summary, tags, sequence_number)
+                    VALUES (?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(sequence_number), 0) + 1 FROM conversations))
+                """, (snapshot['conversation_id'], snapshot['title'], snapshot['created_at'], snapshot['updated_at'],
+                      snapshot.get('summary'), json.dumps(snapshot['tags']) if snapshot.get('tags') else None))
+                
+                cursor.executemany("""
+                    INSERT INTO messages (message_id, conversation_id, role, content, timestamp, message_type, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [(message['message_id'], snapshot['conversation_id'], message['role'], message['content'],
+                       message['timestamp'], message.get('message_type', 'text'),
+                       json.dumps(message['metadata']) if message.get('metadata') else None)
+                      for message in snapshot.get('messages', [])])
+                
+                cursor.executemany("""
+                    INSERT INTO conversation_context (context_id, conversation_id, context_type, context_data, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [(context['context_id'], snapshot['conversation_id'], context['context_type'],
+                       json.dumps(context['context_data']), context['created_at'])
+                      for context in snapshot.get('context', [])])
+                
+                conn.commit()
+                logging.info(f"✅ Restored conversation {snapshot['conversation_id']}")
+                
+        except Exception as e:
+            logging.error(f"❌ Error restoring conversation: {e}")
+            raise
+    
+    def enable_incremental_vacuum(self):
+        """Switch the file to auto_vacuum=INCREMENTAL (one full VACUUM the first time)"""
+        try:
+            with self.pool.connection() as conn:
+                mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+                if mode != 2:
+                    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                    conn.commit()
+                    # VACUUM cannot run inside a transaction
+                    conn.isolation_level = None
+                    try:
+                        conn.execute("VACUUM")
+                    finally:
+                        conn.isolation_level = ""
+                    logging.info("✅ Enabled incremental vacuum")
+                    
+        except Exception as e:
+            logging.error(f"❌ Error enabling incremental vacuum: {e}")
+            raise
+    
+    def incremental_vacuum(self, pages: int = 0) -> int:
+        """Return up to ``pages`` free pages to the OS (0 = all); returns the free pages left"""
+        try:
+            with self.pool.connection() as conn:
+                # execute() steps the pragma once (one page); executescript runs it to completion
+                conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+                return conn.execute("PRAGMA freelist_count").fetchone()[0]
+                
+        except Exception as e:
+            logging.error(f"❌ Error running incremental vacuum: {e}")
+            raise
+    
+    def get_conversation_statistics(self) -> Dict:
+        """Get database statistics from the incrementally maintained counters"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    SELECT total_conversations, total_messages, conversations_with_messages
+                    FROM conversation_stats WHERE stats_id = 1
+                """)
+                total_conversations, total_messages, conversations_with_messages = cursor.fetchone()
+                
+                # Range count on idx_conversations_updated
                 cursor.execute("""
                     SELECT COUNT(*) FROM conversations 
                     WHERE updated_at >= datetime('now', '-7 days')
                 """)
                 recent_conversations = cursor.fetchone()[0]
                 
-                # Get average messages per conversation
-                cursor.execute("""
-                    SELECT AVG(message_count) FROM (
-                        SELECT conversation_id, COUNT(*) as message_count 
-                        FROM messages 
-                        GROUP BY conversation_id
-                    )
-                """)
-                avg_messages = cursor.fetchone()[0] or 0
+                # Average over conversations that have messages, as before
+                avg_messages = total_messages / conversations_with_messages if conversations_with_messages else 0
                 
                 return {
                     'total_conversations': total_conversations,
                     'total_messages': total_messages,
                     'recent_conversations': recent_conversations,
+                    'conversations_with_messages': conversations_with_messages,
                     'average_messages_per_conversation': round(avg_messages, 2)
                 }
                 
         except Exception as e:
             logging.error(f"❌ Error getting statistics: {e}")
             raise
+    
+    def get_hourly_statistics(self, hours: int = 24 * 7) -> List[Dict]:
+        """Hourly rollups of conversations and messages for the last ``hours`` hours, oldest first"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    SELECT hour, conversations_created, messages_added, user_messages
+                    FROM hourly_stats
+                    WHERE hour >= strftime('%Y-%m-%d %H:00:00', 'now', ?)
+                    ORDER BY hour
+                """, (f"-{int(hours) - 1} hours",))
+                
+                return [
+                    {
+                        'hour': row[0],
+                        'conversations_created': row[1],
+                        'messages_added': row[2],
+                        'user_messages': row[3],
+                        'assistant_messages': row[2] - row[3]
+                    }
+                    for row in cursor.fetchall()
+                ]
+                
+        except Exception as e:
+            logging.error(f"❌ Error getting hourly statistics: {e}")
+            raise
+
+
+class GroupCommitWriter:
+    """Background writer that coalesces ``add_message`` calls into group commits.
+    
+    ``submit`` returns a Future resolved with the message ID once the batch it
+    joined has been committed. A batch is flushed when ``max_batch`` messages
+    are waiting or ``max_delay_ms`` has passed since the first one arrived.
+    If the batch fails, its messages are retried one at a time, so only the
+    futures of messages that fail on their own get the exception.
+    """
+    
+    def __init__(self, db: ConversationDatabase, max_delay_ms: float = 5, max_batch: int = 1000):
+        self.db = db
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="conversation-group-commit", daemon=True)
+        self._thread.start()
+    
+    def submit(self, conversation_id: int, role: str, content: str,
+               message_type: str = "text", metadata: Dict = None) -> Future:
+        """Queue a message for the next group commit"""
+        if self._closed:
+            raise RuntimeError("GroupCommitWriter is closed")
+        future = Future()
+        self._queue.put(({
+            'conversation_id': conversation_id,
+            'role': role,
+            'content': content,
+            'message_type': message_type,
+            'metadata': metadata
+        }, future))
+        return future
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+    
+    def _commit(self, batch):
+        try:
+            message_ids = self.db.add_messages([message for message, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # The batch rolled back as a whole; retry one by one so only the bad messages fail
+            logging.warning(f"⚠️ Group commit of {len(batch)} messages failed, retrying individually: {e}")
+            for message, future in batch:
+                try:
+                    future.set_result(self.db.add_message(**message))
+                except Exception as error:
+                    future.set_exception(error)
+            return
+        for (_, future), message_id in zip(batch, message_ids):
+            future.set_result(message_id)
+    
+    def close(self):
+        """Flush queued messages and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
 
 # Example usage and testing
 if __name__ == "__main__":
@@ -0,0 +1,303 @@
+import os
+import gzip
+import json
+import logging
+from contextlib import ExitStack
+from typing import Dict, Iterator, List
+
+from conversation_database import ConversationDatabase, DATABASE_PATH
+from sharded_conversation_database import ShardedConversationDatabase, CONVERSATION_SHARDS, shard_path
+
+EXPORT_BATCH_SIZE = 5000
+
+_CONVERSATION_COLUMNS = ["conversation_id", "title", "summary", "tags", "created_at", "updated_at"]
+_MESSAGE_COLUMNS = ["message_id", "conversation_id", "role", "content", "timestamp", "message_type", "metadata"]
+_CONTEXT_COLUMNS = ["context_id", "conversation_id", "context_type", "context_data", "created_at"]
+
+
+def _open_text(path: str, mode: str, compress: bool = None):
+    """Open a text file, gzip-compressed when asked or when the name ends in .gz"""
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, mode + "t", compresslevel=6, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _fetch_batches(cursor, batch_size: int) -> Iterator[List[tuple]]:
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def _databases(db) -> List[ConversationDatabase]:
+    """The SQLite files behind ``db``: every shard of a ShardedConversationDatabase, else ``db`` itself"""
+    return list(getattr(db, "shards", [db]))
+
+
+def iter_records(db: ConversationDatabase, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Dict]:
+    """Stream every conversation as typed records.
+
+    Each conversation record is followed by its messages (oldest first) and
+    then its context rows, so consumers only ever hold one batch of rows.
+    A sharded database is exported shard by shard.
+    """
+    for database in _databases(db):
+        yield from _iter_database_records(database, batch_size)
+
+
+def _iter_database_records(db: ConversationDatabase, batch_size: int) -> Iterator[Dict]:
+    with db.pool.connection() as conn:
+        conversations = conn.cursor()
+        conversations.execute(f"SELECT {', '.join(_CONVERSATION_COLUMNS)} FROM conversations ORDER BY conversation_id")
+        for batch in _fetch_batches(conversations, batch_size):
+            for row in batch:
+                conversation = dict(zip(_CONVERSATION_COLUMNS, row))
+                conversation['tags'] = json.loads(conversation['tags']) if conversation['tags'] else []
+                yield {'type': 'conversation', **conversation}
+
+                messages = conn.execute(f"""
+                    SELECT {', '.join(_MESSAGE_COLUMNS)} FROM messages
+                    WHERE conversation_id = ?
+                    ORDER BY timestamp, message_id
+                """, (conversation['conversation_id'],))
+                for message_batch in _fetch_batches(messages, batch_size):
+                    for message_row in message_batch:
+                        message = dict(zip(_MESSAGE_COLUMNS, message_row))
+                        message['metadata'] = json.loads(message['metadata']) if message['metadata'] else None
+                        yield {'type': 'message', **message}
+
+                contexts = conn.execute(f"""
+                    SELECT {', '.join(_CONTEXT_COLUMNS)} FROM conversation_context
+                    WHERE conversation_id = ?
+                    ORDER BY created_at, context_id
+                """, (conversation['conversation_id'],))
+                for context_batch in _fetch_batches(contexts, batch_size):
+                    for context_row in context_batch:
+                        context = dict(zip(_CONTEXT_COLUMNS, context_row))
+                        context['context_data'] = json.loads(context['context_data'])
+                        yield {'type': 'context', **context}
+
+
+def export_jsonl(db: ConversationDatabase, path: str, compress: bool = None,
+                 batch_size: int = EXPORT_BATCH_SIZE) -> Dict[str, int]:
+    """Write the whole history as JSON lines (gzip when ``path`` ends in .gz); returns record counts"""
+    counts = {'conversation': 0, 'message': 0, 'context': 0}
+    try:
+        with _open_text(path, "w", compress) as f:
+            for record in iter_records(db, batch_size):
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write("\n")
+                counts[record['type']] += 1
+        logging.info(f"✅ Exported {counts['conversation']} conversations and {counts['message']} messages to {path}")
+        return counts
+
+    except Exception as e:
+        logging.error(f"❌ Error exporting conversations: {e}")
+        raise
+
+
+def export_parquet(db: ConversationDatabase, directory: str, batch_size: int = 50_000) -> Dict[str, int]:
+    """Write conversations.parquet, messages.parquet and context.parquet, one row group per batch.
+
+    Needs pyarrow (installed with Streamlit). JSON columns are written as strings;
+    a sharded database is written shard by shard into the same files.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from e
+
+    schemas = {
+        'conversations': pa.schema([
+            ("conversation_id", pa.int64()), ("title", pa.string()), ("summary", pa.string()),
+            ("tags", pa.string()), ("created_at", pa.string()), ("updated_at", pa.string())
+        ]),
+        'messages': pa.schema([
+            ("message_id", pa.int64()), ("conversation_id", pa.int64()), ("role", pa.string()),
+            ("content", pa.string()), ("timestamp", pa.string()), ("message_type", pa.string()),
+            ("metadata", pa.string())
+        ]),
+        'context': pa.schema([
+            ("context_id", pa.int64()), ("conversation_id", pa.int64()), ("context_type", pa.string()),
+            ("context_data", pa.string()), ("created_at", pa.string())
+        ])
+    }
+    queries = {
+        'conversations': f"SELECT {', '.join(_CONVERSATION_COLUMNS)} FROM conversations ORDER BY conversation_id",
+        'messages': f"SELECT {', '.join(_MESSAGE_COLUMNS)} FROM messages ORDER BY message_id",
+        'context': f"SELECT {', '.join(_CONTEXT_COLUMNS)} FROM conversation_context ORDER BY context_id"
+    }
+
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+    try:
+        for table, schema in schemas.items():
+            counts[table] = 0
+            with pq.ParquetWriter(os.path.join(directory, f"{table}.parquet"), schema, compression="zstd") as writer:
+                for database in _databases(db):
+                    with database.pool.connection() as conn:
+                        cursor = conn.execute(queries[table])
+                        for rows in _fetch_batches(cursor, batch_size):
+                            columns = list(zip(*rows))
+                            writer.write_batch(pa.record_batch(
+                                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                schema=schema
+                            ))
+                            counts[table] += len(rows)
+        logging.info(f"✅ Exported {counts['messages']} messages to {directory} (Parquet)")
+        return counts
+
+    except Exception as e:
+        logging.error(f"❌ Error exporting conversations to Parquet: {e}")
+        raise
+
+
+def import_jsonl(db: ConversationDatabase, path: str, batch_size: int = EXPORT_BATCH_SIZE,
+                 keep_ids: bool = True) -> Dict[str, int]:
+    """Load a JSONL export, committing every ``batch_size`` records.
+
+    With ``keep_ids`` the exported IDs are reused (restoring a backup into an
+    empty database). Without it every conversation, message and context row
+    gets a new ID, so the same file can be loaded repeatedly, e.g. to seed
+    benchmark databases. Context rows always get new IDs: nothing refers to
+    them and shards number them independently.
+
+    A sharded database gets each conversation, with its messages and context,
+    on the shard that owns its ID; new conversations are spread round-robin.
+    """
+    counts = {'conversation': 0, 'message': 0, 'context': 0}
+    databases = _databases(db)
+    shard_count = len(databases)
+    pending = [{'conversation': [], 'message': [], 'context': []} for _ in databases]
+
+    def id_sql(database, table, column):
+        return "?" if keep_ids else database._next_id_sql(table, column)
+
+    statements = [{
+        'conversation': f"""
+            INSERT INTO conversations (conversation_id, title, summary, tags, created_at, updated_at, sequence_number)
+            VALUES ({id_sql(database, 'conversations', 'conversation_id')}, ?, ?, ?, ?, ?,
+                    (SELECT COALESCE(MAX(sequence_number), 0) + 1 FROM conversations))
+        """,
+        'message': f"""
+            INSERT INTO messages (message_id, conversation_id, role, content, timestamp, message_type, metadata)
+            VALUES ({id_sql(database, 'messages', 'message_id')}, ?, ?, ?, ?, ?, ?)
+        """,
+        'context': """
+            INSERT INTO conversation_context (conversation_id, context_type, context_data, created_at)
+            VALUES (?, ?, ?, ?)
+        """
+    } for database in databases]
+
+    def flush(shard, cursor):
+        # Parents first, so every message and context row has its conversation
+        for record_type in ('conversation', 'message', 'context'):
+            cursor.executemany(statements[shard][record_type], pending[shard][record_type])
+            pending[shard][record_type].clear()
+
+    try:
+        with _open_text(path, "r") as f, ExitStack() as stack:
+            connections = [stack.enter_context(database.pool.connection()) for database in databases]
+            cursors = [conn.cursor() for conn in connections]
+            # Only the current conversation's shard and new ID are needed: its rows follow it
+            current_export_id, current_id, shard = None, None, 0
+            new_conversations = 0
+            buffered = 0
+
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                record_type = record['type']
+
+                if record_type == 'conversation':
+                    values = (record['title'], record.get('summary'),
+                              json.dumps(record['tags']) if record.get('tags') else None,
+                              record['created_at'], record['updated_at'])
+                    if keep_ids:
+                        shard = (record['conversation_id'] - 1) % shard_count
+                        pending[shard]['conversation'].append((record['conversation_id'], *values))
+                        current_export_id = current_id = record['conversation_id']
+                    else:
+                        shard = new_conversations % shard_count
+                        new_conversations += 1
+                        cursors[shard].execute(statements[shard]['conversation'], values)
+                        current_export_id, current_id = record['conversation_id'], cursors[shard].lastrowid
+                else:
+                    if record['conversation_id'] != current_export_id:
+                        raise ValueError(f"{record_type} record for conversation {record['conversation_id']} "
+                                         f"does not follow its conversation record")
+                    if record_type == 'message':
+                        if keep_ids and (record['message_id'] - 1) % shard_count != shard:
+                            raise ValueError(f"Message {record['message_id']} does not fit the {shard_count}-shard "
+                                             f"ID layout of conversation {current_id}; import with new IDs")
+                        values = (current_id, record['role'], record['content'], record['timestamp'],
+                                  record.get('message_type', 'text'),
+                                  json.dumps(record['metadata']) if record.get('metadata') else None)
+                        pending[shard]['message'].append((record['message_id'], *values) if keep_ids else values)
+                    elif record_type == 'context':
+                        pending[shard]['context'].append((current_id, record['context_type'],
+                                                          json.dumps(record['context_data']), record['created_at']))
+                    else:
+                        raise ValueError(f"Unknown record type: {record_type}")
+
+                counts[record_type] += 1
+                buffered += 1
+                if buffered >= batch_size:
+                    for index, conn in enumerate(connections):
+                        flush(index, cursors[index])
+                        conn.commit()
+                    buffered = 0
+
+            for index, conn in enumerate(connections):
+                flush(index, cursors[index])
+                conn.commit()
+
+        logging.info(f"✅ Imported {counts['conversation']} conversations and {counts['message']} messages from {path}")
+        return counts
+
+    except Exception as e:
+        logging.error(f"❌ Error importing conversations: {e}")
+        raise
+
+
+def main():
+    """Export or import conversation history from the command line"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Bulk export/import of Ecokart conversation history')
+    parser.add_argument('--db', default=DATABASE_PATH, help='Path to the conversation database')
+    parser.add_argument('--shards', type=int, default=CONVERSATION_SHARDS,
+                        help='Number of shard files behind --db (defaults to CONVERSATION_SHARDS)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Write conversations to a file')
+    export_parser.add_argument('path', help='Output .jsonl/.jsonl.gz file, or a directory with --format parquet')
+    export_parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+
+    import_parser = subparsers.add_parser('import', help='Load a JSONL export')
+    import_parser.add_argument('path', help='Input .jsonl or .jsonl.gz file')
+    import_parser.add_argument('--new-ids', action='store_true', help='Assign fresh IDs instead of reusing exported ones')
+    import_parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE, help='Records per transaction')
+
+    args = parser.parse_args()
+    if args.shards <= 1 and os.path.exists(shard_path(args.db, 0)):
+        parser.error(f"{shard_path(args.db, 0)} exists: pass --shards (or set CONVERSATION_SHARDS) "
+                     f"so every shard is included")
+    db = ShardedConversationDatabase(args.db, args.shards) if args.shards > 1 else ConversationDatabase(args.db)
+
+    if args.command == 'export':
+        if args.format == 'parquet':
+            counts = export_parquet(db, args.path)
+        else:
+            counts = export_jsonl(db, args.path)
+    else:
+        counts = import_jsonl(db, args.path, batch_size=args.batch_size, keep_ids=not args.new_ids)
+    print(f"📦 {args.command.capitalize()}ed: {counts}")
+
+if __name__ == "__main__":
+    main()
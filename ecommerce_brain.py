@@ -3,6 +3,11 @@ from dotenv import load_dotenv
 from groq import Groq
 import json
 from conversation_database import ConversationDatabase
+from sharded_conversation_database import ShardedConversationDatabase, CONVERSATION_SHARDS
+from keyword_matcher import build_context_matcher
+from context_cache import ContextCache
+from memory_index import MemoryIndex, default_index_dir
+from conversation_archive import ConversationArchive
 import logging
 
 # Load environment variables from .env file
@@ -16,11 +21,23 @@ class EcommerceChatbot:
         self.conversation_history = []
         self.model = "meta-llama/llama-4-scout-17b-16e-instruct"
         self.current_conversation_id = None
-        self.db = ConversationDatabase()
+        # CONVERSATION_SHARDS > 1 spreads conversations over several SQLite files
+        self.db = ShardedConversationDatabase() if CONVERSATION_SHARDS > 1 else ConversationDatabase()
+        self.context_cache = ContextCache(self.db)
+        self._archive = None
+        
+        # Embedding index over past user messages for fuzzy cross-conversation recall
+        # One index per directory per process; other processes are coordinated by its file lock
+        self.memory_index = MemoryIndex.shared(default_index_dir(self.db.db_path))
+        self.memory_index.sync(self.db)
+        self.memory_index.prune(self.db)
         
         # Load products from data.txt
         self.products = self.load_products_from_file("data.txt")
         
+        # Compiled matcher over static keywords and catalog product names
+        self.keyword_matcher = build_context_matcher(self.products)
+        
         self.system_prompt = """You are Harvey Spectre, a friendly and knowledgeable e-commerce customer service representative. You work for Ecokart, an online retail store.
 
 Your personality:
@@ -53,20 +70,29 @@ Remember: You're here to make shopping easy and enjoyable! 😊"""
     def start_new_conversation(self, title=None, summary=None, tags=None):
         """Start a new conversation session"""
         if not title:
-            title = f"Ecokart Session - {len(self.db.get_all_conversations()) + 1}"
+            title = f"Ecokart Session - {self.db.get_next_sequence_number()}"
         
         self.current_conversation_id = self.db.create_conversation(title, summary, tags)
         self.conversation_history = []
         
+        # Snapshot prior context so per-turn lookups stay in memory
+        self.context_cache.load()
+        self.context_cache.remember_title(self.current_conversation_id, title)
+        
         logging.info(f"✅ Started new conversation: {title} (ID: {self.current_conversation_id})")
         return self.current_conversation_id
 
-    def load_conversation(self, conversation_id):
-        """Load an existing conversation"""
-        conversation = self.db.get_conversation(conversation_id)
+    def load_conversation(self, conversation_id, message_limit=50):
+        """Load an existing conversation with its most recent ``message_limit`` messages"""
+        conversation = self.db.get_conversation(conversation_id, include_messages=False)
         if conversation:
+            page = self.db.get_message_page(conversation_id, limit=message_limit)
+            conversation['messages'] = page['messages']
+            conversation['previous_cursor'] = page['previous_cursor']
             self.current_conversation_id = conversation_id
-            self.conversation_history = conversation['messages']
+            self.conversation_history = page['messages']
+            self.context_cache.load()
+            self.context_cache.remember_title(conversation_id, conversation['title'])
             logging.info(f"✅ Loaded conversation: {conversation['title']} (ID: {conversation_id})")
             return conversation
         else:
@@ -78,8 +104,12 @@ Remember: You're here to make shopping easy and enjoyable! 😊"""
         if not user_message.strip():
             return ""
         
-        # Get relevant context from database
-        relevant_contexts = self.db.get_relevant_context(user_message, limit=3)
+        # Get relevant context from the session cache
+        relevant_contexts = self.context_cache.get_relevant_context(user_message, limit=3)
+        
+        # Top up with conversations whose messages are semantically close
+        if len(relevant_contexts) < 3:
+            relevant_contexts += self._get_similar_context(user_message, relevant_contexts, 3 - len(relevant_contexts))
         
         if not relevant_contexts:
             return ""
@@ -90,6 +120,22 @@ Remember: You're here to make shopping easy and enjoyable! 😊"""
         
         return "\n".join(context_parts)
 
+    def _get_similar_context(self, user_message, existing_contexts, limit):
+        """Context from earlier conversations found through the memory index"""
+        try:
+            hits = self.memory_index.search([user_message], k=10, min_score=0.3)[0]
+        except Exception as e:
+            logging.error(f"Error searching conversation memory: {e}")
+            return []
+        seen = {context['conversation_id'] for context in existing_contexts}
+        seen.add(self.current_conversation_id)
+        conversation_ids = []
+        for hit in hits:
+            if hit['conversation_id'] not in seen:
+                seen.add(hit['conversation_id'])
+                conversation_ids.append(hit['conversation_id'])
+        return self.context_cache.get_context_for_conversations(conversation_ids, limit)
+
     def load_products_from_file(self, filepath):
         """Load products from a JSON file (data.txt)"""
         try:
@@ -114,8 +160,8 @@ Remember: You're here to make shopping easy and enjoyable! 😊"""
                 break
         return results
 
-    def get_response(self, user_message, conversation_context=""):
-        """Respond with catalog-grounded info for catalog products, otherwise use LLM. For catalog matches, override LLM output with exact catalog fields."""
+    def _prepare_turn(self, user_message, conversation_context=""):
+        """Record the user message and build the LLM messages; returns (messages, catalog_product)"""
         if self.current_conversation_id is None:
             self.start_new_conversation()
         previous_context = self.get_conversation_context(user_message)
@@ -127,6 +173,11 @@ Remember: You're here to make shopping easy and enjoyable! 😊"""
             full_context += f"Previous conversations: {previous_context}\n"
         self.conversation_history.append({"role": "user", "content": user_message})
         self.db.add_message(self.current_conversation_id, "user", user_message)
+        try:
+            # Sync rather than add, so messages other processes wrote meanwhile are not skipped
+            self.memory_index.sync(self.db)
+        except Exception as e:
+            logging.error(f"Error indexing message: {e}")
         messages = [
             {"role": "system", "content": self.system_prompt}
         ]
@@ -153,6 +204,46 @@ Remember: You're here to make shopping easy and enjoyable! 😊"""
         recent_history = self.conversation_history[-10:] if len(self.conversation_history) > 10 else self.conversation_history
         for msg in recent_history:
             messages.append({"role": msg["role"], "content": msg["content"]})
+        return messages, catalog_product
+
+    def _apply_catalog_override(self, bot_response, catalog_product):
+        """Patch LLM output with exact catalog fields for a matched product"""
+        # --- Hybrid override: patch LLM output with catalog fields if matched ---
+        if catalog_product:
+            import re
+            # Remove all price-like patterns (dollars, pounds, etc.)
+            price_patterns = [
+                r'[$£₹]\s?\d+[\d,.]*',           # $29.99, £14.99, ₹2,499.00
+                r'\d+[\d,.]*\s?(USD|usd|GBP|gbp|INR|inr|EUR|eur|dollars|pounds|rupees|euros)', # 29.99 USD, 14.99 GBP
+            ]
+            for pat in price_patterns:
+                bot_response = re.sub(pat, '', bot_response)
+            # Always insert the correct price at the top
+            price_line = f"The price for {catalog_product['name']} is £{catalog_product['price']}."
+            # Remove any empty lines at the start
+            bot_response = re.sub(r'^\s+', '', bot_response)
+            bot_response = price_line + '\n' + bot_response
+            # Replace product name if present (case-insensitive)
+            bot_response = re.sub(re.escape(catalog_product['name']), catalog_product['name'], bot_response, flags=re.IGNORECASE)
+            # Optionally, replace description if present (or append if not)
+            if catalog_product['description'] not in bot_response:
+                bot_response += f"\n\nProduct Description (from catalog): {catalog_product['description']}"
+        return bot_response
+
+    def _finish_turn(self, user_message, bot_response):
+        self.conversation_history.append({"role": "assistant", "content": bot_response})
+        self.db.add_message(self.current_conversation_id, "assistant", bot_response)
+        self._extract_and_save_context(user_message, bot_response)
+
+    def _fail_turn(self, e):
+        error_response = f"I'm having trouble connecting right now. Can you try again in a moment? 😅"
+        logging.error(f"Error generating response: {e}")
+        self.db.add_message(self.current_conversation_id, "assistant", error_response)
+        return error_response
+
+    def get_response(self, user_message, conversation_context=""):
+        """Respond with catalog-grounded info for catalog products, otherwise use LLM. For catalog matches, override LLM output with exact catalog fields."""
+        messages, catalog_product = self._prepare_turn(user_message, conversation_context)
         try:
             response = self.client.chat.completions.create(
                 messages=messages,
@@ -161,64 +252,75 @@ Remember: You're here to make shopping easy and enjoyable! 😊"""
                 temperature=0.8
             )
             bot_response = response.choices[0].message.content.strip()
-            # --- Hybrid override: patch LLM output with catalog fields if matched ---
-            if catalog_product:
-                import re
-                # Remove all price-like patterns (dollars, pounds, etc.)
-                price_patterns = [
-                    r'[$£₹]\s?\d+[\d,.]*',           # $29.99, £14.99, ₹2,499.00
-                    r'\d+[\d,.]*\s?(USD|usd|GBP|gbp|INR|inr|EUR|eur|dollars|pounds|rupees|euros)', # 29.99 USD, 14.99 GBP
-                ]
-                for pat in price_patterns:
-                    bot_response = re.sub(pat, '', bot_response)
-                # Always insert the correct price at the top
-                price_line = f"The price for {catalog_product['name']} is £{catalog_product['price']}."
-                # Remove any empty lines at the start
-                bot_response = re.sub(r'^\s+', '', bot_response)
-                bot_response = price_line + '\n' + bot_response
-                # Replace product name if present (case-insensitive)
-                bot_response = re.sub(re.escape(catalog_product['name']), catalog_product['name'], bot_response, flags=re.IGNORECASE)
-                # Optionally, replace description if present (or append if not)
-                if catalog_product['description'] not in bot_response:
-                    bot_response += f"\n\nProduct Description (from catalog): {catalog_product['description']}"
-            self.conversation_history.append({"role": "assistant", "content": bot_response})
-            self.db.add_message(self.current_conversation_id, "assistant", bot_response)
-            self._extract_and_save_context(user_message, bot_response)
+            bot_response = self._apply_catalog_override(bot_response, catalog_product)
+            self._finish_turn(user_message, bot_response)
             return bot_response
         except Exception as e:
-            error_response = f"I'm having trouble connecting right now. Can you try again in a moment? 😅"
-            logging.error(f"Error generating response: {e}")
-            self.db.add_message(self.current_conversation_id, "assistant", error_response)
-            return error_response
+            return self._fail_turn(e)
+
+    def stream_response(self, user_message, conversation_context=""):
+        """Like get_response, but yield the reply in pieces as the LLM produces them.
+
+        Catalog matches are rewritten after generation, so those replies are
+        yielded whole once the override has been applied.
+        """
+        messages, catalog_product = self._prepare_turn(user_message, conversation_context)
+        try:
+            if catalog_product:
+                response = self.client.chat.completions.create(
+                    messages=messages,
+                    model=self.model,
+                    max_tokens=300,
+                    temperature=0.8
+                )
+                bot_response = self._apply_catalog_override(response.choices[0].message.content.strip(), catalog_product)
+                self._finish_turn(user_message, bot_response)
+                yield bot_response
+                return
+
+            stream = self.client.chat.completions.create(
+                messages=messages,
+                model=self.model,
+                max_tokens=300,
+                temperature=0.8,
+                stream=True
+            )
+            parts = []
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            self._finish_turn(user_message, "".join(parts).strip())
+        except Exception as e:
+            yield self._fail_turn(e)
 
     def _extract_and_save_context(self, user_message, bot_response):
         """Extract relevant context from the conversation and save it"""
         try:
-            # Simple context extraction - in a real app, you might use NLP
+            # Single pass over the message for products, budgets and order intent
             context_data = {}
+            matches = self.keyword_matcher.extract(user_message)
             
             # Extract product interests
-            product_keywords = ["laptop", "phone", "smartphone", "shirt", "jeans", "coffee", "blender"]
-            for keyword in product_keywords:
-                if keyword.lower() in user_message.lower():
-                    context_data["product_interest"] = keyword
+            product_interests = matches.get("product_interest", [])
+            if product_interests:
+                context_data["product_interest"] = product_interests[0]
+                if len(product_interests) > 1:
+                    context_data["product_interests"] = product_interests
             
             # Extract budget information
-            import re
-            budget_match = re.search(r'\$(\d+)', user_message)
-            if budget_match:
-                context_data["budget"] = int(budget_match.group(1))
+            budgets = matches.get("budget", [])
+            if budgets:
+                context_data["budget"] = budgets[0]
             
             # Extract order-related information
-            order_keywords = ["order", "ordered", "purchase", "bought", "shipping", "delivery"]
-            for keyword in order_keywords:
-                if keyword.lower() in user_message.lower():
-                    context_data["order_related"] = True
-                    break
+            if matches.get("order_related"):
+                context_data["order_related"] = True
             
             # Save context if any was extracted
             if context_data:
-                self.db.add_conversation_context(self.current_conversation_id, "conversation_context", context_data)
+                self.context_cache.add_context(self.current_conversation_id, "conversation_context", context_data)
                 
         except Exception as e:
             logging.error(f"Error extracting context: {e}")
@@ -278,11 +380,11 @@ Remember: You're here to make shopping easy and enjoyable! 😊"""
         if not self.current_conversation_id:
             return "No active conversation"
         
-        conversation = self.db.get_conversation(self.current_conversation_id)
+        conversation = self.db.get_conversation(self.current_conversation_id, include_messages=False)
         if conversation:
             return {
                 'title': conversation['title'],
-                'message_count': len(conversation['messages']),
+                'message_count': conversation['message_count'],
                 'created_at': conversation['created_at'],
                 'updated_at': conversation['updated_at'],
                 'tags': conversation['tags']
@@ -297,6 +399,36 @@ Remember: You're here to make shopping easy and enjoyable! 😊"""
         """Search through conversation history"""
         return self.db.search_conversations(query)
 
+    def search_conversations_page(self, query, page_size=10, cursor=None, highlight=("<mark>", "</mark>")):
+        """Search conversation history one ranked page at a time"""
+        return self.db.search_conversations_page(query, page_size=page_size, cursor=cursor, highlight=highlight)
+
+    @property
+    def archive(self):
+        """Cold-storage archive, opened on first use"""
+        if self._archive is None:
+            self._archive = ConversationArchive(self.db)
+        return self._archive
+
+    def search_archived_conversations(self, query, limit=10):
+        """Search conversations that were moved to the archive"""
+        return self.archive.search_archive(query, limit)
+
+    def restore_archived_conversation(self, conversation_id):
+        """Bring an archived conversation back so it can be loaded"""
+        restored = self.archive.restore_conversation(conversation_id)
+        if restored:
+            # Restored messages keep their old IDs, below the index's high-water mark
+            try:
+                self.memory_index.remove_conversations([conversation_id])
+                messages = [message for message in self.db.iter_messages(conversation_id) if message['role'] == 'user']
+                self.memory_index.add([message['message_id'] for message in messages],
+                                      [conversation_id] * len(messages),
+                                      [message['content'] for message in messages])
+            except Exception as e:
+                logging.error(f"Error re-indexing restored conversation: {e}")
+        return restored
+
 # Example usage
 if __name__ == "__main__":
     chatbot = EcommerceChatbot()
@@ -6,6 +6,7 @@ import gradio as gr
 import logging
 from ecommerce_brain import EcommerceChatbot
 from ecommerce_voice_assistant import EcommerceVoiceAssistant
+from audio_utils import AUDIO_EXTENSIONS
 
 # Setup logging to file
 logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
@@ -55,7 +56,10 @@ class EcommerceGradioApp:
             bot_response = self.chatbot.get_response(transcribed_text)
             
             # Convert response to speech
-            response_audio = self.voice_assistant.text_to_speech(bot_response, "gradio_response.wav")
+            # Compressed (MP3/Opus per AUDIO_OUTPUT_CODEC) to keep the browser payload small
+            extension = AUDIO_EXTENSIONS.get(self.voice_assistant.output_codec, "wav")
+            response_audio = self.voice_assistant.text_to_speech(bot_response, f"gradio_response.{extension}",
+                                                                 codec=self.voice_assistant.output_codec)
             
             # Clean up temp audio file
             try:
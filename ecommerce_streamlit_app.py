@@ -1,14 +1,12 @@
 import streamlit as st
 import os
-import tempfile
+import html
 import logging
 from dotenv import load_dotenv
 from ecommerce_brain import EcommerceChatbot
 from ecommerce_voice_assistant import EcommerceVoiceAssistant
+from audio_utils import AUDIO_EXTENSIONS, AUDIO_MIME_TYPES
 import time
-import sqlite3
-import uuid
-import glob
 
 # Load environment variables
 load_dotenv()
@@ -142,6 +140,16 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Private-use characters FTS5 wraps around search hits; they survive html.escape
+# and are swapped for <mark> tags only after the snippet text has been escaped
+SNIPPET_HIGHLIGHT = ("\ue000", "\ue001")
+
+def snippet_html(snippet):
+    """Escape a search snippet for display, keeping its hit highlighting"""
+    return (html.escape(snippet)
+            .replace(SNIPPET_HIGHLIGHT[0], "<mark>")
+            .replace(SNIPPET_HIGHLIGHT[1], "</mark>"))
+
 @st.cache_resource
 def load_app():
     """Load and cache the main app class to preserve state across reruns"""
@@ -169,30 +177,42 @@ class EcommerceStreamlitApp:
             st.session_state.current_conversation_id = None
         if 'conversations_loaded' not in st.session_state:
             st.session_state.conversations_loaded = False
+        if 'search_results' not in st.session_state:
+            st.session_state.search_results = None
+        if 'search_cursor' not in st.session_state:
+            st.session_state.search_cursor = None
+        if 'earlier_messages_cursor' not in st.session_state:
+            st.session_state.earlier_messages_cursor = None
         # Also set the backend voice assistant to gTTS by default
         self.voice_assistant.set_tts_provider("gtts")
             
+    def synthesize_response(self, bot_response):
+        """Synthesize a reply in memory, compressed for the browser; returns {'audio': bytes, 'format': codec} or None"""
+        audio, audio_format = self.voice_assistant.text_to_speech_bytes(bot_response, codec=self.voice_assistant.output_codec)
+        if audio is None:
+            return None
+        # st.audio needs bytes rather than a memoryview
+        return {'audio': bytes(audio), 'format': audio_format}
+
     def process_text_input(self, user_message):
-        """Process text input and return response and audio path"""
+        """Process text input and return response and audio"""
         if not user_message.strip():
             return None, None
         try:
             # Generate response using chatbot with conversation context
             bot_response = self.chatbot.get_response(user_message)
             # Generate TTS audio for the response
-            import uuid, os
-            audio_filename = f"streamlit_response_{uuid.uuid4().hex}.wav"
-            audio_filepath = os.path.abspath(audio_filename)
-            response_audio_path = self.voice_assistant.text_to_speech(bot_response, audio_filepath)
+            response_audio = self.synthesize_response(bot_response)
             # After first user message, auto-update title if default
             conv_id = self.chatbot.current_conversation_id
-            conversation = self.chatbot.db.get_conversation(conv_id)
+            conversation = self.chatbot.db.get_conversation(conv_id, include_messages=False)
             if conversation:
                 current_title = conversation.get('title', '')
                 if not current_title or current_title.lower() in ["general inquiry", "ecokart session", "untitled"] or current_title.lower().startswith("ecokart session"):
+                    conversation = self.chatbot.db.get_conversation(conv_id)
                     new_title = self.smart_auto_title(conversation)
                     self.update_conversation_title(conv_id, new_title)
-            return bot_response, response_audio_path
+            return bot_response, response_audio
         except Exception as e:
             logging.error(f"Error processing text input: {e}")
             return "I'm sorry, I'm having trouble processing your request right now. Could you try again?", None
@@ -204,30 +224,15 @@ class EcommerceStreamlitApp:
             return None, None, None
         try:
             self.voice_assistant.set_tts_provider(tts_provider)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-                tmp_file.write(audio_file.read())
-                tmp_file_path = tmp_file.name
-            transcribed_text = self.voice_assistant.transcribe_audio(tmp_file_path)
-            os.unlink(tmp_file_path)
+            transcribed_text = self.voice_assistant.transcribe_audio_bytes(audio_file.getvalue(), audio_file.name)
             if not transcribed_text:
                 return "Could not understand your speech. Please try again.", None, None
             bot_response = self.chatbot.get_response(transcribed_text)
-            # Use an absolute path for the audio file
-            audio_filename = f"streamlit_response_{uuid.uuid4().hex}.wav"
-            audio_filepath = os.path.abspath(audio_filename)
-            response_audio_path = self.voice_assistant.text_to_speech(bot_response, audio_filepath)
-            print(f"[DEBUG] Audio path: {response_audio_path}, Exists: {os.path.exists(response_audio_path) if response_audio_path else 'None'}")
-            if not response_audio_path or not os.path.exists(response_audio_path):
-                st.error("❌ Audio file could not be generated. Please check your TTS provider, API key, or try a different provider.")
+            response_audio = self.synthesize_response(bot_response)
+            if not response_audio:
+                st.error("❌ Audio could not be generated. Please check your TTS provider, API key, or try a different provider.")
                 return transcribed_text, bot_response, None
-            # Clean up old audio files to avoid clutter
-            for f in os.listdir('.'):
-                if f.startswith('streamlit_response_') and f.endswith('.wav') and os.path.abspath(f) != audio_filepath:
-                    try:
-                        os.remove(f)
-                    except Exception:
-                        pass
-            return transcribed_text, bot_response, response_audio_path
+            return transcribed_text, bot_response, response_audio
         except Exception as e:
             logging.error(f"Error processing voice input: {e}")
             st.error(f"❌ Error processing audio: {e}")
@@ -238,33 +243,20 @@ class EcommerceStreamlitApp:
         print("[DEBUG] Streamlit CWD:", os.getcwd())
         try:
             self.voice_assistant.set_tts_provider(tts_provider)
-            audio_file_path = self.voice_assistant.record_audio("temp_streamlit_audio.wav")
-            if not audio_file_path or not os.path.exists(audio_file_path):
+            recorded_audio = self.voice_assistant.record_audio_bytes()
+            if not recorded_audio:
                 st.error("❌ No audio recorded.\n\n**Troubleshooting:**\n- Make sure your browser has microphone access (look for a mic icon in the address bar and click 'Allow').\n- Check your system sound settings to ensure your microphone is enabled.\n- Try a different browser (Chrome recommended).\n- If the problem persists, use the 'Upload Audio File' option below to send a pre-recorded message.")
                 return "No audio recorded. Please check your microphone permissions and try again.", None, None
-            transcribed_text = self.voice_assistant.transcribe_audio(audio_file_path)
+            transcribed_text = self.voice_assistant.transcribe_audio_bytes(recorded_audio)
             if not transcribed_text:
                 st.error("❌ Could not understand your speech. Please try again.")
                 return "Could not understand your speech. Please try again.", None, None
             bot_response = self.chatbot.get_response(transcribed_text)
-            # Use an absolute path for the audio file
-            audio_filename = f"streamlit_response_{uuid.uuid4().hex}.wav"
-            audio_filepath = os.path.abspath(audio_filename)
-            response_audio_path = self.voice_assistant.text_to_speech(bot_response, audio_filepath)
-            print(f"[DEBUG] Audio path: {response_audio_path}, Exists: {os.path.exists(response_audio_path) if response_audio_path else 'None'}")
-            if not response_audio_path or not os.path.exists(response_audio_path):
-                st.error("❌ Audio file could not be generated. Please check your TTS provider, API key, or try a different provider.")
+            response_audio = self.synthesize_response(bot_response)
+            if not response_audio:
+                st.error("❌ Audio could not be generated. Please check your TTS provider, API key, or try a different provider.")
                 return transcribed_text, bot_response, None
-            if os.path.exists(audio_file_path):
-                os.unlink(audio_file_path)
-            # Clean up old audio files to avoid clutter
-            for f in os.listdir('.'):
-                if f.startswith('streamlit_response_') and f.endswith('.wav') and os.path.abspath(f) != audio_filepath:
-                    try:
-                        os.remove(f)
-                    except Exception:
-                        pass
-            return transcribed_text, bot_response, response_audio_path
+            return transcribed_text, bot_response, response_audio
         except Exception as e:
             logging.error(f"Error recording from microphone: {e}")
             st.error(f"❌ Error recording audio: {e}")
@@ -300,6 +292,7 @@ class EcommerceStreamlitApp:
             conversation = self.chatbot.load_conversation(conversation_id)
             if conversation:
                 st.session_state.messages = conversation['messages']
+                st.session_state.earlier_messages_cursor = conversation['previous_cursor']
                 st.session_state.current_conversation_id = conversation_id
                 self.display_status_message(f"Successfully loaded conversation: {conversation['title']}", "success")
             else:
@@ -312,19 +305,15 @@ class EcommerceStreamlitApp:
     def smart_auto_title(self, conversation):
         """Auto-title a conversation based on its content."""
         # Use keywords or generate a summary
-        keywords = ["refund", "return", "order", "payment", "shipping", "cancel", "exchange"]
-        product_keywords = [
-            "iphone", "samsung", "laptop", "macbook", "jeans", "shirt", "coffee", "blender",
-            "shoes", "sneakers", "sandals", "boots", "heels", "slippers", "t-shirt", "dress", "jacket", "bag", "watch", "phone", "tablet", "headphones", "camera"
-        ]
         user_msgs = [msg['content'].lower() for msg in conversation['messages'] if msg['role'] == 'user']
         all_text = " ".join(user_msgs)
-        for word in keywords:
-            if word in all_text:
-                return word.capitalize()
-        for word in product_keywords:
-            if word in all_text:
-                return word.capitalize()
+        best_matches = self.chatbot.keyword_matcher.best(all_text)
+        if "topic" in best_matches:
+            return best_matches["topic"].capitalize()
+        if "product_interest" in best_matches:
+            product = best_matches["product_interest"]
+            # Catalog product names keep their own casing
+            return product if product != product.lower() else product.capitalize()
         # Try to extract a relevant noun from the first user message
         if user_msgs:
             import re
@@ -340,10 +329,7 @@ class EcommerceStreamlitApp:
     def update_conversation_title(self, conversation_id, new_title):
         self.chatbot.db.update_conversation_summary(conversation_id, new_title)
         # Also update the title in the conversations table
-        with sqlite3.connect(self.chatbot.db.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("UPDATE conversations SET title = ? WHERE conversation_id = ?", (new_title, conversation_id))
-            conn.commit()
+        self.chatbot.db.update_conversation_title(conversation_id, new_title)
 
     def create_interface(self):
         """Create the Streamlit interface"""
@@ -372,15 +358,24 @@ class EcommerceStreamlitApp:
                 with col_conv1:
                     # Search conversations
                     search_query = st.text_input("Search conversations:", placeholder="Type to search...")
+                    include_archived = st.checkbox("Include archived conversations", value=False)
                     
                 with col_conv2:
                     if st.button("🔍 Search", type="secondary"):
                         if search_query:
-                            conversations = self.chatbot.search_conversations(search_query)
+                            page = self.chatbot.search_conversations_page(search_query, highlight=SNIPPET_HIGHLIGHT)
+                            st.session_state.search_results = page['conversations']
+                            st.session_state.search_cursor = page['next_cursor']
                         else:
-                            conversations = self.chatbot.list_conversations(10)
-                    else:
-                        conversations = self.chatbot.list_conversations(10)
+                            st.session_state.search_results = None
+                            st.session_state.search_cursor = None
+                
+                if st.session_state.search_results is not None and search_query:
+                    conversations = st.session_state.search_results
+                else:
+                    st.session_state.search_results = None
+                    st.session_state.search_cursor = None
+                    conversations = self.chatbot.list_conversations(10)
                 
                 # Display conversations
                 if conversations:
@@ -399,9 +394,10 @@ class EcommerceStreamlitApp:
                             with col_info:
                                 st.markdown(f"""
                                 <div class="conversation-item {'active' if is_active else ''}">
-                                    <strong>{display_title}</strong><br>
+                                    <strong>{html.escape(display_title)}</strong><br>
                                     <small>📅 {conv['updated_at']} | 💬 {conv['message_count']} messages</small>
-                                    {f"<br><small>🏷️ {', '.join(conv['tags'])}</small>" if conv['tags'] else ""}
+                                    {f"<br><small>🏷️ {html.escape(', '.join(conv['tags']))}</small>" if conv['tags'] else ""}
+                                    {f"<br><small>🔍 {snippet_html(conv['snippet'])}</small>" if conv.get('snippet') else ""}
                                 </div>
                                 """, unsafe_allow_html=True)
                             with col_load:
@@ -417,14 +413,42 @@ class EcommerceStreamlitApp:
                                     self.update_conversation_title(conv['conversation_id'], new_title)
                                     st.success("Title updated!")
                                     st.rerun()
+                    # Fetch the next page of search results on demand
+                    if st.session_state.search_cursor and st.button("⬇️ More results", key="search_more"):
+                        page = self.chatbot.search_conversations_page(search_query, cursor=st.session_state.search_cursor,
+                                                                       highlight=SNIPPET_HIGHLIGHT)
+                        st.session_state.search_results = st.session_state.search_results + page['conversations']
+                        st.session_state.search_cursor = page['next_cursor']
+                        st.rerun()
                 else:
                     st.info("No conversations found. Start chatting to create your first conversation!")
                 
+                # Archived conversations are only searched when asked for
+                if include_archived and search_query and st.session_state.search_results is not None:
+                    archived = self.chatbot.search_archived_conversations(search_query)
+                    if archived:
+                        st.markdown("#### Archived Conversations:")
+                    for conv in archived:
+                        col_info, col_restore = st.columns([4, 1])
+                        with col_info:
+                            st.markdown(f"""
+                            <div class="conversation-item">
+                                <strong>📦 {html.escape(conv['title'] or '')}</strong><br>
+                                <small>📅 {conv['updated_at']} | 💬 {conv['message_count']} messages</small>
+                            </div>
+                            """, unsafe_allow_html=True)
+                        with col_restore:
+                            if st.button("Restore", key=f"restore_{conv['conversation_id']}"):
+                                if self.chatbot.restore_archived_conversation(conv['conversation_id']):
+                                    self.load_conversation_messages(conv['conversation_id'])
+                                    st.rerun()
+                
                 # New conversation button
                 if st.button("🆕 Start New Conversation", type="primary"):
                     self.chatbot.start_new_conversation()
                     st.session_state.current_conversation_id = self.chatbot.current_conversation_id
                     st.session_state.messages = []
+                    st.session_state.earlier_messages_cursor = None
                     st.success("✅ Started new conversation!")
                     st.rerun()
             
@@ -450,6 +474,17 @@ class EcommerceStreamlitApp:
             chat_container = st.container()
             
             with chat_container:
+                # Older messages of a resumed conversation are fetched on demand
+                if st.session_state.earlier_messages_cursor and st.session_state.current_conversation_id:
+                    if st.button("⬆️ Load earlier messages", key="load_earlier"):
+                        page = self.chatbot.db.get_message_page(
+                            st.session_state.current_conversation_id,
+                            before=st.session_state.earlier_messages_cursor
+                        )
+                        st.session_state.messages = page['messages'] + st.session_state.messages
+                        st.session_state.earlier_messages_cursor = page['previous_cursor']
+                        st.rerun()
+                
                 # Display chat messages
                 for message in st.session_state.messages:
                     self.display_chat_message(message["role"], message["content"])
@@ -493,12 +528,12 @@ class EcommerceStreamlitApp:
                 # Process recording if active
                 if st.session_state.is_recording:
                     with st.spinner("🎤 Recording and processing..."):
-                        transcribed_text, bot_response, audio_response_path = self.record_audio_from_microphone(tts_provider)
+                        transcribed_text, bot_response, response_audio = self.record_audio_from_microphone(tts_provider)
                         if transcribed_text and bot_response:
                             st.session_state.messages.append({"role": "user", "content": f"[Voice] {transcribed_text}"})
                             st.session_state.messages.append({"role": "assistant", "content": bot_response})
-                            if audio_response_path:
-                                st.session_state.audio_response = audio_response_path
+                            if response_audio:
+                                st.session_state.audio_response = response_audio
                             st.session_state.voice_status = "✅ Voice processed successfully!"
                         else:
                             st.session_state.voice_status = f"❌ {transcribed_text}"
@@ -525,12 +560,12 @@ class EcommerceStreamlitApp:
                 # Process file upload
                 if voice_submit and audio_file:
                     with st.spinner("🎤 Processing voice input..."):
-                        transcribed_text, bot_response, audio_response_path = self.process_voice_input(audio_file, tts_provider)
+                        transcribed_text, bot_response, response_audio = self.process_voice_input(audio_file, tts_provider)
                         if transcribed_text and bot_response:
                             st.session_state.messages.append({"role": "user", "content": f"[Voice] {transcribed_text}"})
                             st.session_state.messages.append({"role": "assistant", "content": bot_response})
-                            if audio_response_path:
-                                st.session_state.audio_response = audio_response_path
+                            if response_audio:
+                                st.session_state.audio_response = response_audio
                             st.session_state.voice_status = "✅ Voice processed successfully!"
                         else:
                             st.session_state.voice_status = f"❌ {transcribed_text}"
@@ -539,6 +574,7 @@ class EcommerceStreamlitApp:
             # Clear chat button
             if st.button("🗑️ Clear Chat", type="secondary"):
                 st.session_state.messages = []
+                st.session_state.earlier_messages_cursor = None
                 st.session_state.audio_response = None
                 st.session_state.voice_status = None
                 st.rerun()
@@ -549,28 +585,23 @@ class EcommerceStreamlitApp:
                 st.session_state.messages.append({"role": "user", "content": text_input})
                 
                 # Get bot response and audio
-                bot_response, audio_response_path = self.process_text_input(text_input)
+                bot_response, response_audio = self.process_text_input(text_input)
                 if bot_response:
                     st.session_state.messages.append({"role": "assistant", "content": bot_response})
-                if audio_response_path:
-                    st.session_state.audio_response = audio_response_path
+                if response_audio:
+                    st.session_state.audio_response = response_audio
                 st.rerun()
             
-            # Display audio response if available
-            print("[DEBUG] st.session_state.audio_response:", st.session_state.audio_response)
-            audio_file_path = st.session_state.audio_response if 'audio_response' in st.session_state else None
-            # Fallback: find the most recent streamlit_response_*.wav file if state is missing
-            if not audio_file_path or not os.path.exists(audio_file_path):
-                audio_files = sorted(glob.glob(os.path.abspath('streamlit_response_*.wav')), key=os.path.getmtime, reverse=True)
-                if audio_files:
-                    audio_file_path = audio_files[0]
-            if audio_file_path and os.path.exists(audio_file_path):
-                with open(audio_file_path, "rb") as audio_file:
-                    audio_bytes = audio_file.read()
-                    st.audio(audio_bytes, format="audio/wav")
-                    st.download_button("Download audio", audio_bytes, file_name=os.path.basename(audio_file_path))
+            # Display audio response if available (held in session state, never written to disk)
+            response_audio = st.session_state.get('audio_response')
+            if response_audio:
+                audio_format = response_audio['format']
+                mime_type = AUDIO_MIME_TYPES[audio_format]
+                st.audio(response_audio['audio'], format=mime_type)
+                st.download_button("Download audio", response_audio['audio'],
+                                   file_name=f"response.{AUDIO_EXTENSIONS[audio_format]}", mime=mime_type)
             else:
-                st.warning("No audio file found to play. Please check your TTS provider, API key, or try again.")
+                st.warning("No audio response to play. Please check your TTS provider, API key, or try again.")
         
         with col2:
             st.markdown("### 🎯 What I can help with:")
@@ -640,6 +671,7 @@ class EcommerceStreamlitApp:
             # Database statistics
             try:
                 stats = self.chatbot.db.get_conversation_statistics()
+                messages_today = sum(hour['messages_added'] for hour in self.chatbot.db.get_hourly_statistics(24))
                 st.markdown("### 📊 Conversation Stats:")
                 st.markdown(f"""
                 <div class="feature-box">
@@ -648,6 +680,7 @@ class EcommerceStreamlitApp:
                         <li>📝 Total messages: {stats['total_messages']}</li>
                         <li>🆕 Recent conversations: {stats['recent_conversations']}</li>
                         <li>📈 Avg messages/conv: {stats['average_messages_per_conversation']}</li>
+                        <li>⏱️ Messages in last 24h: {messages_today}</li>
                     </ul>
                 </div>
                 """, unsafe_allow_html=True)
@@ -1,16 +1,26 @@
 import os
+import re
+import queue
 import logging
+import threading
 import speech_recognition as sr
 from pydub import AudioSegment
 from io import BytesIO
-import numpy as np
 import subprocess
 import platform
+import tempfile
+import shutil
+import time
 from groq import Groq
-import elevenlabs
 from elevenlabs.client import ElevenLabs
 from gtts import gTTS
 from ecommerce_brain import EcommerceChatbot
+from audio_utils import AUDIO_EXTENSIONS, PcmBuffer, encode_audio, normalize_for_stt, pcm_to_wav, read_wav
+from voice_metrics import LatencyTracker
+from tts_cache import TTSCache, tts_cache_key
+from voice_activity import trim_silence
+from chunked_stt import STT_CHUNK_MIN_SECONDS, STT_CHUNK_WORKERS, split_for_transcription, transcribe_chunks
+from stt_providers import STT_FALLBACK_PROVIDER, STT_PROVIDER, GroqWhisperSTT, SidecarTranscriptSTT
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -18,8 +28,51 @@ load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# ElevenLabs raw PCM output: 16-bit mono at this rate
+ELEVENLABS_SAMPLE_RATE = 22050
+# Bitrates (kbps) ElevenLabs can return as native MP3, skipping a local encode
+ELEVENLABS_MP3_BITRATES = {32, 64, 96, 128, 192}
+
+# Codec for audio uploaded for transcription: "wav" (16 kHz mono PCM) or "flac" (lossless, about half the size)
+STT_UPLOAD_CODEC = os.environ.get("STT_UPLOAD_CODEC", "wav")
+
+# Codec for replies sent to browsers: "mp3", "opus" or "wav" (uncompressed)
+AUDIO_OUTPUT_CODEC = os.environ.get("AUDIO_OUTPUT_CODEC", "mp3")
+AUDIO_OUTPUT_BITRATE = os.environ.get("AUDIO_OUTPUT_BITRATE", "64k")
+
+# Fixed prompts, prewarmed into the TTS cache when the voice loop starts
+WELCOME_TEXT = "Hi there! I'm Harvey Spectre, your friendly shopping assistant at Ecokart. I'm here to help you find the perfect products, answer questions about orders, or assist with anything else you need. What can I help you with today?"
+GOODBYE_TEXT = "Thanks for chatting with me! Have a great day and happy shopping!"
+SWITCH_TO_GTTS_TEXT = "Switched to Google Text-to-Speech. You'll notice a different voice now!"
+SWITCH_TO_ELEVENLABS_TEXT = "Switched to ElevenLabs. You'll hear a more natural voice now!"
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) before whitespace, or a line break.
+# "£14.99" and "3.5mm" are not boundaries because no whitespace follows the dot.
+_SENTENCE_END = re.compile(r'[.!?…]+["\')\]]*(?=\s)|\n')
+
+def split_sentences(chunks, min_chars=20):
+    """
+    Regroup streamed text into sentences, yielding each as soon as it is complete
+    
+    Fragments shorter than ``min_chars`` are merged into the following
+    sentence so that very short clips do not each pay TTS request overhead.
+    """
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        while True:
+            match = _SENTENCE_END.search(pending, min(min_chars, len(pending)))
+            if not match:
+                break
+            sentence, pending = pending[:match.end()].strip(), pending[match.end():].lstrip()
+            if sentence:
+                yield sentence
+    if pending.strip():
+        yield pending.strip()
+
 class EcommerceVoiceAssistant:
-    def __init__(self, tts_provider="elevenlabs"):
+    def __init__(self, tts_provider="elevenlabs", stream_tts=True, pipeline_tts=True, use_tts_cache=True,
+                 stt_provider=STT_PROVIDER):
         self.groq_api_key = os.environ.get("GROQ_API_KEY")
         self.elevenlabs_api_key = os.environ.get("ELEVEN_API_KEY")
         if not self.groq_api_key:
@@ -27,9 +80,22 @@ class EcommerceVoiceAssistant:
         if not self.elevenlabs_api_key:
             raise RuntimeError("ELEVEN_API_KEY is missing! Please add it to your .env file in the project root.")
         self.stt_model = "whisper-large-v3"
+        # Downmix/resample to 16 kHz mono, trim silence and skip clips with no speech before upload
+        self.normalize_stt_audio = True
+        self.vad_enabled = True
+        self.stt_upload_codec = STT_UPLOAD_CODEC
+        # Long clips are split at pauses and transcribed concurrently (needs VAD)
+        self.chunked_stt = True
+        self.stt_chunk_workers = STT_CHUNK_WORKERS
+        self.last_speech_activity = None
         
         # Initialize components
         self.groq_client = Groq(api_key=self.groq_api_key)
+        
+        # STT provider selection, with an optional fallback for failures and timeouts
+        self.stt_provider = self._create_stt_provider(stt_provider)
+        self.stt_fallback = self._create_stt_provider(STT_FALLBACK_PROVIDER) if STT_FALLBACK_PROVIDER else None
+        
         self.elevenlabs_client = ElevenLabs(api_key=self.elevenlabs_api_key)
         self.chatbot = EcommerceChatbot()
         
@@ -44,8 +110,38 @@ class EcommerceVoiceAssistant:
         self.gtts_language = "en"
         self.gtts_slow = False
         
+        # Play ElevenLabs speech while it is still being synthesized
+        self.stream_tts = stream_tts
+        # Speak replies sentence by sentence while the LLM is still generating
+        self.pipeline_tts = pipeline_tts
+        self.metrics = LatencyTracker()
+        # Synthesized clips keyed by (provider, voice, model, text); repeats cost no API quota
+        self.tts_cache = TTSCache() if use_tts_cache else None
+        
+        # Web delivery codec (the CLI plays provider-native audio)
+        self.output_codec = AUDIO_OUTPUT_CODEC
+        self.output_bitrate = AUDIO_OUTPUT_BITRATE
+        
         logging.info(f"🎤 TTS Provider: {self.tts_provider}")
+        logging.info(f"👂 STT Provider: {self.stt_provider.name}")
         
+    def _create_stt_provider(self, provider):
+        provider = provider.lower()
+        if provider in ["groq", "whisper"]:
+            return GroqWhisperSTT(self.groq_client, self.stt_model)
+        elif provider in ["groq-turbo", "turbo"]:
+            return GroqWhisperSTT(self.groq_client, "whisper-large-v3-turbo", name="groq-turbo")
+        elif provider in ["sidecar", "offline"]:
+            return SidecarTranscriptSTT()
+        else:
+            logging.warning(f"Unknown STT provider: {provider}. Using Groq Whisper.")
+            return GroqWhisperSTT(self.groq_client, self.stt_model)
+
+    def set_stt_provider(self, provider):
+        """Change STT provider on the fly"""
+        self.stt_provider = self._create_stt_provider(provider)
+        logging.info(f"👂 Switched to {self.stt_provider.name} STT")
+
     def set_tts_provider(self, provider):
         """Change TTS provider on the fly"""
         provider = provider.lower()
@@ -59,9 +155,9 @@ class EcommerceVoiceAssistant:
             logging.warning(f"Unknown TTS provider: {provider}. Using ElevenLabs.")
             self.tts_provider = "elevenlabs"
         
-    def record_audio(self, file_path="temp_audio.wav", timeout=10, phrase_time_limit=8):
+    def record_audio_bytes(self, timeout=10, phrase_time_limit=8):
         """
-        Record audio from microphone and save as WAV file
+        Record audio from microphone and return it as in-memory WAV bytes
         """
         recognizer = sr.Recognizer()
         
@@ -75,13 +171,8 @@ class EcommerceVoiceAssistant:
                 audio_data = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
                 logging.info("✅ Recording complete.")
                 
-                # Convert to WAV file
-                wav_data = audio_data.get_wav_data()
-                audio_segment = AudioSegment.from_wav(BytesIO(wav_data))
-                audio_segment.export(file_path, format="wav", bitrate="128k")
-                
-                logging.info(f"💾 Audio saved to {file_path}")
-                return file_path
+                # speech_recognition already builds a complete WAV in memory
+                return audio_data.get_wav_data()
 
         except sr.WaitTimeoutError:
             logging.warning("⏰ No speech detected within timeout period")
@@ -90,25 +181,117 @@ class EcommerceVoiceAssistant:
             logging.error(f"❌ Error recording audio: {e}")
             return None
 
+    def record_audio(self, file_path="temp_audio.wav", timeout=10, phrase_time_limit=8):
+        """
+        Record audio from microphone and save as WAV file
+        """
+        wav_data = self.record_audio_bytes(timeout, phrase_time_limit)
+        if wav_data is None:
+            return None
+        with open(file_path, "wb") as f:
+            f.write(wav_data)
+        logging.info(f"💾 Audio saved to {file_path}")
+        return file_path
+
+    def _prepare_for_stt(self, audio, filename):
+        """
+        Shrink a recording before upload: 16 kHz mono, silence trimmed
+        
+        Returns (uploads, filename, overlapped), or None when the clip holds no speech.
+        ``uploads`` holds one clip, or several chunks when a long clip is split;
+        ``overlapped`` flags the chunks that share audio with the one before.
+        """
+        started = time.perf_counter()
+        original_size = len(audio)
+
+        if self.normalize_stt_audio:
+            try:
+                audio, filename = normalize_for_stt(audio), "audio.wav"
+            except Exception as e:
+                # Undecodable here (e.g. no ffmpeg for an M4A upload): Whisper can still take the original
+                logging.warning(f"⚠️ Could not normalize audio for transcription, uploading as-is: {e}")
+
+        uploads, overlapped = [audio], [False]
+        if self.vad_enabled:
+            try:
+                trimmed, activity = trim_silence(audio)
+            except ValueError:
+                # Not 16-bit PCM WAV: send it untouched
+                activity = None
+            if activity is not None:
+                self.last_speech_activity = activity
+                logging.info(f"🗣️ {activity.speech_seconds:.1f}s of speech in a {activity.total_seconds:.1f}s clip")
+                if not activity.has_speech:
+                    logging.warning("🔇 No speech detected; skipping transcription")
+                    self.metrics.increment("stt_calls_skipped")
+                    return None
+                start, end = activity.bounds
+                if self.chunked_stt and (end - start) / activity.sample_rate >= STT_CHUNK_MIN_SECONDS:
+                    uploads, overlapped = split_for_transcription(audio, activity)
+                    logging.info(f"✂️ Split {(end - start) / activity.sample_rate:.0f}s of speech into {len(uploads)} chunks")
+                else:
+                    uploads = [trimmed]
+
+        if self.stt_upload_codec != "wav" and filename.endswith(".wav"):
+            try:
+                uploads = [encode_audio(upload, "wav", self.stt_upload_codec) for upload in uploads]
+                filename = f"audio.{AUDIO_EXTENSIONS[self.stt_upload_codec]}"
+            except Exception as e:
+                logging.warning(f"⚠️ Could not encode {self.stt_upload_codec} for upload, sending WAV: {e}")
+
+        uploaded_size = sum(len(upload) for upload in uploads)
+        self.metrics.record("stt_preprocess", time.perf_counter() - started)
+        self.metrics.increment("stt_bytes_received", original_size)
+        self.metrics.increment("stt_bytes_uploaded", uploaded_size)
+        self.metrics.increment("stt_bytes_saved", original_size - uploaded_size)
+        logging.info(f"📉 Upload {original_size / 1024:.0f} KB → {uploaded_size / 1024:.0f} KB")
+        return uploads, filename, overlapped
+
+    def transcribe_audio_bytes(self, audio, filename="audio.wav"):
+        """
+        Convert in-memory speech to text with the selected STT provider
+        
+        ``filename`` only tells the provider which container the bytes are in.
+        The fallback provider, if configured, is tried when the primary fails.
+        """
+        prepared = self._prepare_for_stt(audio, filename)
+        if prepared is None:
+            return None
+
+        uploads, upload_name, overlapped = prepared
+        for provider in (self.stt_provider, self.stt_fallback):
+            if provider is None:
+                continue
+            started = time.perf_counter()
+            try:
+                if not provider.uses_prepared_audio:
+                    transcribed_text = provider.transcribe(audio, filename)
+                elif len(uploads) > 1:
+                    transcribed_text = transcribe_chunks(lambda chunk: provider.transcribe(chunk, upload_name),
+                                                         uploads, overlapped, self.stt_chunk_workers)
+                else:
+                    transcribed_text = provider.transcribe(uploads[0], upload_name)
+            except Exception as e:
+                self.metrics.increment(f"stt_{provider.name}_errors")
+                logging.error(f"❌ Error transcribing audio with {provider.name}: {e}")
+                continue
+            elapsed = time.perf_counter() - started
+            self.metrics.record(f"stt_{provider.name}", elapsed)
+            logging.info(f"📝 Transcribed ({provider.name}, {elapsed * 1000:.0f} ms): '{transcribed_text}'")
+            return transcribed_text
+        return None
+
     def transcribe_audio(self, audio_filepath):
         """
-        Convert speech to text using Groq's Whisper model
+        Convert a recording on disk to text using the selected STT provider
         """
         try:
             with open(audio_filepath, "rb") as audio_file:
-                transcription = self.groq_client.audio.transcriptions.create(
-                    model=self.stt_model,
-                    file=audio_file,
-                    language="en"
-                )
-            
-            transcribed_text = transcription.text.strip()
-            logging.info(f"📝 Transcribed: '{transcribed_text}'")
-            return transcribed_text
-            
+                audio = audio_file.read()
         except Exception as e:
             logging.error(f"❌ Error transcribing audio: {e}")
             return None
+        return self.transcribe_audio_bytes(audio, os.path.basename(audio_filepath))
 
     def generate_response(self, user_message):
         """
@@ -122,91 +305,205 @@ class EcommerceVoiceAssistant:
             logging.error(f"❌ Error generating response: {e}")
             return "I'm sorry, I'm having trouble processing your request right now. Could you try again?"
 
-    def text_to_speech_gtts(self, text, output_filepath="response.wav"):
+    def synthesize_gtts(self, text):
         """
-        Convert text to speech using gTTS (Google Text-to-Speech)
+        Convert text to MP3 bytes using gTTS (Google Text-to-Speech)
         """
         try:
-            # Create gTTS object
             tts = gTTS(text=text, lang=self.gtts_language, slow=self.gtts_slow)
-            
-            # Save as MP3 first
-            mp3_path = output_filepath.replace(".wav", ".mp3")
-            tts.save(mp3_path)
-            
-            # Convert MP3 to WAV using pydub
-            try:
-                audio = AudioSegment.from_mp3(mp3_path)
-                audio.export(output_filepath, format="wav")
-                
-                # Clean up MP3 file
-                if os.path.exists(mp3_path):
-                    os.remove(mp3_path)
-                
-                logging.info(f"🔊 gTTS audio saved to {output_filepath}")
-                return output_filepath
-                
-            except Exception as e:
-                logging.error(f"❌ Error converting MP3 to WAV: {e}")
-                return None
-                
+            buffer = BytesIO()
+            tts.write_to_fp(buffer)
+            return buffer.getvalue()
         except Exception as e:
             logging.error(f"❌ Error generating gTTS speech: {e}")
             return None
 
-    def text_to_speech_elevenlabs(self, text, output_filepath="response.wav"):
+    def synthesize_elevenlabs(self, text):
         """
-        Convert text to speech using ElevenLabs
+        Convert text to WAV using ElevenLabs, returned as a memoryview
+        
+        PCM chunks are appended behind a reserved header, so the WAV is
+        assembled in the same buffer the audio arrives in.
         """
         try:
             audio = self.elevenlabs_client.generate(
                 text=text,
                 voice=self.voice_name,
-                output_format="pcm_22050",
+                output_format=f"pcm_{ELEVENLABS_SAMPLE_RATE}",
                 model=self.voice_model
             )
             
-            # Save the raw PCM data
-            elevenlabs.save(audio, "temp_pcm.raw")
+            pcm = PcmBuffer(ELEVENLABS_SAMPLE_RATE)
+            for chunk in audio:
+                pcm.write(chunk)
+            return pcm.wav()
             
-            # Convert PCM to WAV using pydub
+        except Exception as e:
+            logging.error(f"❌ Error generating ElevenLabs speech: {e}")
+            return None
+
+    def synthesize_elevenlabs_mp3(self, text, kbps=64):
+        """
+        Convert text to MP3 bytes using ElevenLabs' native MP3 output
+        """
+        try:
+            audio = self.elevenlabs_client.generate(
+                text=text,
+                voice=self.voice_name,
+                output_format=f"mp3_44100_{kbps}",
+                model=self.voice_model
+            )
+            return b"".join(audio)
+        except Exception as e:
+            logging.error(f"❌ Error generating ElevenLabs speech: {e}")
+            return None
+
+    def stream_elevenlabs(self, text):
+        """
+        Yield raw 16-bit mono PCM chunks from ElevenLabs as they are synthesized
+        """
+        return self.elevenlabs_client.generate(
+            text=text,
+            voice=self.voice_name,
+            output_format=f"pcm_{ELEVENLABS_SAMPLE_RATE}",
+            model=self.voice_model,
+            stream=True
+        )
+
+    def text_to_speech_bytes(self, text, provider=None, codec=None, bitrate=None):
+        """
+        Convert text to speech in memory using the selected (or given) provider
+        
+        With ``codec`` None the audio is provider-native: WAV from ElevenLabs,
+        MP3 from gTTS. With "mp3", "opus" or "wav" it is delivered in that
+        codec; provider MP3 is passed through rather than re-encoded.
+        Returns (audio, audio_format), or (None, None) on failure.
+        """
+        provider = provider or self.tts_provider
+        if provider != "gtts" and provider != "elevenlabs":
+            logging.warning(f"Unknown TTS provider: {provider}. Using ElevenLabs.")
+            provider = "elevenlabs"
+        bitrate = bitrate or self.output_bitrate
+
+        cache_key = self._tts_cache_key(text, provider, f"{codec}@{bitrate}" if codec else None)
+        if self.tts_cache is not None:
+            cached = self.tts_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        kbps = int(bitrate.rstrip("kK")) if bitrate.rstrip("kK").isdigit() else None
+        if provider == "gtts":
+            audio, audio_format = self.synthesize_gtts(text), "mp3"
+        elif codec == "mp3" and kbps in ELEVENLABS_MP3_BITRATES:
+            audio, audio_format = self.synthesize_elevenlabs_mp3(text, kbps), "mp3"
+        else:
+            audio, audio_format = self.synthesize_elevenlabs(text), "wav"
+        if audio is None:
+            return None, None
+
+        if codec and codec != audio_format:
             try:
-                with open("temp_pcm.raw", "rb") as f:
-                    pcm_data = f.read()
-                
-                # Convert to numpy array
-                audio_array = np.frombuffer(pcm_data, dtype=np.int16)
-                
-                # Create AudioSegment from numpy array
-                audio_segment = AudioSegment(
-                    audio_array.tobytes(), 
-                    frame_rate=22050,
-                    sample_width=2,  # 16-bit
-                    channels=1
-                )
-                
-                # Export as WAV
-                audio_segment.export(output_filepath, format="wav")
-                
-                # Clean up temp file
-                if os.path.exists("temp_pcm.raw"):
-                    os.remove("temp_pcm.raw")
-                
-                logging.info(f"🔊 ElevenLabs audio saved to {output_filepath}")
-                return output_filepath
-                
+                audio, audio_format = encode_audio(audio, audio_format, codec, bitrate), codec
             except Exception as e:
-                logging.error(f"❌ Error converting PCM to WAV: {e}")
-                return None
-                
+                # Still deliver the reply, just uncompressed; not cached under the codec key
+                logging.warning(f"⚠️ Could not encode {codec}, sending {audio_format}: {e}")
+                return audio, audio_format
+
+        if self.tts_cache is not None:
+            self.tts_cache.put(cache_key, audio, audio_format)
+        return audio, audio_format
+
+    def _tts_cache_key(self, text, provider, output=None):
+        if provider == "gtts":
+            model = "slow" if self.gtts_slow else "normal"
+            voice = self.gtts_language
+        else:
+            model = f"{self.voice_model}/pcm_{ELEVENLABS_SAMPLE_RATE}"
+            voice = self.voice_name
+        if output:
+            model = f"{model}/{output}"
+        return tts_cache_key(provider, voice, model, text)
+
+    def prewarm_tts_cache(self, prompts=None):
+        """
+        Synthesize fixed prompts into the TTS cache on a background thread
+        
+        ``prompts`` is a list of (text, provider) pairs; provider None means
+        the current one. Already-cached prompts cost nothing. Returns the thread.
+        """
+        if prompts is None:
+            prompts = [(WELCOME_TEXT, None), (GOODBYE_TEXT, None),
+                       (SWITCH_TO_GTTS_TEXT, "gtts"), (SWITCH_TO_ELEVENLABS_TEXT, "elevenlabs")]
+        provider = self.tts_provider
+
+        def prewarm():
+            for text, prompt_provider in prompts:
+                self.text_to_speech_bytes(text, prompt_provider or provider)
+            if self.tts_cache is not None:
+                logging.info(f"✅ TTS cache prewarmed: {self.tts_cache.stats()}")
+
+        thread = threading.Thread(target=prewarm, name="tts-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def _save_as_wav(self, audio, audio_format, output_filepath):
+        """Write synthesized audio to a WAV file, decoding compressed formats in memory"""
+        if audio_format != "wav":
+            segment = AudioSegment.from_file(BytesIO(audio), format=audio_format)
+            audio = pcm_to_wav(segment.raw_data, segment.frame_rate, segment.channels, segment.sample_width)
+        with open(output_filepath, "wb") as f:
+            f.write(audio)
+
+    def text_to_speech_gtts(self, text, output_filepath="response.wav"):
+        """
+        Convert text to speech using gTTS (Google Text-to-Speech)
+        """
+        audio = self.synthesize_gtts(text)
+        if audio is None:
+            return None
+        try:
+            self._save_as_wav(audio, "mp3", output_filepath)
+            logging.info(f"🔊 gTTS audio saved to {output_filepath}")
+            return output_filepath
         except Exception as e:
-            logging.error(f"❌ Error generating ElevenLabs speech: {e}")
+            logging.error(f"❌ Error converting MP3 to WAV: {e}")
+            return None
+
+    def text_to_speech_elevenlabs(self, text, output_filepath="response.wav"):
+        """
+        Convert text to speech using ElevenLabs
+        """
+        audio = self.synthesize_elevenlabs(text)
+        if audio is None:
+            return None
+        try:
+            self._save_as_wav(audio, "wav", output_filepath)
+            logging.info(f"🔊 ElevenLabs audio saved to {output_filepath}")
+            return output_filepath
+        except Exception as e:
+            logging.error(f"❌ Error saving ElevenLabs audio: {e}")
             return None
 
-    def text_to_speech(self, text, output_filepath="response.wav"):
+    def text_to_speech(self, text, output_filepath="response.wav", codec=None, bitrate=None):
         """
         Convert text to speech using the selected provider
+        
+        The codec defaults to the file extension: .mp3, .ogg/.opus, else WAV.
         """
+        if codec is None:
+            extension = os.path.splitext(output_filepath)[1].lower()
+            codec = {".mp3": "mp3", ".ogg": "opus", ".opus": "opus"}.get(extension, "wav")
+        if codec != "wav":
+            audio, audio_format = self.text_to_speech_bytes(text, codec=codec, bitrate=bitrate)
+            if audio is None:
+                return None
+            if audio_format != codec:
+                output_filepath = f"{os.path.splitext(output_filepath)[0]}.{AUDIO_EXTENSIONS[audio_format]}"
+            with open(output_filepath, "wb") as f:
+                f.write(audio)
+            logging.info(f"🔊 {audio_format.upper()} audio saved to {output_filepath}")
+            return output_filepath
+
         if self.tts_provider == "elevenlabs":
             return self.text_to_speech_elevenlabs(text, output_filepath)
         elif self.tts_provider == "gtts":
@@ -235,6 +532,193 @@ class EcommerceVoiceAssistant:
         except Exception as e:
             logging.error(f"❌ Error playing audio: {e}")
 
+    def play_audio_bytes(self, audio, audio_format="wav"):
+        """
+        Play in-memory audio based on operating system
+        """
+        os_name = platform.system()
+        try:
+            if audio_format != "wav" and os_name != "Darwin":
+                # aplay and Media.SoundPlayer only understand WAV
+                segment = AudioSegment.from_file(BytesIO(audio), format=audio_format)
+                audio = pcm_to_wav(segment.raw_data, segment.frame_rate, segment.channels, segment.sample_width)
+                audio_format = "wav"
+
+            if os_name == "Linux":
+                subprocess.run(['aplay', '-q', '-'], input=audio)
+                logging.info("🔊 Audio played successfully")
+                return
+
+            # afplay and SoundPlayer need a path; a per-call file keeps concurrent sessions apart
+            with tempfile.NamedTemporaryFile(suffix=f".{audio_format}", delete=False) as f:
+                f.write(audio)
+            try:
+                self.play_audio(f.name)
+            finally:
+                os.remove(f.name)
+                
+        except Exception as e:
+            logging.error(f"❌ Error playing audio: {e}")
+
+    def _pcm_player_command(self, sample_rate):
+        """
+        Command that plays raw 16-bit mono PCM from stdin, or None if no such player is installed
+        """
+        if platform.system() == "Linux" and shutil.which("aplay"):
+            return ['aplay', '-q', '-t', 'raw', '-f', 'S16_LE', '-c', '1', '-r', str(sample_rate), '-']
+        if shutil.which("ffplay"):
+            return ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet',
+                    '-f', 's16le', '-ar', str(sample_rate), '-ac', '1', '-']
+        return None
+
+    def speak_streaming(self, text):
+        """
+        Play ElevenLabs speech chunk by chunk as it arrives
+        
+        Returns the time to first audio in seconds, or None if nothing played.
+        """
+        command = self._pcm_player_command(ELEVENLABS_SAMPLE_RATE)
+        if command is None:
+            logging.warning("No raw PCM player (aplay/ffplay) found; playing after full synthesis")
+            return self._speak_buffered(text)
+
+        cache_key = self._tts_cache_key(text, "elevenlabs")
+        if self.tts_cache is not None and self.tts_cache.get(cache_key) is not None:
+            # Already synthesized: the buffered path plays it straight from the cache
+            return self._speak_buffered(text)
+
+        started = time.perf_counter()
+        time_to_first_audio = None
+        player = None
+        pcm = PcmBuffer(ELEVENLABS_SAMPLE_RATE)
+        try:
+            for chunk in self.stream_elevenlabs(text):
+                if not chunk:
+                    continue
+                if player is None:
+                    player = subprocess.Popen(command, stdin=subprocess.PIPE)
+                    time_to_first_audio = time.perf_counter() - started
+                    self.metrics.record("time_to_first_audio", time_to_first_audio)
+                    logging.info(f"⏱️ Time to first audio: {time_to_first_audio * 1000:.0f} ms (streaming)")
+                player.stdin.write(chunk)
+                pcm.write(chunk)
+            # Only complete utterances are cached
+            if self.tts_cache is not None and len(pcm):
+                self.tts_cache.put(cache_key, pcm.wav(), "wav")
+            return time_to_first_audio
+
+        except Exception as e:
+            logging.error(f"❌ Error streaming ElevenLabs speech: {e}")
+            return time_to_first_audio
+        finally:
+            if player is not None:
+                try:
+                    player.stdin.close()
+                except BrokenPipeError:
+                    pass
+                player.wait()
+
+    def _speak_buffered(self, text):
+        started = time.perf_counter()
+        audio, audio_format = self.text_to_speech_bytes(text)
+        if audio is None:
+            return None
+        time_to_first_audio = time.perf_counter() - started
+        self.metrics.record("time_to_first_audio", time_to_first_audio)
+        logging.info(f"⏱️ Time to first audio: {time_to_first_audio * 1000:.0f} ms")
+        self.play_audio_bytes(audio, audio_format)
+        return time_to_first_audio
+
+    def speak(self, text):
+        """
+        Synthesize text and play it, streaming when ElevenLabs streaming is on
+        
+        Returns the time to first audio in seconds, or None if nothing played.
+        """
+        if self.stream_tts and self.tts_provider == "elevenlabs":
+            return self.speak_streaming(text)
+        return self._speak_buffered(text)
+
+    def speak_pipelined(self, text_chunks, on_sentence=None, lookahead=2):
+        """
+        Speak a reply sentence by sentence while the rest is still being generated
+        
+        A worker thread splits the incoming text into sentences and synthesizes
+        each one while this thread plays the previous one. Clips go through a
+        FIFO queue, so they play in reply order with either provider. Returns
+        the full reply text.
+        """
+        # Fixed for the whole reply so a mid-reply voice switch cannot mix formats
+        provider = "gtts" if self.tts_provider == "gtts" else "elevenlabs"
+        clips = queue.Queue(maxsize=lookahead)
+        cancelled = threading.Event()
+        done = object()
+        parts = []
+
+        def collect():
+            for chunk in text_chunks:
+                parts.append(chunk)
+                yield chunk
+
+        def synthesize():
+            try:
+                for sentence in split_sentences(collect()):
+                    if cancelled.is_set():
+                        return
+                    audio, audio_format = self.text_to_speech_bytes(sentence, provider)
+                    clips.put((sentence, audio, audio_format))
+            except Exception as e:
+                logging.error(f"❌ Error in speech pipeline: {e}")
+            finally:
+                clips.put(done)
+
+        started = time.perf_counter()
+        worker = threading.Thread(target=synthesize, name="tts-pipeline", daemon=True)
+        worker.start()
+
+        # ElevenLabs clips are raw PCM underneath: feed one player for the whole reply, gap-free
+        command = self._pcm_player_command(ELEVENLABS_SAMPLE_RATE) if provider == "elevenlabs" else None
+        player = None
+        first_audio = True
+        try:
+            while True:
+                item = clips.get()
+                if item is done:
+                    break
+                sentence, audio, audio_format = item
+                if on_sentence:
+                    on_sentence(sentence)
+                if audio is None:
+                    continue
+                if first_audio:
+                    first_audio = False
+                    reply_to_audio = time.perf_counter() - started
+                    self.metrics.record("reply_to_first_audio", reply_to_audio)
+                    logging.info(f"⏱️ Reply to first audio: {reply_to_audio * 1000:.0f} ms (pipelined)")
+                if command:
+                    if player is None:
+                        player = subprocess.Popen(command, stdin=subprocess.PIPE)
+                    player.stdin.write(read_wav(audio).pcm)
+                else:
+                    self.play_audio_bytes(audio, audio_format)
+        finally:
+            if player is not None:
+                try:
+                    player.stdin.close()
+                except BrokenPipeError:
+                    pass
+                player.wait()
+            if worker.is_alive():
+                # Interrupted: unblock the worker so it can stop after the current sentence
+                cancelled.set()
+                while worker.is_alive():
+                    try:
+                        clips.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+
+        return "".join(parts).strip()
+
     def conversation_loop(self):
         """
         Main conversation loop for voice interaction
@@ -248,10 +732,10 @@ class EcommerceVoiceAssistant:
         print("-" * 60)
         
         # Generate and play welcome message
-        welcome_text = "Hi there! I'm Harvey Spectre, your friendly shopping assistant at Ecokart. I'm here to help you find the perfect products, answer questions about orders, or assist with anything else you need. What can I help you with today?"
-        welcome_audio = self.text_to_speech(welcome_text, "welcome.wav")
-        if welcome_audio:
-            self.play_audio(welcome_audio)
+        # Cache the remaining fixed prompts in the background while the welcome plays
+        self.prewarm_tts_cache([(GOODBYE_TEXT, None), (SWITCH_TO_GTTS_TEXT, "gtts"),
+                                (SWITCH_TO_ELEVENLABS_TEXT, "elevenlabs")])
+        self.speak(WELCOME_TEXT)
         
         conversation_count = 0
         
@@ -259,14 +743,14 @@ class EcommerceVoiceAssistant:
             try:
                 # Record user input
                 print("\n🎤 Listening... (speak now)")
-                audio_file = self.record_audio()
+                audio = self.record_audio_bytes()
                 
-                if not audio_file:
+                if not audio:
                     print("❌ No audio detected. Please try again.")
                     continue
                 
                 # Transcribe speech to text
-                user_message = self.transcribe_audio(audio_file)
+                user_message = self.transcribe_audio_bytes(audio)
                 
                 if not user_message:
                     print("❌ Could not understand your speech. Please try again.")
@@ -275,10 +759,7 @@ class EcommerceVoiceAssistant:
                 # Check for exit commands
                 if any(phrase in user_message.lower() for phrase in ['goodbye', 'exit', 'quit', 'bye', 'stop']):
                     print("👋 Goodbye! Thanks for shopping with Ecokart!")
-                    goodbye_text = "Thanks for chatting with me! Have a great day and happy shopping!"
-                    goodbye_audio = self.text_to_speech(goodbye_text, "goodbye.wav")
-                    if goodbye_audio:
-                        self.play_audio(goodbye_audio)
+                    self.speak(GOODBYE_TEXT)
                     break
                 
                 # Check for voice switching commands
@@ -286,40 +767,45 @@ class EcommerceVoiceAssistant:
                     current_provider = self.tts_provider
                     if current_provider == "elevenlabs":
                         self.set_tts_provider("gtts")
-                        switch_message = "Switched to Google Text-to-Speech. You'll notice a different voice now!"
+                        switch_message = SWITCH_TO_GTTS_TEXT
                     else:
                         self.set_tts_provider("elevenlabs")
-                        switch_message = "Switched to ElevenLabs. You'll hear a more natural voice now!"
+                        switch_message = SWITCH_TO_ELEVENLABS_TEXT
                     
                     print(f"🎵 {switch_message}")
-                    switch_audio = self.text_to_speech(switch_message, "switch_voice.wav")
-                    if switch_audio:
-                        self.play_audio(switch_audio)
+                    self.speak(switch_message)
                     continue
                 
                 print(f"👤 You said: {user_message}")
                 
-                # Generate bot response
-                bot_response = self.generate_response(user_message)
-                print(f"🤖 Harvey Spectre: {bot_response}")
-                
-                # Convert response to speech and play
-                response_audio = self.text_to_speech(bot_response, f"response_{conversation_count}.wav")
-                if response_audio:
-                    self.play_audio(response_audio)
+                if self.pipeline_tts:
+                    # Generate, synthesize and play the reply one sentence at a time
+                    print("🤖 Harvey Spectre:", end=" ", flush=True)
+                    self.speak_pipelined(self.chatbot.stream_response(user_message),
+                                         on_sentence=lambda sentence: print(sentence, end=" ", flush=True))
+                    print()
+                else:
+                    # Generate bot response
+                    bot_response = self.generate_response(user_message)
+                    print(f"🤖 Harvey Spectre: {bot_response}")
+                    
+                    # Convert response to speech and play
+                    self.speak(bot_response)
                 
                 conversation_count += 1
                 
-                # Clean up audio files
-                if os.path.exists(audio_file):
-                    os.remove(audio_file)
-                
             except KeyboardInterrupt:
                 print("\n👋 Goodbye! Thanks for using Ecokart Voice Assistant!")
                 break
             except Exception as e:
                 logging.error(f"❌ Unexpected error: {e}")
                 print("❌ Something went wrong. Please try again.")
+        
+        for stage, stats in self.metrics.summary().items():
+            print(f"⏱️ {stage}: p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms over {stats['count']} samples")
+        saved = self.metrics.counters().get("stt_bytes_saved", 0)
+        if saved:
+            print(f"📉 Transcription uploads shrunk by {saved / 1024:.0f} KB")
 
 def main():
     """
@@ -330,10 +816,17 @@ def main():
     parser = argparse.ArgumentParser(description='Ecokart E-commerce Voice Assistant')
     parser.add_argument('--tts', choices=['elevenlabs', 'gtts'], default='elevenlabs',
                        help='Choose TTS provider (default: elevenlabs)')
+    parser.add_argument('--stt', choices=['groq', 'groq-turbo', 'sidecar'], default=STT_PROVIDER,
+                       help='Choose STT provider (default: groq; sidecar reads transcripts from STT_SIDECAR_DIR)')
+    parser.add_argument('--no-stream', action='store_true',
+                       help='Wait for the full ElevenLabs reply before playing it')
+    parser.add_argument('--no-pipeline', action='store_true',
+                       help='Generate the whole reply before synthesizing any of it')
     
     args = parser.parse_args()
     
-    assistant = EcommerceVoiceAssistant(tts_provider=args.tts)
+    assistant = EcommerceVoiceAssistant(tts_provider=args.tts, stream_tts=not args.no_stream,
+                                        pipeline_tts=not args.no_pipeline, stt_provider=args.stt)
     assistant.conversation_loop()
 
 if __name__ == "__main__":
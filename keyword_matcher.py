@@ -0,0 +1,148 @@
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple
+
+# Static keyword sets shared by context extraction and auto-titling
+PRODUCT_KEYWORDS = [
+    "iphone", "samsung", "laptop", "macbook", "jeans", "shirt", "coffee", "blender",
+    "shoes", "sneakers", "sandals", "boots", "heels", "slippers", "t-shirt", "dress", "jacket",
+    "bag", "watch", "phone", "smartphone", "tablet", "headphones", "camera"
+]
+ORDER_KEYWORDS = ["order", "ordered", "purchase", "bought", "shipping", "delivery"]
+TOPIC_KEYWORDS = ["refund", "return", "order", "payment", "shipping", "cancel", "exchange"]
+
+CURRENCY_SYMBOLS = "$£"
+
+
+class KeywordMatch(NamedTuple):
+    start: int
+    end: int
+    category: str
+    value: object
+    priority: int
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over many keywords, matched in one pass.
+
+    Matching is case-insensitive and anchored at word starts, so "order"
+    matches "ordered" but not "border". Currency amounts ("$500", "£49.99")
+    are picked up in the same pass under the ``budget`` category, as whole
+    currency units.
+    """
+
+    def __init__(self, currency_symbols: str = CURRENCY_SYMBOLS):
+        self.currency_symbols = currency_symbols
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[tuple]] = [[]]
+        self._compiled = False
+
+    def add(self, keyword: str, category: str, value: object = None, priority: int = 0):
+        """Register a keyword; ``value`` defaults to the keyword itself"""
+        keyword = keyword.strip().lower()
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(keyword), category, keyword if value is None else value, priority))
+        self._compiled = False
+
+    def add_all(self, keywords: Iterable[str], category: str):
+        """Register keywords whose priority is their position in ``keywords``"""
+        for priority, keyword in enumerate(keywords):
+            self.add(keyword, category, priority=priority)
+
+    def compile(self):
+        """Build failure links breadth-first and merge outputs along them"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._compiled = True
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """Return every keyword and currency match in ``text``, in text order"""
+        if not self._compiled:
+            self.compile()
+        text = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+        index = 0
+        length = len(text)
+        while index < length:
+            char = text[index]
+            if char in self.currency_symbols:
+                amount_end = index + 1
+                while amount_end < length and (text[amount_end].isdigit() or text[amount_end] == ","):
+                    amount_end += 1
+                digits = text[index + 1:amount_end].replace(",", "")
+                if digits:
+                    matches.append(KeywordMatch(index, amount_end, "budget", int(digits), 0))
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword_length, category, value, priority in output[state]:
+                start = index - keyword_length + 1
+                if start == 0 or not text[start - 1].isalnum():
+                    matches.append(KeywordMatch(start, index + 1, category, value, priority))
+            index += 1
+        matches.sort(key=lambda match: (match.start, -match.end))
+        return matches
+
+    def extract(self, text: str) -> Dict[str, List]:
+        """Group matched values by category, de-duplicated in text order.
+
+        A match nested inside a longer match of the same category is dropped,
+        so "iPhone 15 Pro" does not also report "iphone".
+        """
+        grouped: Dict[str, List] = {}
+        covered_until: Dict[str, int] = {}
+        for match in self.find_all(text):
+            if match.end <= covered_until.get(match.category, -1):
+                continue
+            covered_until[match.category] = match.end
+            values = grouped.setdefault(match.category, [])
+            if match.value not in values:
+                values.append(match.value)
+        return grouped
+
+    def best(self, text: str) -> Dict[str, object]:
+        """Return the lowest-priority-number match per category in ``text``"""
+        winners: Dict[str, KeywordMatch] = {}
+        for match in self.find_all(text):
+            current = winners.get(match.category)
+            if current is None or match.priority < current.priority:
+                winners[match.category] = match
+        return {category: match.value for category, match in winners.items()}
+
+def build_context_matcher(products: List[Dict] = None) -> KeywordMatcher:
+    """Compile the static keyword sets plus catalog product names into one matcher"""
+    matcher = KeywordMatcher()
+    matcher.add_all(PRODUCT_KEYWORDS, "product_interest")
+    matcher.add_all(ORDER_KEYWORDS, "order_related")
+    matcher.add_all(TOPIC_KEYWORDS, "topic")
+    for product in products or []:
+        name = product.get("name") if isinstance(product, dict) else None
+        if name:
+            # Catalog names rank ahead of generic keywords and keep their original casing
+            matcher.add(name, "product_interest", value=name, priority=-1)
+    matcher.compile()
+    return matcher
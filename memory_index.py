@@ -0,0 +1,468 @@
+import os
+import re
+import json
+import zlib
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+
+from conversation_database import DATABASE_PATH
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Small hand-made concept groups so lexically different shopping phrases
+# ("cheap headphones" / "budget earbuds") land near each other
+CONCEPT_SYNONYMS = {
+    "budget": ["cheap", "budget", "affordable", "inexpensive", "low-cost", "bargain", "deal", "deals", "discount", "sale"],
+    "premium": ["premium", "expensive", "luxury", "high-end", "flagship", "best"],
+    "audio": ["headphones", "headphone", "earbuds", "earphones", "headset", "airpods", "speaker", "speakers"],
+    "phone": ["phone", "phones", "smartphone", "smartphones", "iphone", "android", "galaxy", "mobile"],
+    "computer": ["laptop", "laptops", "notebook", "macbook", "computer", "pc", "chromebook"],
+    "footwear": ["shoes", "shoe", "sneakers", "trainers", "boots", "sandals", "heels", "slippers"],
+    "clothing": ["shirt", "t-shirt", "tshirt", "jeans", "dress", "jacket", "hoodie", "clothes"],
+    "kitchen": ["coffee", "blender", "kettle", "toaster", "mixer", "cooking", "kitchen"],
+    "order": ["order", "ordered", "purchase", "purchased", "bought", "buy"],
+    "delivery": ["shipping", "delivery", "deliver", "shipped", "tracking", "courier"],
+    "refund": ["refund", "return", "returns", "exchange", "cancel"],
+}
+
+
+class HashedNgramEmbedder:
+    """CPU-only text embedder using the hashing trick.
+
+    Words, character n-grams and concept tags are hashed into ``dim`` signed
+    buckets and the result is L2-normalised, so cosine similarity is a dot
+    product. No model files or network access are needed.
+    """
+
+    def __init__(self, dim: int = 128, ngram_range: Tuple[int, int] = (3, 4),
+                 word_weight: float = 1.0, ngram_weight: float = 0.5, concept_weight: float = 2.0):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.word_weight = word_weight
+        self.ngram_weight = ngram_weight
+        self.concept_weight = concept_weight
+        self._concepts = {}
+        for concept, words in CONCEPT_SYNONYMS.items():
+            for word in words:
+                self._concepts.setdefault(word.replace("-", "").replace(" ", ""), []).append(concept)
+        self._hash_cache: Dict[str, Tuple[int, float]] = {}
+
+    def _hash(self, feature: str) -> Tuple[int, float]:
+        cached = self._hash_cache.get(feature)
+        if cached is None:
+            value = zlib.crc32(feature.encode("utf-8"))
+            cached = (value % self.dim, 1.0 if value & 0x80000000 else -1.0)
+            if len(self._hash_cache) < 200_000:
+                self._hash_cache[feature] = cached
+        return cached
+
+    def _features(self, text: str) -> Iterable[Tuple[str, float]]:
+        words = _WORD_PATTERN.findall(text.lower().replace("-", ""))
+        low, high = self.ngram_range
+        for word in words:
+            yield "w:" + word, self.word_weight
+            for concept in self._concepts.get(word, ()):
+                yield "c:" + concept, self.concept_weight
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                for start in range(len(padded) - n + 1):
+                    yield "g:" + padded[start:start + n], self.ngram_weight
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed a batch of texts into an (n, dim) float32 matrix of unit rows"""
+        rows, buckets, weights = [], [], []
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text or ""):
+                bucket, sign = self._hash(feature)
+                rows.append(row)
+                buckets.append(bucket)
+                weights.append(sign * weight)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if rows:
+            np.add.at(matrix, (np.asarray(rows), np.asarray(buckets)), np.asarray(weights, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+class MemoryIndex:
+    """Memory-mapped vector store with an inverted-file (IVF) ANN index.
+
+    Vectors are stored as float16 rows in ``vectors.f16`` alongside the
+    message and conversation ids they came from. Until ``train_threshold``
+    vectors exist, queries are exact; after that a spherical k-means coarse
+    quantizer with ~sqrt(N) lists is trained and each query scans only the
+    ``nprobe`` closest lists.
+
+    Several processes may share a directory: writes hold an exclusive lock on
+    ``write.lock`` and re-read ``meta.json`` first, and reads pick up rows
+    other processes appended. Within a process, use ``MemoryIndex.shared``.
+    """
+
+    _shared: Dict[str, "MemoryIndex"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, index_dir: str = None, embedder: HashedNgramEmbedder = None,
+                 train_threshold: int = 20_000, nprobe: int = 8):
+        if index_dir is None:
+            index_dir = default_index_dir(DATABASE_PATH)
+        self.index_dir = index_dir
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.dim = self.embedder.dim
+        self.train_threshold = train_threshold
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+        self._load()
+
+    @classmethod
+    def shared(cls, index_dir: str) -> "MemoryIndex":
+        """The process-wide index for ``index_dir``, opened on first use"""
+        key = os.path.abspath(index_dir)
+        with cls._shared_lock:
+            index = cls._shared.get(key)
+            if index is None:
+                index = cls._shared[key] = cls(index_dir)
+            return index
+
+    # ---- storage -------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _load(self):
+        meta_path = self._path("meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+            if self.meta["dim"] != self.dim:
+                raise ValueError(f"Index at {self.index_dir} has dim {self.meta['dim']}, embedder has {self.dim}")
+        else:
+            self.meta = {"dim": self.dim, "count": 0, "capacity": 0, "last_message_id": 0, "nlist": 0}
+        self._open_arrays(self.meta["capacity"])
+        self._load_centroids()
+        self._rebuild_lists()
+
+    def _load_centroids(self):
+        self.centroids = None
+        if self.meta["nlist"] and os.path.exists(self._path("centroids.npy")):
+            self.centroids = np.load(self._path("centroids.npy"))
+
+    def _refresh(self):
+        """Catch up with writes another process saved since this one last looked"""
+        try:
+            with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return
+        if meta.get("version", 0) == self.meta.get("version", 0):
+            return
+        if meta["capacity"] != self.meta["capacity"]:
+            self._release_arrays()
+            self._open_arrays(meta["capacity"])
+        retrained = meta.get("trained_version") != self.meta.get("trained_version")
+        self.meta = meta
+        if retrained:
+            self._load_centroids()
+        self._rebuild_lists()
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the thread lock and the cross-process write lock, with state refreshed"""
+        with self._lock:
+            with open(self._path("write.lock"), "a+b") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    self._refresh()
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    else:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _open_arrays(self, capacity: int):
+        specs = {
+            "vectors": ("vectors.f16", np.float16, (capacity, self.dim)),
+            "message_ids": ("message_ids.i64", np.int64, (capacity,)),
+            "conversation_ids": ("conversation_ids.i64", np.int64, (capacity,)),
+            "lists": ("lists.i32", np.int32, (capacity,)),
+        }
+        for attr, (name, dtype, shape) in specs.items():
+            path = self._path(name)
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            if capacity == 0:
+                setattr(self, attr, np.zeros(shape, dtype=dtype))
+                continue
+            with open(path, "ab") as f:
+                if f.tell() < nbytes:
+                    f.truncate(nbytes)
+            setattr(self, attr, np.memmap(path, dtype=dtype, mode="r+", shape=shape))
+
+    def _ensure_capacity(self, needed: int):
+        capacity = self.meta["capacity"]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        self._release_arrays()
+        self._open_arrays(new_capacity)
+        self.meta["capacity"] = new_capacity
+
+    def _release_arrays(self):
+        for attr in ("vectors", "message_ids", "conversation_ids", "lists"):
+            array = getattr(self, attr)
+            if isinstance(array, np.memmap):
+                array.flush()
+            setattr(self, attr, None)
+
+    def _save_meta(self):
+        for attr in ("vectors", "message_ids", "conversation_ids", "lists"):
+            array = getattr(self, attr)
+            if isinstance(array, np.memmap):
+                array.flush()
+        # Other processes reload when the version moves
+        self.meta["version"] = self.meta.get("version", 0) + 1
+        tmp_path = self._path(f"meta.json.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def _rebuild_lists(self):
+        """Group row numbers by IVF list so each list is a contiguous slice"""
+        count = self.meta["count"]
+        self._listed_count = count
+        if self.centroids is None or count == 0:
+            self._list_order = None
+            self._list_offsets = None
+            return
+        assignments = np.asarray(self.lists[:count])
+        self._list_order = np.argsort(assignments, kind="stable")
+        self._list_offsets = np.searchsorted(assignments[self._list_order], np.arange(len(self.centroids) + 1))
+
+    # ---- writes --------------------------------------------------------
+
+    @property
+    def count(self) -> int:
+        return self.meta["count"]
+
+    def add(self, message_ids: Sequence[int], conversation_ids: Sequence[int], texts: Sequence[str]):
+        """Embed and append a batch of messages"""
+        if not texts:
+            return
+        vectors = self.embedder.embed(texts)
+        with self._exclusive():
+            self._append(message_ids, conversation_ids, vectors)
+
+    def _append(self, message_ids: Sequence[int], conversation_ids: Sequence[int], vectors: np.ndarray):
+        start = self.meta["count"]
+        end = start + len(vectors)
+        self._ensure_capacity(end)
+        self.vectors[start:end] = vectors
+        self.message_ids[start:end] = message_ids
+        self.conversation_ids[start:end] = conversation_ids
+        if self.centroids is not None:
+            self.lists[start:end] = self._assign(vectors)
+        self.meta["count"] = end
+        self.meta["last_message_id"] = max(self.meta["last_message_id"], int(max(message_ids)))
+        stride = self.meta.get("id_stride", 1)
+        if stride > 1:
+            marks = self.meta.setdefault("shard_message_ids", {})
+            for message_id in message_ids:
+                shard = str((int(message_id) - 1) % stride)
+                marks[shard] = max(marks.get(shard, 0), int(message_id))
+        if self.centroids is None and end >= self.train_threshold:
+            self._train()
+        else:
+            # Recent rows are scanned exactly until enough pile up to regroup the lists
+            if self.centroids is not None and end - self._listed_count > 4096:
+                self._rebuild_lists()
+            self._save_meta()
+
+    def sync(self, db, batch_size: int = 5000, role: str = "user") -> int:
+        """Index messages written since the last sync; returns how many were added.
+
+        Each batch is read and appended under the write lock, so processes
+        syncing the same directory never index a message twice.
+        """
+        shard_count = getattr(db, "shard_count", 1)
+        if shard_count > 1:
+            # Sharded message IDs interleave, so each shard keeps its own high-water mark
+            sources = list(enumerate(db.shards))
+        else:
+            sources = [(None, db)]
+
+        added = 0
+        for shard, source in sources:
+            while True:
+                with self._exclusive():
+                    if shard is None:
+                        last_message_id = self.meta["last_message_id"]
+                    else:
+                        self.meta["id_stride"] = shard_count
+                        last_message_id = self.meta.get("shard_message_ids", {}).get(str(shard), 0)
+                    rows = source.get_messages_after(last_message_id, limit=batch_size, role=role)
+                    if rows:
+                        self._append([row['message_id'] for row in rows],
+                                     [row['conversation_id'] for row in rows],
+                                     self.embedder.embed([row['content'] for row in rows]))
+                added += len(rows)
+                if len(rows) < batch_size:
+                    break
+        if added:
+            logging.info(f"✅ Indexed {added} messages into conversation memory")
+        return added
+
+    def remove_conversations(self, conversation_ids: Sequence[int]) -> int:
+        """Drop every vector of the given conversations from search results; returns rows removed.
+
+        Rows are blanked in place (IDs set to -1) rather than compacted, so
+        row numbers and IVF lists stay valid.
+        """
+        if len(conversation_ids) == 0:
+            return 0
+        with self._exclusive():
+            count = self.meta["count"]
+            rows = np.flatnonzero(np.isin(self.conversation_ids[:count], np.asarray(conversation_ids, dtype=np.int64)))
+            if len(rows) == 0:
+                return 0
+            self.vectors[rows] = 0
+            self.message_ids[rows] = -1
+            self.conversation_ids[rows] = -1
+            self._save_meta()
+        logging.info(f"✅ Removed {len(rows)} messages of {len(conversation_ids)} conversations from conversation memory")
+        return len(rows)
+
+    def prune(self, db) -> int:
+        """Remove conversations that were deleted, purged or archived from ``db``"""
+        with self._lock:
+            self._refresh()
+            indexed = np.unique(self.conversation_ids[:self.meta["count"]])
+        indexed = [int(conversation_id) for conversation_id in indexed if conversation_id >= 0]
+        existing = set(db.get_existing_conversation_ids(indexed)) if indexed else set()
+        return self.remove_conversations([conversation_id for conversation_id in indexed
+                                          if conversation_id not in existing])
+
+    def train(self, nlist: int = None, sample_size: int = 65_536, iterations: int = 10, seed: int = 0):
+        """Train the coarse quantizer and (re)assign every stored vector"""
+        with self._exclusive():
+            self._train(nlist, sample_size, iterations, seed)
+
+    def _train(self, nlist: int = None, sample_size: int = 65_536, iterations: int = 10, seed: int = 0):
+        count = self.meta["count"]
+        if count == 0:
+            return
+        nlist = nlist or max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(count, size=min(sample_size, count), replace=False))
+        sample = np.asarray(self.vectors[sample_rows], dtype=np.float32)
+        nlist = min(nlist, len(sample))
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(nlist + 1))
+            sums = np.zeros_like(centroids)
+            non_empty = bounds[1:] > bounds[:-1]
+            sums[non_empty] = np.add.reduceat(sample[order], bounds[:-1][non_empty], axis=0)
+            # Re-seed empty lists from random sample points
+            empty = np.flatnonzero(~non_empty)
+            if len(empty):
+                sums[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+
+        self.centroids = centroids.astype(np.float32)
+        tmp_path = self._path(f"centroids.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, self.centroids)
+        os.replace(tmp_path, self._path("centroids.npy"))
+        for start in range(0, count, 65_536):
+            end = min(start + 65_536, count)
+            self.lists[start:end] = self._assign(np.asarray(self.vectors[start:end], dtype=np.float32))
+        self.meta["nlist"] = nlist
+        self.meta["trained_version"] = self.meta.get("version", 0) + 1
+        self._rebuild_lists()
+        self._save_meta()
+        logging.info(f"✅ Trained conversation memory index with {nlist} lists over {count} vectors")
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    # ---- reads ---------------------------------------------------------
+
+    def search(self, queries: Sequence[str], k: int = 5, nprobe: int = None,
+               min_score: float = 0.0) -> List[List[Dict]]:
+        """Batch top-k search; returns one list of hits per query"""
+        query_vectors = self.embedder.embed(queries)
+        return self.search_vectors(query_vectors, k=k, nprobe=nprobe, min_score=min_score)
+
+    def search_vectors(self, query_vectors: np.ndarray, k: int = 5, nprobe: int = None,
+                       min_score: float = 0.0) -> List[List[Dict]]:
+        with self._lock:
+            self._refresh()
+            count = self.meta["count"]
+            if count == 0:
+                return [[] for _ in range(len(query_vectors))]
+            if self.centroids is None:
+                candidates = [None] * len(query_vectors)
+            else:
+                nprobe = min(nprobe or self.nprobe, len(self.centroids))
+                probe_scores = query_vectors @ self.centroids.T
+                probes = np.argpartition(-probe_scores, nprobe - 1, axis=1)[:, :nprobe]
+                tail = np.arange(self._listed_count, count)
+                candidates = [
+                    np.concatenate([self._list_order[self._list_offsets[p]:self._list_offsets[p + 1]] for p in row] + [tail])
+                    for row in probes
+                ]
+
+            results = []
+            for query, rows in zip(query_vectors, candidates):
+                if rows is None:
+                    scores = self._exact_scores(query, count)
+                    rows = np.arange(count)
+                else:
+                    rows = np.sort(rows)
+                    scores = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+                top = min(k, len(rows))
+                if top == 0:
+                    results.append([])
+                    continue
+                best = np.argpartition(-scores, top - 1)[:top]
+                best = best[np.argsort(-scores[best])]
+                results.append([
+                    {
+                        'message_id': int(self.message_ids[rows[i]]),
+                        'conversation_id': int(self.conversation_ids[rows[i]]),
+                        'score': float(scores[i])
+                    }
+                    # Rows of removed conversations carry message ID -1
+                    for i in best if scores[i] >= min_score and self.message_ids[rows[i]] >= 0
+                ])
+            return results
+
+    def _exact_scores(self, query: np.ndarray, count: int, chunk_size: int = 262_144) -> np.ndarray:
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, chunk_size):
+            end = min(start + chunk_size, count)
+            scores[start:end] = np.asarray(self.vectors[start:end], dtype=np.float32) @ query
+        return scores
+
+
+def default_index_dir(db_path: str) -> str:
+    """Directory next to the SQLite file that holds its memory index"""
+    return os.path.splitext(db_path)[0] + "_memory"
@@ -0,0 +1,267 @@
+import os
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from conversation_database import ConversationDatabase, DATABASE_PATH
+
+# Number of SQLite files conversations are spread across (1 = unsharded)
+CONVERSATION_SHARDS = int(os.environ.get("CONVERSATION_SHARDS", 1))
+
+
+def shard_path(db_path: str, shard: int) -> str:
+    """File for one shard, next to the base database path"""
+    if db_path == ":memory:":
+        return db_path
+    stem, extension = os.path.splitext(db_path)
+    return f"{stem}_shard{shard}{extension or '.db'}"
+
+
+class ShardedConversationDatabase:
+    """ConversationDatabase spread over several SQLite files.
+
+    Every shard carries the full schema and its own writer lock, so writes to
+    conversations on different shards never wait on each other. Shard ``i``
+    hands out conversation and message IDs ``i + 1``, ``i + 1 + N``, ..., which
+    keeps IDs unique across shards and lets any ID be routed with
+    ``(id - 1) % N``. Listing, search and statistics are scatter-gathered
+    across all shards in parallel and merged.
+    """
+
+    def __init__(self, db_path: str = DATABASE_PATH, shard_count: int = CONVERSATION_SHARDS):
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        self.db_path = db_path
+        self.shard_count = shard_count
+        self.shards = [
+            ConversationDatabase(shard_path(db_path, shard), id_offset=shard + 1, id_stride=shard_count)
+            for shard in range(shard_count)
+        ]
+        self.fts_enabled = all(shard.fts_enabled for shard in self.shards)
+        self._executor = ThreadPoolExecutor(max_workers=shard_count, thread_name_prefix="conversation-shard")
+        self._next_shard = itertools.count()
+        logging.info(f"✅ Sharded conversation database ready ({shard_count} shards)")
+
+    def close(self):
+        """Release scatter-gather threads and every shard's connections"""
+        self._executor.shutdown()
+        for shard in self.shards:
+            shard.close()
+
+    def shard_for(self, row_id: int) -> ConversationDatabase:
+        """Shard that owns a conversation (or message) ID"""
+        return self.shards[(row_id - 1) % self.shard_count]
+
+    def _gather(self, method: str, *args, **kwargs) -> List:
+        """Call ``method`` on every shard in parallel and return the results in shard order"""
+        futures = [self._executor.submit(getattr(shard, method), *args, **kwargs) for shard in self.shards]
+        return [future.result() for future in futures]
+
+    # Writes
+
+    def create_conversation(self, title: str, summary: str = None, tags: List[str] = None) -> int:
+        """Create a conversation on the next shard in round-robin order"""
+        shard = self.shards[next(self._next_shard) % self.shard_count]
+        return shard.create_conversation(title, summary, tags)
+
+    def add_message(self, conversation_id: int, role: str, content: str,
+                    message_type: str = "text", metadata: Dict = None) -> int:
+        return self.shard_for(conversation_id).add_message(conversation_id, role, content, message_type, metadata)
+
+    def add_messages(self, messages: List[Dict]) -> List[int]:
+        """Add messages with one transaction per shard, returning IDs in input order"""
+        by_shard: Dict[int, List[int]] = {}
+        for position, message in enumerate(messages):
+            by_shard.setdefault((message['conversation_id'] - 1) % self.shard_count, []).append(position)
+
+        futures = {
+            shard: self._executor.submit(self.shards[shard].add_messages, [messages[i] for i in positions])
+            for shard, positions in by_shard.items()
+        }
+        message_ids = [None] * len(messages)
+        for shard, positions in by_shard.items():
+            for position, message_id in zip(positions, futures[shard].result()):
+                message_ids[position] = message_id
+        return message_ids
+
+    def add_conversation_context(self, conversation_id: int, context_type: str, context_data: Dict) -> int:
+        return self.shard_for(conversation_id).add_conversation_context(conversation_id, context_type, context_data)
+
+    def update_conversation_summary(self, conversation_id: int, summary: str):
+        return self.shard_for(conversation_id).update_conversation_summary(conversation_id, summary)
+
+    def update_conversation_title(self, conversation_id: int, title: str):
+        return self.shard_for(conversation_id).update_conversation_title(conversation_id, title)
+
+    def delete_conversation(self, conversation_id: int):
+        return self.shard_for(conversation_id).delete_conversation(conversation_id)
+
+    def _group_by_shard(self, conversation_ids: List[int]) -> Dict[int, List[int]]:
+        by_shard: Dict[int, List[int]] = {}
+        for conversation_id in conversation_ids:
+            by_shard.setdefault((conversation_id - 1) % self.shard_count, []).append(conversation_id)
+        return by_shard
+
+    def delete_conversations(self, conversation_ids: List[int]) -> int:
+        futures = [self._executor.submit(self.shards[shard].delete_conversations, ids)
+                   for shard, ids in self._group_by_shard(conversation_ids).items()]
+        return sum(future.result() for future in futures)
+
+    def delete_conversations_if_unchanged(self, versions: Dict[int, Tuple[str, int]]) -> List[int]:
+        futures = [self._executor.submit(self.shards[shard].delete_conversations_if_unchanged,
+                                         {conversation_id: versions[conversation_id] for conversation_id in ids})
+                   for shard, ids in self._group_by_shard(list(versions)).items()]
+        return [conversation_id for future in futures for conversation_id in future.result()]
+
+    def purge_conversations(self, conversation_ids: List[int] = None, older_than_days: float = None,
+                            chunk_size: int = 200, pause_seconds: float = 0.05) -> Future:
+        """Purge every shard in the background at once; resolves to the total deleted"""
+        if conversation_ids is not None:
+            futures = [self.shards[shard].purge_conversations(ids, None, chunk_size, pause_seconds)
+                       for shard, ids in self._group_by_shard(conversation_ids).items()]
+        else:
+            futures = [shard.purge_conversations(None, older_than_days, chunk_size, pause_seconds)
+                       for shard in self.shards]
+
+        combined = Future()
+        if not futures:
+            combined.set_result(0)
+            return combined
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def shard_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            errors = [future.exception() for future in futures if future.exception()]
+            if errors:
+                combined.set_exception(errors[0])
+            else:
+                combined.set_result(sum(future.result() for future in futures))
+
+        for future in futures:
+            future.add_done_callback(shard_done)
+        return combined
+
+    def get_existing_conversation_ids(self, conversation_ids: List[int]) -> List[int]:
+        futures = [self._executor.submit(self.shards[shard].get_existing_conversation_ids, ids)
+                   for shard, ids in self._group_by_shard(conversation_ids).items()]
+        return [conversation_id for future in futures for conversation_id in future.result()]
+
+    def restore_conversation(self, snapshot: Dict):
+        return self.shard_for(snapshot['conversation_id']).restore_conversation(snapshot)
+
+    def enable_incremental_vacuum(self):
+        self._gather('enable_incremental_vacuum')
+
+    def incremental_vacuum(self, pages: int = 0) -> int:
+        return sum(self._gather('incremental_vacuum', pages))
+
+    # Single-conversation reads
+
+    def get_conversation(self, conversation_id: int, include_messages: bool = True) -> Optional[Dict]:
+        return self.shard_for(conversation_id).get_conversation(conversation_id, include_messages)
+
+    def iter_messages(self, conversation_id: int, batch_size: int = 500,
+                      after: Optional[Tuple[str, int]] = None) -> Iterator[Dict]:
+        return self.shard_for(conversation_id).iter_messages(conversation_id, batch_size, after)
+
+    def get_message_page(self, conversation_id: int, limit: int = 50,
+                         before: Optional[Tuple[str, int]] = None) -> Dict:
+        return self.shard_for(conversation_id).get_message_page(conversation_id, limit, before)
+
+    def get_conversation_context(self, conversation_id: int, context_type: str = None) -> List[Dict]:
+        return self.shard_for(conversation_id).get_conversation_context(conversation_id, context_type)
+
+    # Cross-shard reads
+
+    @staticmethod
+    def _merge(results: List[List[Dict]], key, limit: int, reverse: bool = True) -> List[Dict]:
+        """Merge per-shard lists that are each already sorted by ``key``"""
+        return list(itertools.islice(heapq.merge(*results, key=key, reverse=reverse), limit))
+
+    def get_next_sequence_number(self) -> int:
+        """Next session number across the deployment (each shard numbers its own conversations)"""
+        return sum(number - 1 for number in self._gather('get_next_sequence_number')) + 1
+
+    def get_all_conversations(self, limit: int = 50) -> List[Dict]:
+        return self._merge(self._gather('get_all_conversations', limit),
+                           key=lambda conversation: conversation['updated_at'], limit=limit)
+
+    def search_conversations(self, query: str, limit: int = 50) -> List[Dict]:
+        if self.fts_enabled:
+            return self.search_conversations_page(query, page_size=limit)['conversations']
+        results = self._gather('search_conversations', query, limit)
+        return sorted(itertools.chain(*results), key=lambda conversation: conversation['updated_at'], reverse=True)
+
+    def search_conversations_page(self, query: str, page_size: int = 20,
+                                  cursor: Optional[Tuple[str, int]] = None,
+                                  highlight: Tuple[str, str] = ("<mark>", "</mark>")) -> Dict:
+        """Search every shard for one page and merge on (updated_at, conversation_id).
+
+        The keyset cursor is shard-independent, so the same cursor can be sent
+        to every shard to fetch the following page.
+        """
+        results = self._gather('search_conversations_page', query, page_size, cursor, highlight)
+        conversations = self._merge(
+            [result['conversations'] for result in results],
+            key=lambda conversation: (conversation['updated_at'], conversation['conversation_id']),
+            limit=page_size + 1
+        )
+        has_more = len(conversations) > page_size or any(result['next_cursor'] for result in results)
+        conversations = conversations[:page_size]
+        next_cursor = None
+        if has_more and conversations:
+            next_cursor = (conversations[-1]['updated_at'], conversations[-1]['conversation_id'])
+        return {'conversations': conversations, 'next_cursor': next_cursor}
+
+    def get_relevant_context(self, current_query: str, limit: int = 5) -> List[Dict]:
+        return self._merge(self._gather('get_relevant_context', current_query, limit),
+                           key=lambda context: context['created_at'], limit=limit)
+
+    def find_conversations_by_context(self, product_interest: str = None, min_budget: float = None,
+                                      max_budget: float = None, order_related: bool = None,
+                                      limit: int = 50) -> List[Dict]:
+        results = self._gather('find_conversations_by_context', product_interest, min_budget, max_budget,
+                               order_related, limit)
+        return self._merge(results, key=lambda conversation: (conversation['updated_at'], conversation['conversation_id']),
+                           limit=limit)
+
+    def get_recent_context(self, limit: int = 500) -> List[Dict]:
+        return self._merge(self._gather('get_recent_context', limit),
+                           key=lambda context: context['created_at'], limit=limit)
+
+    def get_messages_after(self, message_id: int, limit: int = 1000, role: str = None) -> List[Dict]:
+        return self._merge(self._gather('get_messages_after', message_id, limit, role),
+                           key=lambda message: message['message_id'], limit=limit, reverse=False)
+
+    def get_conversation_ids_older_than(self, days: float, limit: int = 100) -> List[int]:
+        return list(itertools.islice(itertools.chain(*self._gather('get_conversation_ids_older_than', days, limit)), limit))
+
+    def get_conversation_statistics(self) -> Dict:
+        """Sum per-shard statistics"""
+        statistics = self._gather('get_conversation_statistics')
+        totals = {
+            key: sum(shard[key] for shard in statistics)
+            for key in ('total_conversations', 'total_messages', 'recent_conversations', 'conversations_with_messages')
+        }
+        with_messages = totals['conversations_with_messages']
+        totals['average_messages_per_conversation'] = (
+            round(totals['total_messages'] / with_messages, 2) if with_messages else 0
+        )
+        return totals
+
+    def get_hourly_statistics(self, hours: int = 24 * 7) -> List[Dict]:
+        """Per-hour rollups summed across shards, oldest first"""
+        merged: Dict[str, Dict] = {}
+        for rows in self._gather('get_hourly_statistics', hours):
+            for row in rows:
+                hour = merged.setdefault(row['hour'], dict.fromkeys(row, 0))
+                for key, value in row.items():
+                    hour[key] = value if key == 'hour' else hour[key] + value
+        return [merged[hour] for hour in sorted(merged)]
@@ -0,0 +1,104 @@
+import os
+import time
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+STT_PROVIDER = os.environ.get("STT_PROVIDER", "groq")
+# Provider to retry with when the primary one fails or times out ("" disables)
+STT_FALLBACK_PROVIDER = os.environ.get("STT_FALLBACK_PROVIDER", "")
+STT_TIMEOUT_SECONDS = float(os.environ.get("STT_TIMEOUT_SECONDS", 15))
+STT_SIDECAR_DIR = os.environ.get("STT_SIDECAR_DIR", "stt_fixtures")
+
+_AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".ogg", ".webm", ".flac"}
+
+
+class STTProvider(ABC):
+    """Speech-to-text backend used by EcommerceVoiceAssistant.
+
+    ``transcribe`` returns the text, or raises so the caller can fall back.
+    Providers that set ``uses_prepared_audio`` to False receive the
+    recording exactly as it arrived rather than the normalized, trimmed upload.
+    """
+
+    name = "base"
+    uses_prepared_audio = True
+
+    @abstractmethod
+    def transcribe(self, audio: bytes, filename: str) -> str:
+        """Return the transcript of ``audio``; ``filename`` names its container"""
+
+
+class GroqWhisperSTT(STTProvider):
+    """Whisper hosted on Groq"""
+
+    def __init__(self, client, model: str = "whisper-large-v3", language: str = "en",
+                 timeout: float = STT_TIMEOUT_SECONDS, name: str = "groq"):
+        self.client = client
+        self.model = model
+        self.language = language
+        self.timeout = timeout
+        self.name = name
+
+    def transcribe(self, audio: bytes, filename: str) -> str:
+        transcription = self.client.audio.transcriptions.create(
+            model=self.model,
+            file=(filename, audio if isinstance(audio, bytes) else bytes(audio)),
+            language=self.language,
+            timeout=self.timeout
+        )
+        return transcription.text.strip()
+
+
+class SidecarTranscriptSTT(STTProvider):
+    """Offline, deterministic stand-in that reads transcripts from sidecar files.
+
+    Every recording in ``directory`` with a ``<name>.txt`` next to it is
+    indexed by the SHA-256 of its bytes and by its file stem. A recording is
+    matched by content first, then by the stem of the name it was uploaded
+    under. ``latency_seconds`` simulates network time for load tests.
+    """
+
+    name = "sidecar"
+    uses_prepared_audio = False
+
+    def __init__(self, directory: str = STT_SIDECAR_DIR, latency_seconds: float = 0.0,
+                 default_transcript: Optional[str] = None):
+        self.directory = directory
+        self.latency_seconds = latency_seconds
+        self.default_transcript = default_transcript
+        self._by_digest: Dict[str, str] = {}
+        self._by_stem: Dict[str, str] = {}
+        self.reload()
+
+    def reload(self):
+        """Re-scan the sidecar directory"""
+        self._by_digest.clear()
+        self._by_stem.clear()
+        if not os.path.isdir(self.directory):
+            logging.warning(f"⚠️ Sidecar transcript directory not found: {self.directory}")
+            return
+        for name in sorted(os.listdir(self.directory)):
+            stem, extension = os.path.splitext(name)
+            transcript_path = os.path.join(self.directory, stem + ".txt")
+            if extension.lower() not in _AUDIO_EXTENSIONS or not os.path.exists(transcript_path):
+                continue
+            with open(transcript_path, encoding="utf-8") as f:
+                transcript = f.read().strip()
+            with open(os.path.join(self.directory, name), "rb") as f:
+                self._by_digest[hashlib.sha256(f.read()).hexdigest()] = transcript
+            self._by_stem[stem] = transcript
+        logging.info(f"✅ Sidecar STT loaded {len(self._by_stem)} transcripts from {self.directory}")
+
+    def transcribe(self, audio: bytes, filename: str) -> str:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        transcript = self._by_digest.get(hashlib.sha256(audio).hexdigest())
+        if transcript is None:
+            transcript = self._by_stem.get(os.path.splitext(os.path.basename(filename))[0])
+        if transcript is None:
+            transcript = self.default_transcript
+        if transcript is None:
+            raise LookupError(f"No sidecar transcript for {filename}")
+        return transcript
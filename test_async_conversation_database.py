@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for AsyncConversationDatabase
+Runs concurrent coroutines against a scratch database and checks the results
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+from async_conversation_database import AsyncConversationDatabase
+
+
+def run(coroutine_function):
+    """Run a test coroutine against a fresh file-backed database"""
+    with tempfile.TemporaryDirectory() as directory:
+        async def main():
+            async with AsyncConversationDatabase(os.path.join(directory, "conversations.db"), readers=3) as db:
+                await coroutine_function(db)
+        asyncio.run(main())
+
+
+def test_concurrent_writes_keep_submission_order():
+    async def scenario(db):
+        conversation_id = await db.create_conversation("Async session")
+        message_ids = await asyncio.gather(*[
+            db.add_message(conversation_id, "user", f"message {i}") for i in range(20)
+        ])
+        assert message_ids == sorted(message_ids)
+        conversation = await db.get_conversation(conversation_id)
+        assert [m["content"] for m in conversation["messages"]] == [f"message {i}" for i in range(20)]
+        assert conversation["message_count"] == 20
+    run(scenario)
+
+
+def test_reads_run_alongside_writes():
+    async def scenario(db):
+        conversation_ids = await asyncio.gather(*[db.create_conversation(f"Laptop {i}") for i in range(5)])
+        await db.add_messages([{"conversation_id": conversation_id, "role": "user", "content": "laptop deals"}
+                               for conversation_id in conversation_ids])
+        listed, found, statistics = await asyncio.gather(
+            db.get_all_conversations(10),
+            db.search_conversations("laptop"),
+            db.get_conversation_statistics(),
+        )
+        assert sorted(c["conversation_id"] for c in listed) == sorted(conversation_ids)
+        assert sorted(c["conversation_id"] for c in found) == sorted(conversation_ids)
+        assert statistics["total_messages"] == 5
+    run(scenario)
+
+
+def test_iter_messages_pages_through_a_conversation():
+    async def scenario(db):
+        conversation_id = await db.create_conversation("Long session")
+        await db.add_messages([{"conversation_id": conversation_id, "role": "user", "content": f"line {i}"}
+                               for i in range(7)])
+        contents = [message["content"] async for message in db.iter_messages(conversation_id, batch_size=3)]
+        assert contents == [f"line {i}" for i in range(7)]
+    run(scenario)
+
+
+def test_purge_is_awaitable():
+    async def scenario(db):
+        conversation_ids = [await db.create_conversation(f"Old {i}") for i in range(3)]
+        assert await db.purge_conversations(conversation_ids=conversation_ids[:2], chunk_size=1, pause_seconds=0) == 2
+        assert [c["conversation_id"] for c in await db.get_all_conversations()] == conversation_ids[2:]
+    run(scenario)
+
+
+def main():
+    """Main test function"""
+
+    print("⚡ Async Conversation Database Tests")
+    print("=" * 50)
+
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
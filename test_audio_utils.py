@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the STT audio normalization in audio_utils
+Checks rate and channel conversion and anti-aliasing with synthetic signals
+"""
+
+import sys
+import wave
+from io import BytesIO
+
+import numpy as np
+
+from audio_utils import STT_SAMPLE_RATE, normalize_for_stt, pcm_samples, pcm_to_wav, read_wav, resample
+
+
+def tone(frequency, seconds, rate, amplitude=0.5):
+    return (amplitude * 32767 * np.sin(2 * np.pi * frequency * np.arange(int(seconds * rate)) / rate)).astype(np.float32)
+
+
+def level_at(samples, frequency, rate):
+    """Magnitude of one frequency relative to a full-scale sine, from a windowed FFT"""
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return spectrum[int(round(frequency * len(samples) / rate))] / (32767 * len(samples) / 4)
+
+
+def test_48k_stereo_becomes_16k_mono():
+    left, right = tone(440, 1.0, 48000), tone(440, 1.0, 48000, amplitude=0.1)
+    stereo = np.column_stack([left, right]).astype("<i2").tobytes()
+    wav = pcm_to_wav(stereo, 48000, channels=2)
+
+    audio = read_wav(normalize_for_stt(wav))
+    assert (audio.sample_rate, audio.channels, audio.sample_width) == (STT_SAMPLE_RATE, 1, 2)
+    assert len(audio.pcm) // 2 == STT_SAMPLE_RATE
+    # The downmix averages the channels: (0.5 + 0.1) / 2 of full scale at 440 Hz
+    assert abs(level_at(pcm_samples(audio.pcm), 440, STT_SAMPLE_RATE) - 0.3) < 0.02
+
+    # Readable by the standard library as well
+    with wave.open(BytesIO(bytes(normalize_for_stt(wav)))) as reader:
+        assert (reader.getframerate(), reader.getnchannels()) == (STT_SAMPLE_RATE, 1)
+
+
+def test_target_format_is_returned_unchanged():
+    wav = pcm_to_wav(tone(440, 0.5, STT_SAMPLE_RATE).astype("<i2").tobytes(), STT_SAMPLE_RATE)
+    assert normalize_for_stt(wav) is wav
+
+
+def test_downsampling_removes_content_above_the_new_nyquist():
+    # 10 kHz at 48 kHz would fold down to 6 kHz at 16 kHz without the low-pass
+    resampled = resample(tone(10000, 1.0, 48000), 48000, 16000)
+    assert level_at(resampled, 6000, 16000) < 1e-3
+    # In-band content passes
+    kept = resample(tone(1000, 1.0, 48000), 48000, 16000)
+    assert abs(level_at(kept, 1000, 16000) - 0.5) < 0.02
+
+
+def test_non_integer_ratios_and_upsampling():
+    from_44k = resample(tone(1000, 1.0, 44100), 44100, 16000)
+    assert len(from_44k) == 16000
+    assert abs(level_at(from_44k, 1000, 16000) - 0.5) < 0.02
+    from_8k = resample(tone(1000, 1.0, 8000), 8000, 16000)
+    assert len(from_8k) == 16000
+    assert abs(level_at(from_8k, 1000, 16000) - 0.5) < 0.05
+
+
+def main():
+    """Main test function"""
+
+    print("🎚️ Audio Normalization Tests")
+    print("=" * 50)
+
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for chunked transcription
+Covers chunk planning at pauses, overlap only at hard cuts, and stitching
+"""
+
+import sys
+import threading
+import time
+
+from chunked_stt import plan_chunks, split_for_transcription, stitch_transcripts, transcribe_chunks
+from audio_utils import pcm_to_wav, read_wav
+from voice_activity import SpeechActivity
+
+RATE = 16000
+
+
+def activity(*segments_seconds):
+    """SpeechActivity from (start, end) speech segments given in seconds"""
+    segments = [(int(start * RATE), int(end * RATE)) for start, end in segments_seconds]
+    total = segments[-1][1] / RATE + 1
+    speech = sum(end - start for start, end in segments) / RATE
+    return SpeechActivity(RATE, total, speech, -45.0, segments)
+
+
+def seconds(chunks):
+    return [(round(chunk.start / RATE, 2), round(chunk.end / RATE, 2), chunk.overlaps_previous) for chunk in chunks]
+
+
+def test_short_span_is_one_chunk():
+    assert seconds(plan_chunks(activity((1, 40)), target_seconds=30)) == [(1.0, 40.0, False)]
+
+
+def test_cuts_fall_in_the_pause_nearest_the_target():
+    # Pauses at 20-21 s, 29-31 s and 50-51 s; the cut goes in the middle of 29-31 s
+    chunks = plan_chunks(activity((0, 20), (21, 29), (31, 50), (51, 70)), target_seconds=30, overlap_seconds=1)
+    assert seconds(chunks) == [(0.0, 30.0, False), (30.0, 70.0, False)]
+
+
+def test_hard_cuts_overlap_both_neighbours():
+    # 100 s of unbroken speech: cuts at 30 s and 60 s, each widened by 1 s on both sides
+    chunks = plan_chunks(activity((0, 100)), target_seconds=30, overlap_seconds=1)
+    assert seconds(chunks) == [(0.0, 31.0, False), (29.0, 61.0, True), (59.0, 100.0, True)]
+
+
+def test_mixed_cuts_only_overlap_where_speech_runs_on():
+    chunks = plan_chunks(activity((0, 29.5), (30.5, 100)), target_seconds=30, overlap_seconds=1)
+    assert [chunk.overlaps_previous for chunk in chunks] == [False, False, True]
+    assert chunks[0].end == chunks[1].start == 30 * RATE
+
+
+def test_split_for_transcription_cuts_the_pcm():
+    pcm = bytes(2 * RATE * 100)
+    chunks, overlapped = split_for_transcription(pcm_to_wav(pcm, RATE), activity((0, 100)),
+                                                 target_seconds=30, overlap_seconds=1)
+    assert overlapped == [False, True, True]
+    assert [len(read_wav(chunk).pcm) // 2 / RATE for chunk in chunks] == [31.0, 32.0, 41.0]
+
+
+def test_stitch_drops_repeats_only_across_overlaps():
+    texts = ["I said no.", "No, I don't want it."]
+    assert stitch_transcripts(texts, [False, False]) == "I said no. No, I don't want it."
+    assert stitch_transcripts(texts, [False, True]) == "I said no. I don't want it."
+    assert stitch_transcripts(["Where is my order, the blue", "the blue one? It was shipped", "", "shipped Monday."],
+                              [False, True, True, True]) == "Where is my order, the blue one? It was shipped Monday."
+
+
+def test_stitch_keeps_everything_without_a_shared_run():
+    assert stitch_transcripts(["cheap headphones", "for running"], [False, True]) == "cheap headphones for running"
+    # Longest run wins over a shorter coincidental one
+    assert stitch_transcripts(["a b a b", "a b a b c"], [False, True]) == "a b a b c"
+    assert stitch_transcripts(["one two three"], [False], max_overlap_words=2) == "one two three"
+
+
+def test_transcribe_chunks_is_concurrent_bounded_and_ordered():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def transcribe(chunk):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02 * (5 - chunk[0]))
+        with lock:
+            running[0] -= 1
+        return f"part{chunk[0]}"
+
+    chunks = [bytes([i]) for i in range(5)]
+    assert transcribe_chunks(transcribe, chunks, [False] * 5, workers=2) == "part0 part1 part2 part3 part4"
+    assert peak[0] == 2
+
+
+def main():
+    """Main test function"""
+
+    print("✂️ Chunked Transcription Tests")
+    print("=" * 50)
+
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for ContextCache
+Checks write-through, matching, eviction and TTL reloads against a scratch
+in-memory database
+"""
+
+import sys
+
+from context_cache import ContextCache
+from conversation_database import ConversationDatabase
+
+
+def scratch():
+    db = ConversationDatabase(":memory:")
+    laptop_id = db.create_conversation("Laptop search")
+    db.add_conversation_context(laptop_id, "product_interest", {"product_interest": "laptop", "budget": 900})
+    return db, laptop_id
+
+
+def test_lookups_are_served_from_the_cache():
+    db, laptop_id = scratch()
+    try:
+        cache = ContextCache(db, ttl_seconds=300)
+        cache.load()
+        # Later writes that bypass the cache are invisible until the next reload
+        db.add_conversation_context(laptop_id, "product_interest", {"product_interest": "tablet"})
+        assert [c["context_data"]["product_interest"] for c in cache.get_relevant_context("a laptop please")] == ["laptop"]
+        assert cache.get_relevant_context("tablet") == []
+        # Stopwords and short words alone match nothing
+        assert cache.get_relevant_context("what are you looking for") == []
+        assert cache.get_relevant_context("") == []
+    finally:
+        db.close()
+
+
+def test_add_context_writes_through():
+    db, laptop_id = scratch()
+    try:
+        cache = ContextCache(db)
+        cache.load()
+        phone_id = db.create_conversation("Phone deals")
+        cache.remember_title(phone_id, "Phone deals")
+        cache.add_context(phone_id, "product_interest", {"product_interests": ["iphone", "pixel"]})
+
+        hits = cache.get_relevant_context("pixel")
+        assert [(c["conversation_id"], c["conversation_title"]) for c in hits] == [(phone_id, "Phone deals")]
+        assert [c["context_type"] for c in db.get_conversation_context(phone_id)] == ["product_interest"]
+        assert [c["conversation_id"] for c in cache.get_context_for_conversations([laptop_id, phone_id])] == [
+            laptop_id, phone_id
+        ]
+    finally:
+        db.close()
+
+
+def test_oldest_entries_are_evicted():
+    db, laptop_id = scratch()
+    try:
+        cache = ContextCache(db, max_entries=2)
+        cache.load()
+        cache.add_context(laptop_id, "product_interest", {"product_interest": "monitor"})
+        cache.add_context(laptop_id, "product_interest", {"product_interest": "keyboard"})
+        # The loaded laptop entry, the only one with a 900 budget, was pushed out
+        assert cache.get_relevant_context("900") == []
+        assert len(cache.get_relevant_context("monitor")) == 1
+        assert len(cache.get_relevant_context("keyboard")) == 1
+    finally:
+        db.close()
+
+
+def test_stale_cache_reloads_writes_from_other_sessions():
+    db, laptop_id = scratch()
+    try:
+        cache = ContextCache(db, ttl_seconds=0)
+        cache.load()
+        other_id = db.create_conversation("Coffee machines")
+        db.add_conversation_context(other_id, "product_interest", {"product_interest": "espresso"})
+        assert cache.is_stale()
+        hits = cache.get_relevant_context("espresso")
+        assert [(c["conversation_id"], c["conversation_title"]) for c in hits] == [(other_id, "Coffee machines")]
+    finally:
+        db.close()
+
+
+def main():
+    """Main test function"""
+
+    print("🗂️ Context Cache Tests")
+    print("=" * 50)
+
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
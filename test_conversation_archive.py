@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for ConversationArchive
+Archives aged scratch conversations, searches them and restores them
+"""
+
+import os
+import sys
+import tempfile
+
+from conversation_archive import ConversationArchive
+from conversation_database import ConversationDatabase
+
+
+def age(db, conversation_id, days):
+    """Backdate a conversation so it falls in the archival window"""
+    with db.pool.connection() as conn:
+        conn.execute("UPDATE conversations SET updated_at = datetime('now', ?) WHERE conversation_id = ?",
+                     (f"-{days} days", conversation_id))
+
+
+def scratch(directory):
+    db = ConversationDatabase(os.path.join(directory, "conversations.db"))
+    return db, ConversationArchive(db)
+
+
+def test_archive_and_restore_round_trip():
+    with tempfile.TemporaryDirectory() as directory:
+        db, archive = scratch(directory)
+        try:
+            old_id = db.create_conversation("Winter boots", "Looking for waterproof boots", ["boots"])
+            db.add_message(old_id, "user", "Do you have waterproof boots?")
+            db.add_message(old_id, "assistant", "Yes, in sizes 6 to 12")
+            db.add_conversation_context(old_id, "product_interest", {"product_interest": "boots", "budget": 120})
+            recent_id = db.create_conversation("Headphones")
+            db.add_message(recent_id, "user", "Noise cancelling headphones?")
+            age(db, old_id, 120)
+            before = db.get_conversation(old_id)
+
+            assert archive.archive_conversations(older_than_days=90) == 1
+            assert db.get_conversation(old_id) is None
+            assert db.get_conversation(recent_id) is not None
+            assert [c["conversation_id"] for c in archive.search_archive("waterproof")] == [old_id]
+            assert archive.get_archived_conversation(old_id)["messages"] == before["messages"]
+
+            assert archive.restore_conversation(old_id)
+            restored = db.get_conversation(old_id)
+            assert restored["messages"] == before["messages"]
+            assert restored["updated_at"] == before["updated_at"]
+            assert [c["context_data"] for c in db.get_conversation_context(old_id)] == [
+                {"product_interest": "boots", "budget": 120}
+            ]
+            assert db.find_conversations_by_context(product_interest="boots")[0]["conversation_id"] == old_id
+            assert archive.get_archived_conversation(old_id) is None
+            assert archive.search_archive("waterproof") == []
+            assert not archive.restore_conversation(old_id)
+        finally:
+            archive.pool.close()
+            db.close()
+
+
+def test_conversation_resumed_during_archival_stays_hot():
+    """A message written between snapshot and delete keeps the conversation out of the archive"""
+    with tempfile.TemporaryDirectory() as directory:
+        db, archive = scratch(directory)
+        try:
+            conversation_id = db.create_conversation("Returns")
+            db.add_message(conversation_id, "user", "How do I return a jacket?")
+            age(db, conversation_id, 120)
+
+            delete_if_unchanged = db.delete_conversations_if_unchanged
+
+            def resume_then_delete(versions):
+                db.add_message(conversation_id, "user", "Actually, I want to exchange it")
+                return delete_if_unchanged(versions)
+
+            db.delete_conversations_if_unchanged = resume_then_delete
+            assert archive.archive_conversations(older_than_days=90, max_batches=1) == 0
+
+            assert [m["content"] for m in db.get_conversation(conversation_id)["messages"]] == [
+                "How do I return a jacket?", "Actually, I want to exchange it"
+            ]
+            assert archive.get_archived_conversation(conversation_id) is None
+            assert archive.search_archive("jacket") == []
+        finally:
+            archive.pool.close()
+            db.close()
+
+
+def main():
+    """Main test function"""
+
+    print("📦 Conversation Archive Tests")
+    print("=" * 50)
+
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
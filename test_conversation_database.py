@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Behavior tests for ConversationDatabase
+Runs against scratch in-memory databases and checks the results of writes
+and context filters
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+from conversation_database import ConversationDatabase, GroupCommitWriter
+
+
+def scratch_database():
+    return ConversationDatabase(":memory:")
+
+
+def test_secondary_product_interest_is_found():
+    """List items are filed under the list's key, so every interest is searchable"""
+    db = scratch_database()
+    try:
+        conversation_id = db.create_conversation("Phones and laptops")
+        db.add_conversation_context(conversation_id, "product_interest",
+                                    {"product_interest": "laptop", "product_interests": ["laptop", "Phone"]})
+        other_id = db.create_conversation("Headphones")
+        db.add_conversation_context(other_id, "product_interest", {"product_interest": "headphones"})
+
+        assert [c["conversation_id"] for c in db.find_conversations_by_context(product_interest="phone")] == [conversation_id]
+        assert [c["conversation_id"] for c in db.find_conversations_by_context(product_interest="laptop")] == [conversation_id]
+        with db.pool.connection() as conn:
+            keys = {row[0] for row in conn.execute("SELECT key FROM context_facts")}
+        assert keys == {"product_interest", "product_interests"}
+    finally:
+        db.close()
+
+
+def test_order_related_filter():
+    """True keeps order conversations, False excludes them even on its own, None ignores the flag"""
+    db = scratch_database()
+    try:
+        order_id = db.create_conversation("Where is my order")
+        db.add_conversation_context(order_id, "order_related", {"order_related": True, "budget": 200})
+        browsing_id = db.create_conversation("Browsing")
+        db.add_conversation_context(browsing_id, "product_interest", {"product_interest": "laptop", "budget": 500})
+
+        def ids(**filters):
+            return sorted(c["conversation_id"] for c in db.find_conversations_by_context(**filters))
+
+        assert ids(order_related=True) == [order_id]
+        assert ids(order_related=False) == [browsing_id]
+        assert ids(order_related=None) == sorted([order_id, browsing_id])
+        assert ids() == sorted([order_id, browsing_id])
+        assert ids(order_related=False, min_budget=100) == [browsing_id]
+        assert ids(order_related=True, min_budget=300) == []
+    finally:
+        db.close()
+
+
+def test_group_commit_failure_only_fails_the_bad_message():
+    """A foreign-key violation in one message leaves the rest of its batch committed"""
+    db = scratch_database()
+    try:
+        conversation_id = db.create_conversation("Group commit")
+        # A long delay keeps all three submissions in one batch
+        writer = GroupCommitWriter(db, max_delay_ms=500)
+        good = writer.submit(conversation_id, "user", "first")
+        bad = writer.submit(conversation_id + 999, "user", "no such conversation")
+        also_good = writer.submit(conversation_id, "assistant", "second")
+        writer.close()
+
+        try:
+            bad.result(timeout=5)
+            assert False, "message for a missing conversation was stored"
+        except sqlite3.IntegrityError:
+            pass
+        stored = [m["message_id"] for m in db.get_conversation(conversation_id)["messages"]]
+        assert stored == [good.result(timeout=5), also_good.result(timeout=5)]
+        assert [m["content"] for m in db.get_conversation(conversation_id)["messages"]] == ["first", "second"]
+    finally:
+        db.close()
+
+
+def test_group_commit_coalesces_concurrent_writers():
+    """Messages from many threads are committed in batches, and close flushes the queue"""
+    db = scratch_database()
+    try:
+        conversation_id = db.create_conversation("Busy session")
+        writer = GroupCommitWriter(db, max_delay_ms=20, max_batch=50)
+        batches = []
+        add_messages = db.add_messages
+        db.add_messages = lambda messages: batches.append(len(messages)) or add_messages(messages)
+
+        futures = []
+        lock = threading.Lock()
+
+        def submit(thread):
+            for i in range(25):
+                future = writer.submit(conversation_id, "user", f"{thread}-{i}")
+                with lock:
+                    futures.append(future)
+
+        threads = [threading.Thread(target=submit, args=(thread,)) for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        message_ids = [future.result(timeout=5) for future in futures]
+        assert len(set(message_ids)) == 100
+        assert db.get_conversation(conversation_id)["message_count"] == 100
+        assert sum(batches) == 100 and len(batches) < 100 and max(batches) <= 50
+        try:
+            writer.submit(conversation_id, "user", "too late")
+            assert False, "submit after close was accepted"
+        except RuntimeError:
+            pass
+    finally:
+        db.close()
+
+
+def test_older_schema_is_migrated_on_open():
+    """A file at an older user_version is brought up to date with its data intact"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "conversations.db")
+        db = ConversationDatabase(path)
+        conversation_id = db.create_conversation("Upgrade")
+        db.add_message(conversation_id, "user", "hello")
+        db.add_conversation_context(conversation_id, "product_interest", {"product_interests": ["laptop", "phone"]})
+        db.close()
+
+        # Roll the file back to before the context-facts rebuild, with keys written the old way
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE context_facts SET key = '\"product_interests\"'")
+            conn.execute("PRAGMA user_version = 3")
+        conn.close()
+
+        db = ConversationDatabase(path)
+        try:
+            assert db.schema_version == ConversationDatabase.MIGRATIONS[-1][0]
+            assert db.get_conversation(conversation_id)["message_count"] == 1
+            assert [c["conversation_id"] for c in db.find_conversations_by_context(product_interest="phone")] == [
+                conversation_id
+            ]
+            with db.pool.connection() as conn:
+                assert conn.execute("SELECT COUNT(*) FROM context_facts").fetchone()[0] == 2
+        finally:
+            db.close()
+
+        # Opening an up-to-date file runs nothing again
+        db = ConversationDatabase(path)
+        try:
+            with db.pool.connection() as conn:
+                assert conn.execute("SELECT COUNT(*) FROM context_facts").fetchone()[0] == 2
+        finally:
+            db.close()
+
+
+def main():
+    """Main test function"""
+
+    print("🗄️ ConversationDatabase Behavior Tests")
+    print("=" * 50)
+
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Round-trip tests for conversation_export
+Exports scratch databases, sharded and unsharded, to JSONL and loads them back
+"""
+
+import os
+import sys
+import tempfile
+
+from conversation_database import ConversationDatabase
+from conversation_export import export_jsonl, import_jsonl, iter_records
+from sharded_conversation_database import ShardedConversationDatabase
+
+
+def populate(db, conversations=4):
+    ids = []
+    for i in range(conversations):
+        conversation_id = db.create_conversation(f"Session {i}", tags=["export"])
+        db.add_message(conversation_id, "user", f"question {i}")
+        db.add_message(conversation_id, "assistant", f"answer {i}")
+        db.add_conversation_context(conversation_id, "product_interest", {"product_interest": f"item {i}"})
+        ids.append(conversation_id)
+    return ids
+
+
+def history(db):
+    """Conversation ID -> (title, [(message ID, content)], [context data]) across every shard"""
+    result = {}
+    for conversation in db.get_all_conversations(100):
+        full = db.get_conversation(conversation["conversation_id"])
+        result[conversation["conversation_id"]] = (
+            full["title"],
+            [(m["message_id"], m["content"]) for m in full["messages"]],
+            [c["context_data"] for c in db.get_conversation_context(conversation["conversation_id"])]
+        )
+    return result
+
+
+def test_sharded_export_includes_every_shard():
+    db = ShardedConversationDatabase(":memory:", shard_count=2)
+    try:
+        ids = populate(db)
+        exported = [r["conversation_id"] for r in iter_records(db) if r["type"] == "conversation"]
+        assert sorted(exported) == sorted(ids)
+    finally:
+        db.close()
+
+
+def test_round_trip_keeps_ids_across_shards_and_into_one_file():
+    source = ShardedConversationDatabase(":memory:", shard_count=2)
+    sharded = ShardedConversationDatabase(":memory:", shard_count=2)
+    single = ConversationDatabase(":memory:")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "history.jsonl.gz")
+        try:
+            populate(source)
+            counts = export_jsonl(source, path)
+            assert counts == {"conversation": 4, "message": 8, "context": 4}
+
+            assert import_jsonl(sharded, path) == counts
+            assert history(sharded) == history(source)
+            # Every conversation landed on the shard its ID routes to
+            for conversation_id in history(sharded):
+                assert sharded.shard_for(conversation_id).get_conversation(conversation_id) is not None
+
+            import_jsonl(single, path)
+            assert history(single) == history(source)
+        finally:
+            source.close()
+            sharded.close()
+            single.close()
+
+
+def test_new_ids_spread_over_shards():
+    source = ConversationDatabase(":memory:")
+    target = ShardedConversationDatabase(":memory:", shard_count=3)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "history.jsonl")
+        try:
+            populate(source, conversations=6)
+            export_jsonl(source, path)
+            # Unsharded message IDs do not follow the 3-shard layout
+            try:
+                import_jsonl(target, path)
+                assert False, "IDs outside the shard layout were accepted"
+            except ValueError:
+                pass
+
+            import_jsonl(target, path, keep_ids=False)
+            imported = history(target)
+            assert sorted(title for title, _, _ in imported.values()) == [f"Session {i}" for i in range(6)]
+            assert all(shard.get_all_conversations(100) for shard in target.shards)
+            for conversation_id, (_, messages, _) in imported.items():
+                shard = target.shard_for(conversation_id)
+                assert all(target.shard_for(message_id) is shard for message_id, _ in messages)
+        finally:
+            source.close()
+            target.close()
+
+
+def main():
+    """Main test function"""
+
+    print("📦 Conversation Export Tests")
+    print("=" * 50)
+
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for KeywordMatcher
+Covers word-start anchoring, nested matches, catalog-name priority and
+currency amounts picked up in the same pass
+"""
+
+import sys
+
+from keyword_matcher import KeywordMatcher, build_context_matcher
+
+CATALOG = [{"name": "iPhone 15 Pro", "price": 999}, {"name": "MacBook Air", "price": 1099}]
+
+
+def test_matches_are_anchored_at_word_starts():
+    """"order" matches "ordered" but not "border" or "reorder\""""
+    matcher = KeywordMatcher()
+    matcher.add("order", "topic")
+    assert [match.start for match in matcher.find_all("Ordered at the border")] == [0]
+    assert matcher.find_all("reorder") == []
+    assert matcher.find_all("my-order") != []
+
+
+def test_overlapping_keywords_share_a_pass():
+    """Failure links report keywords that end inside a longer partial match"""
+    matcher = KeywordMatcher()
+    matcher.add_all(["she", "shell", "hell"], "word")
+    assert [(match.start, match.value) for match in matcher.find_all("shell")] == [(0, "shell"), (0, "she")]
+    assert matcher.extract("she sells") == {"word": ["she"]}
+
+
+def test_extract_drops_matches_nested_in_a_longer_one():
+    matcher = build_context_matcher(CATALOG)
+    assert matcher.extract("Is the iPhone 15 Pro in stock?")["product_interest"] == ["iPhone 15 Pro"]
+    assert matcher.extract("iphone or samsung, any phone")["product_interest"] == ["iphone", "samsung", "phone"]
+
+
+def test_extract_groups_by_category_without_duplicates():
+    matches = build_context_matcher().extract("Where is my order? The order shipping is late")
+    assert matches["order_related"] == ["order", "shipping"]
+    assert matches["topic"] == ["order", "shipping"]
+
+
+def test_best_prefers_catalog_names_then_keyword_order():
+    matcher = build_context_matcher(CATALOG)
+    # Catalog names carry priority -1, ahead of every generic keyword
+    assert matcher.best("a laptop like the MacBook Air")["product_interest"] == "MacBook Air"
+    # Otherwise the keyword listed first in PRODUCT_KEYWORDS wins, wherever it appears
+    assert matcher.best("a laptop or an iphone")["product_interest"] == "iphone"
+    assert matcher.best("nothing relevant") == {}
+
+
+def test_budgets():
+    matcher = build_context_matcher()
+    assert matcher.extract("under $500")["budget"] == [500]
+    assert matcher.extract("about $1,299 or £800")["budget"] == [1299, 800]
+    # Budgets are whole currency units: pence and cents are dropped
+    assert matcher.extract("£49.99 max")["budget"] == [49]
+    assert "budget" not in matcher.extract("$ or £ alone")
+
+
+def test_adding_after_compile_recompiles():
+    matcher = KeywordMatcher()
+    matcher.add("bag", "product")
+    assert matcher.extract("a bag")
+    matcher.add("boots", "product")
+    assert matcher.extract("new boots") == {"product": ["boots"]}
+
+
+def main():
+    """Main test function"""
+
+    print("🔤 KeywordMatcher Tests")
+    print("=" * 50)
+
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
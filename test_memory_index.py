@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for MemoryIndex
+Syncs scratch conversation databases into a temporary index directory and
+checks what search returns after purges and writes from another instance
+"""
+
+import sys
+import tempfile
+
+from conversation_database import ConversationDatabase
+from memory_index import MemoryIndex
+from sharded_conversation_database import ShardedConversationDatabase
+
+
+def conversations_found(index, query, k=10):
+    return {hit['conversation_id'] for hit in index.search([query], k=k)[0]}
+
+
+def test_sync_indexes_new_user_messages_once():
+    db = ConversationDatabase(":memory:")
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            index = MemoryIndex(directory)
+            conversation_id = db.create_conversation("Headphones")
+            db.add_message(conversation_id, "user", "cheap wireless headphones")
+            db.add_message(conversation_id, "assistant", "Here are some budget earbuds")
+
+            assert index.sync(db) == 1
+            assert index.sync(db) == 0
+            db.add_message(conversation_id, "user", "noise cancelling please")
+            assert index.sync(db) == 1
+            assert index.count == 2
+            assert conversations_found(index, "budget earbuds") == {conversation_id}
+        finally:
+            db.close()
+
+
+def test_purged_conversations_are_pruned_and_not_reindexed():
+    db = ConversationDatabase(":memory:")
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            index = MemoryIndex(directory)
+            kept = db.create_conversation("Laptops")
+            db.add_message(kept, "user", "gaming laptop under 1500")
+            purged = db.create_conversation("Laptop returns")
+            db.add_message(purged, "user", "return my laptop order")
+            index.sync(db)
+            assert conversations_found(index, "laptop") == {kept, purged}
+
+            assert db.purge_conversations(conversation_ids=[purged]).result(timeout=10) == 1
+            assert index.prune(db) == 1
+            assert conversations_found(index, "laptop") == {kept}
+            # Nothing left to prune, and the purged messages are not picked up again
+            assert index.prune(db) == 0
+            db.add_message(kept, "user", "lightweight laptop for travel")
+            assert index.sync(db) == 1
+            assert conversations_found(index, "laptop") == {kept}
+        finally:
+            db.close()
+
+
+def test_instances_sharing_a_directory_see_each_others_writes():
+    """Stands in for two processes: each instance reloads when the other saves"""
+    db = ConversationDatabase(":memory:")
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            first, second = MemoryIndex(directory), MemoryIndex(directory)
+            conversation_id = db.create_conversation("Shoes")
+            db.add_message(conversation_id, "user", "running shoes size 10")
+            assert first.sync(db) == 1
+            # The second instance sees the high-water mark and does not index the message again
+            assert second.sync(db) == 0
+            assert conversations_found(second, "sneakers for running") == {conversation_id}
+
+            second.remove_conversations([conversation_id])
+            assert conversations_found(first, "sneakers for running") == set()
+        finally:
+            db.close()
+
+
+def test_sharded_sync_tracks_each_shard():
+    db = ShardedConversationDatabase(":memory:", shard_count=2)
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            index = MemoryIndex(directory)
+            first, second = db.create_conversation("Phones"), db.create_conversation("Kettles")
+            for text in ("android phone", "with a good camera", "under 400"):
+                db.add_message(first, "user", text)
+            db.add_message(second, "user", "electric kettle")
+            assert index.sync(db) == 4
+            # Shard 1 now writes message 4, below the 5 shard 0 has reached; it must still be indexed
+            assert db.add_message(second, "user", "stainless steel kettle") == 4
+            assert index.sync(db) == 1
+            assert index.count == 5
+            assert conversations_found(index, "kettle") >= {second}
+        finally:
+            db.close()
+
+
+def main():
+    """Main test function"""
+
+    print("🧠 Memory Index Tests")
+    print("=" * 50)
+
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for ConversationDatabase
+Runs every database method against a scratch database, records the SQL it
+issues and fails if EXPLAIN QUERY PLAN shows a hot query scanning a table
+"""
+
+import re
+import sys
+from collections import defaultdict
+
+from conversation_database import ConversationDatabase
+
+TABLES = {"conversations", "messages", "conversation_context", "conversation_stats", "hourly_stats", "context_facts"}
+
+# Methods whose scans are expected, with the reason
+ALLOWED_SCANS = {
+    "get_relevant_context": "LIKE '%query%' cannot use an index; ContextCache serves this on the hot path",
+    "search_conversations_like": "fallback for SQLite builds without FTS5",
+}
+
+# Plain "SCAN messages" / "SCAN m" walks the whole table; "SCAN x USING INDEX" is an ordered index walk
+_TABLE_SCAN = re.compile(r"^SCAN (\w+)$")
+_ALIAS = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+
+
+def exercise(db):
+    """Call every public query method once; returns {method: [sql, ...]}"""
+    statements = defaultdict(list)
+    current = ["setup"]
+
+    with db.pool.connection() as conn:
+        conn.set_trace_callback(lambda sql: statements[current[0]].append(sql))
+
+    def call(name, *args, **kwargs):
+        current[0] = name
+        result = getattr(db, name)(*args, **kwargs)
+        # Drain generators so their queries run
+        if hasattr(result, "__next__"):
+            result = list(result)
+        current[0] = "setup"
+        return result
+
+    conversation_ids = [call("create_conversation", f"Laptop shopping {i}", "Looking for a laptop", ["laptop"])
+                        for i in range(3)]
+    first = conversation_ids[0]
+    message_id = call("add_message", first, "user", "I need a laptop under $1000")
+    call("add_messages", [{"conversation_id": first, "role": "assistant", "content": "Here are some laptops"}])
+    call("add_conversation_context", first, "product_interest", {"product_interest": "laptop", "budget": 1000})
+    call("update_conversation_summary", first, "Laptop under $1000")
+    call("update_conversation_title", first, "Laptop search")
+
+    call("get_next_sequence_number")
+    call("get_conversation", first)
+    call("iter_messages", first, batch_size=1)
+    page = call("get_message_page", first, limit=1)
+    call("get_message_page", first, limit=1, before=page["previous_cursor"])
+    call("get_all_conversations", 10)
+    call("search_conversations", "laptop")
+    result = call("search_conversations_page", "laptop", page_size=1)
+    call("search_conversations_page", "laptop", page_size=1, cursor=result["next_cursor"])
+    current[0] = "search_conversations_like"
+    db._search_conversations_like("laptop")
+    call("get_conversation_context", first)
+    call("get_conversation_context", first, "product_interest")
+    call("get_relevant_context", "laptop")
+    call("find_conversations_by_context", product_interest="laptop", max_budget=1000)
+    call("find_conversations_by_context", order_related=False, min_budget=100)
+    call("find_conversations_by_context", order_related=False)
+    call("get_recent_context", 10)
+    call("get_messages_after", message_id - 1)
+    call("get_messages_after", message_id - 1, role="user")
+    call("get_conversation_ids_older_than", 0)
+    call("get_existing_conversation_ids", conversation_ids)
+    call("delete_conversations_if_unchanged", {first: ("1970-01-01 00:00:00", 0)})
+    call("get_conversation_statistics")
+    call("get_hourly_statistics", 24)
+    snapshot = call("get_conversation", conversation_ids[1])
+    call("delete_conversation", conversation_ids[1])
+    call("restore_conversation", snapshot)
+    call("delete_conversations", conversation_ids[1:])
+
+    with db.pool.connection() as conn:
+        conn.set_trace_callback(None)
+    statements.pop("setup", None)
+    return statements
+
+
+def table_scans(conn, sql):
+    """Tables (not indexes) that a statement reads front to back"""
+    if not re.match(r"\s*(WITH|SELECT|INSERT|UPDATE|DELETE)\b", sql, re.IGNORECASE):
+        return []
+    aliases = {}
+    for table, alias in _ALIAS.findall(sql):
+        aliases[table] = table
+        if alias and alias.upper() not in {"WHERE", "ON", "SET", "VALUES", "ORDER", "GROUP", "LIMIT", "SELECT"}:
+            aliases[alias] = table
+    scans = []
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+        match = _TABLE_SCAN.match(row[3])
+        if match and aliases.get(match.group(1), match.group(1)) in TABLES:
+            scans.append(row[3])
+    return scans
+
+
+def check_query_plans(db_path=":memory:"):
+    """Return a list of (method, plan detail, sql) for hot queries that scan a table"""
+    db = ConversationDatabase(db_path)
+    try:
+        statements = exercise(db)
+        regressions = []
+        with db.pool.connection() as conn:
+            for method, sqls in sorted(statements.items()):
+                if method in ALLOWED_SCANS:
+                    continue
+                for sql in sqls:
+                    for detail in table_scans(conn, sql):
+                        regressions.append((method, detail, " ".join(sql.split())))
+        return regressions
+    finally:
+        db.close()
+
+
+def test_hot_queries_use_indexes():
+    """No hot ConversationDatabase query should plan a full table scan"""
+    regressions = check_query_plans()
+    assert not regressions, "\n".join(f"{method}: {detail}\n    {sql}" for method, detail, sql in regressions)
+
+
+def test_migrations_are_recorded():
+    """A fresh database ends at the latest schema version"""
+    db = ConversationDatabase(":memory:")
+    try:
+        assert db.schema_version == ConversationDatabase.MIGRATIONS[-1][0]
+    finally:
+        db.close()
+
+
+def main():
+    """Main test function"""
+
+    print("🔍 ConversationDatabase Query Plan Check")
+    print("=" * 50)
+
+    regressions = check_query_plans()
+    if regressions:
+        for method, detail, sql in regressions:
+            print(f"❌ {method}: {detail}")
+            print(f"   {sql}")
+        sys.exit(1)
+
+    print("✅ Every hot query is served by an index")
+    for method, reason in ALLOWED_SCANS.items():
+        print(f"   (allowed scan) {method}: {reason}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for ShardedConversationDatabase
+Checks ID layout and routing, cross-shard batches and scatter-gathered reads
+on scratch in-memory shards
+"""
+
+import sys
+
+from sharded_conversation_database import ShardedConversationDatabase, shard_path
+
+
+def scratch_database(shard_count=3):
+    return ShardedConversationDatabase(":memory:", shard_count=shard_count)
+
+
+def test_ids_route_to_the_shard_that_issued_them():
+    db = scratch_database()
+    try:
+        conversation_ids = [db.create_conversation(f"Session {i}") for i in range(6)]
+        # Round-robin creation: shard i issues i + 1, i + 1 + N, ...
+        assert conversation_ids == [1, 2, 3, 4, 5, 6]
+        for conversation_id in conversation_ids:
+            shard = db.shard_for(conversation_id)
+            assert shard is db.shards[(conversation_id - 1) % 3]
+            assert shard.get_conversation(conversation_id)["title"] == f"Session {conversation_id - 1}"
+            message_id = db.add_message(conversation_id, "user", "hello")
+            # Message IDs follow the same layout as their conversation's shard
+            assert db.shard_for(message_id) is shard
+        assert [len(shard.get_all_conversations(100)) for shard in db.shards] == [2, 2, 2]
+    finally:
+        db.close()
+
+
+def test_deleted_ids_are_not_reused():
+    db = scratch_database(shard_count=2)
+    try:
+        conversation_ids = [db.create_conversation(f"Session {i}") for i in range(3)]
+        db.delete_conversation(conversation_ids[2])
+        # Conversation 3 lived on shard 0; its next conversation skips to 5
+        assert db.create_conversation("Session 3") == 4
+        assert db.create_conversation("Session 4") == 5
+        assert db.get_conversation(3) is None
+    finally:
+        db.close()
+
+
+def test_add_messages_spans_shards_in_input_order():
+    db = scratch_database()
+    try:
+        conversation_ids = [db.create_conversation(f"Session {i}") for i in range(3)]
+        batch = [{"conversation_id": conversation_id, "role": "user", "content": f"message {i}"}
+                 for i, conversation_id in enumerate(conversation_ids * 2)]
+        message_ids = db.add_messages(batch)
+        assert len(set(message_ids)) == 6
+        for message_id, message in zip(message_ids, batch):
+            stored = db.get_conversation(message["conversation_id"])["messages"]
+            assert (message_id, message["content"]) in [(m["message_id"], m["content"]) for m in stored]
+        assert [m["message_id"] for m in db.get_messages_after(0)] == sorted(message_ids)
+    finally:
+        db.close()
+
+
+def test_cross_shard_reads_merge_every_shard():
+    db = scratch_database()
+    try:
+        conversation_ids = [db.create_conversation(f"Laptop session {i}") for i in range(5)]
+        for conversation_id in conversation_ids:
+            db.add_message(conversation_id, "user", "Looking for a laptop")
+        db.add_conversation_context(conversation_ids[4], "product_interest", {"product_interest": "laptop"})
+
+        assert sorted(c["conversation_id"] for c in db.get_all_conversations(10)) == conversation_ids
+        assert len(db.get_all_conversations(2)) == 2
+
+        seen = []
+        page = db.search_conversations_page("laptop", page_size=2)
+        while True:
+            seen.extend(c["conversation_id"] for c in page["conversations"])
+            if not page["next_cursor"]:
+                break
+            page = db.search_conversations_page("laptop", page_size=2, cursor=page["next_cursor"])
+        assert sorted(seen) == conversation_ids
+
+        assert [c["conversation_id"] for c in db.find_conversations_by_context(product_interest="laptop")] == [5]
+        statistics = db.get_conversation_statistics()
+        assert (statistics["total_conversations"], statistics["total_messages"]) == (5, 5)
+        assert db.get_next_sequence_number() == 6
+    finally:
+        db.close()
+
+
+def test_shard_paths_sit_next_to_the_base_file():
+    assert shard_path("data/conversations.db", 2) == "data/conversations_shard2.db"
+    assert shard_path("conversations", 0) == "conversations_shard0.db"
+    assert shard_path(":memory:", 1) == ":memory:"
+
+
+def main():
+    """Main test function"""
+
+    print("🧩 Sharded Conversation Database Tests")
+    print("=" * 50)
+
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -54,6 +54,21 @@ def test_tts_switching():
     
     print("\n" + "="*40)
     
+    # Test streaming ElevenLabs playback
+    print("🎤 Testing streaming ElevenLabs TTS...")
+    try:
+        assistant.set_tts_provider("elevenlabs")
+        assistant.stream_tts = True
+        time_to_first_audio = assistant.speak(test_text)
+        if time_to_first_audio is not None:
+            print(f"✅ Streaming playback started after {time_to_first_audio * 1000:.0f} ms")
+        else:
+            print("❌ Streaming playback failed")
+    except Exception as e:
+        print(f"❌ Streaming error: {e}")
+    
+    print("\n" + "="*40)
+    
     # Test switching functionality
     print("🔄 Testing TTS switching...")
     
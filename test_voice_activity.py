@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the energy VAD in voice_activity
+Uses synthetic tone-plus-silence clips, so no recordings or network are needed
+"""
+
+import sys
+
+import numpy as np
+
+from audio_utils import pcm_to_wav, read_wav
+from voice_activity import detect_speech, trim_silence
+
+RATE = 16000
+
+
+def clip(*parts):
+    """16-bit PCM from (kind, seconds) parts: 'tone' is a -10 dBFS 220 Hz sine, 'silence' is faint noise"""
+    rng = np.random.default_rng(0)
+    pieces = []
+    for kind, seconds in parts:
+        count = int(seconds * RATE)
+        if kind == "tone":
+            pieces.append(0.3 * 32767 * np.sin(2 * np.pi * 220 * np.arange(count) / RATE))
+        else:
+            pieces.append(rng.normal(0, 30, count))
+    return np.concatenate(pieces).astype("<i2").tobytes()
+
+
+def test_tone_between_silences_is_one_padded_segment():
+    activity = detect_speech(clip(("silence", 1.0), ("tone", 1.0), ("silence", 1.0)), RATE, padding_ms=200)
+    assert activity.has_speech
+    assert len(activity.segments) == 1
+    start, end = activity.segments[0]
+    # Speech spans 1.0-2.0 s; padding widens it by 200 ms, within a frame either way
+    assert abs(start / RATE - 0.8) <= 0.03
+    assert abs(end / RATE - 2.2) <= 0.03
+    assert abs(activity.speech_seconds - 1.0) <= 0.03
+    assert 0.3 < activity.speech_ratio < 0.4
+
+
+def test_pause_longer_than_padding_splits_segments():
+    activity = detect_speech(clip(("silence", 0.5), ("tone", 1.0), ("silence", 1.0), ("tone", 1.0), ("silence", 0.5)),
+                             RATE, padding_ms=200)
+    assert len(activity.segments) == 2
+    assert activity.bounds[0] < activity.segments[0][1] < activity.segments[1][0] < activity.bounds[1]
+
+
+def test_silence_and_short_blips_have_no_speech():
+    assert not detect_speech(clip(("silence", 2.0)), RATE).has_speech
+    # 60 ms of tone is below the 250 ms minimum
+    blip = detect_speech(clip(("silence", 1.0), ("tone", 0.06), ("silence", 1.0)), RATE, min_speech_ms=250)
+    assert not blip.has_speech
+    assert blip.segments == []
+    assert not detect_speech(b"", RATE).has_speech
+
+
+def test_threshold_is_clamped():
+    # All-tone clip: the noise floor is the tone itself, so the threshold stops at the clamp
+    activity = detect_speech(clip(("tone", 2.0)), RATE)
+    assert activity.threshold_db == -35.0
+    assert activity.has_speech
+    # Digital silence: the floor is -200 dB, so the threshold stops at the lower clamp
+    assert detect_speech(np.zeros(RATE, dtype="<i2").tobytes(), RATE).threshold_db == -55.0
+
+
+def test_trim_silence_keeps_only_the_padded_speech():
+    wav = pcm_to_wav(clip(("silence", 1.0), ("tone", 1.0), ("silence", 1.0)), RATE)
+    trimmed, activity = trim_silence(wav, padding_ms=200)
+    audio = read_wav(trimmed)
+    assert audio.sample_rate == RATE
+    assert abs(len(audio.pcm) / 2 / RATE - 1.4) <= 0.06
+
+    empty, activity = trim_silence(pcm_to_wav(clip(("silence", 1.0)), RATE))
+    assert empty == b""
+    assert not activity.has_speech
+
+
+def main():
+    """Main test function"""
+
+    print("🗣️ Voice Activity Detection Tests")
+    print("=" * 50)
+
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
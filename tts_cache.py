@@ -0,0 +1,153 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Cache location and size caps
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MAX_MB = float(os.environ.get("TTS_CACHE_MAX_MB", 200))
+TTS_CACHE_MEMORY_MB = float(os.environ.get("TTS_CACHE_MEMORY_MB", 32))
+
+
+def tts_cache_key(provider: str, voice: str, model: str, text: str) -> str:
+    """Content address of an utterance: the same inputs always synthesize the same audio"""
+    payload = json.dumps([provider, voice, model, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Two-tier cache of synthesized speech keyed by ``tts_cache_key``.
+
+    A small in-memory LRU sits in front of a size-capped on-disk LRU. Files
+    are written atomically and their mtime is bumped on every hit, so the
+    on-disk recency order survives restarts and eviction removes the least
+    recently played clips first.
+    """
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = int(TTS_CACHE_MAX_MB * 1024 * 1024),
+                 memory_bytes: int = int(TTS_CACHE_MEMORY_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self._memory: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._memory_size = 0
+        # key -> (path, size), least recently used first
+        self._disk: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Rebuild the disk index from the cache directory, oldest first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            key, _, audio_format = name.partition(".")
+            if len(key) != 64 or not audio_format or audio_format.endswith(".tmp"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, key, path, stat.st_size))
+        for _, key, path, size in sorted(entries):
+            self._disk[key] = (path, size)
+            self._disk_size += size
+        logging.info(f"✅ TTS cache ready: {len(self._disk)} clips, {self._disk_size / 1024 / 1024:.1f} MB on disk")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Return (audio, audio_format) or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+            disk_entry = self._disk.get(key)
+
+        if disk_entry is not None:
+            path, _ = disk_entry
+            try:
+                with open(path, "rb") as f:
+                    audio = f.read()
+                os.utime(path)
+            except FileNotFoundError:
+                # Evicted by another process sharing the directory
+                with self._lock:
+                    self._forget_disk(key)
+            else:
+                entry = (audio, os.path.splitext(path)[1][1:])
+                with self._lock:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._remember(key, entry)
+                    self.hits += 1
+                return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, audio: bytes, audio_format: str):
+        """Store a clip in both tiers, evicting least recently used clips past the caps"""
+        audio = bytes(audio)
+        path = os.path.join(self.directory, f"{key}.{audio_format}")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.error(f"❌ Error writing TTS cache entry: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self._lock:
+            self._remember(key, (audio, audio_format))
+            if os.path.exists(path):
+                self._forget_disk(key)
+                self._disk[key] = (path, len(audio))
+                self._disk_size += len(audio)
+            evicted = []
+            while self._disk_size > self.max_bytes and len(self._disk) > 1:
+                old_key, (old_path, _) = next(iter(self._disk.items()))
+                self._forget_disk(old_key)
+                evicted.append(old_path)
+
+        for old_path in evicted:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+
+    def _remember(self, key: str, entry: Tuple[bytes, str]):
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key)[0])
+        if len(entry[0]) > self.memory_bytes:
+            return
+        self._memory[key] = entry
+        self._memory_size += len(entry[0])
+        while self._memory_size > self.memory_bytes:
+            _, (audio, _) = self._memory.popitem(last=False)
+            self._memory_size -= len(audio)
+
+    def _forget_disk(self, key: str):
+        entry = self._disk.pop(key, None)
+        if entry is not None:
+            self._disk_size -= entry[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'memory_clips': len(self._memory),
+                'disk_clips': len(self._disk),
+                'disk_mb': round(self._disk_size / 1024 / 1024, 2)
+            }
@@ -0,0 +1,102 @@
+import os
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from audio_utils import BytesLike, pcm_samples, pcm_to_wav, read_wav
+
+# Detector tuning; frame and padding lengths are in milliseconds
+VAD_FRAME_MS = int(os.environ.get("VAD_FRAME_MS", 30))
+VAD_MARGIN_DB = float(os.environ.get("VAD_MARGIN_DB", 12))
+VAD_MIN_SPEECH_MS = int(os.environ.get("VAD_MIN_SPEECH_MS", 250))
+VAD_PADDING_MS = int(os.environ.get("VAD_PADDING_MS", 200))
+
+# The adaptive threshold is clamped so a silent room cannot make hiss count as
+# speech, and a clip that is speech end to end cannot push the threshold up past quiet syllables
+_THRESHOLD_RANGE_DB = (-55.0, -35.0)
+
+
+class SpeechActivity(NamedTuple):
+    """Where the speech is in a clip; sample offsets are per channel"""
+    sample_rate: int
+    total_seconds: float
+    speech_seconds: float
+    threshold_db: float
+    # Padded speech regions as (start_sample, end_sample), in order
+    segments: List[Tuple[int, int]]
+
+    @property
+    def has_speech(self) -> bool:
+        return bool(self.segments)
+
+    @property
+    def speech_ratio(self) -> float:
+        return self.speech_seconds / self.total_seconds if self.total_seconds else 0.0
+
+    @property
+    def bounds(self) -> Tuple[int, int]:
+        """First to last speech sample, padding included"""
+        return (self.segments[0][0], self.segments[-1][1]) if self.segments else (0, 0)
+
+
+def frame_levels(samples: np.ndarray, frame_samples: int) -> np.ndarray:
+    """RMS level in dBFS of each whole frame"""
+    frames = len(samples) // frame_samples
+    if frames == 0:
+        return np.empty(0, dtype=np.float32)
+    framed = samples[:frames * frame_samples].reshape(frames, frame_samples)
+    rms = np.sqrt(np.mean(np.square(framed, dtype=np.float32), axis=1))
+    return 20 * np.log10(rms / 32768.0 + 1e-10)
+
+
+def detect_speech(pcm: BytesLike, sample_rate: int, channels: int = 1, sample_width: int = 2,
+                  frame_ms: int = VAD_FRAME_MS, margin_db: float = VAD_MARGIN_DB,
+                  min_speech_ms: int = VAD_MIN_SPEECH_MS, padding_ms: int = VAD_PADDING_MS) -> SpeechActivity:
+    """Energy-based voice activity detection over 16-bit PCM.
+
+    A frame is speech when it is ``margin_db`` above the clip's noise floor
+    (its 10th-percentile frame level). Speech frames are widened by
+    ``padding_ms`` on each side so word onsets and short pauses survive, and
+    a clip with less than ``min_speech_ms`` of speech has no segments.
+    """
+    samples = pcm_samples(pcm, channels, sample_width)
+    frame_samples = max(1, sample_rate * frame_ms // 1000)
+    levels = frame_levels(samples, frame_samples)
+    total_seconds = len(samples) / sample_rate
+    if len(levels) == 0:
+        return SpeechActivity(sample_rate, total_seconds, 0.0, _THRESHOLD_RANGE_DB[1], [])
+
+    noise_floor = float(np.percentile(levels, 10))
+    threshold_db = float(np.clip(noise_floor + margin_db, *_THRESHOLD_RANGE_DB))
+    speech = levels > threshold_db
+    speech_seconds = int(speech.sum()) * frame_samples / sample_rate
+    if speech_seconds * 1000 < min_speech_ms:
+        return SpeechActivity(sample_rate, total_seconds, speech_seconds, threshold_db, [])
+
+    pad_frames = padding_ms // frame_ms
+    if pad_frames:
+        speech = np.convolve(speech, np.ones(2 * pad_frames + 1, dtype=bool), mode="same") > 0
+
+    # Rising and falling edges of the padded mask give the segment boundaries
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.view(np.int8), [0]))))
+    segments = [
+        (int(start) * frame_samples, min(int(end) * frame_samples, len(samples)))
+        for start, end in zip(edges[::2], edges[1::2])
+    ]
+    return SpeechActivity(sample_rate, total_seconds, speech_seconds, threshold_db, segments)
+
+
+def trim_silence(wav: BytesLike, **vad_options) -> Tuple[bytes, SpeechActivity]:
+    """Cut leading and trailing silence from a PCM WAV.
+
+    Returns the trimmed WAV (empty bytes when the clip has no speech) and the
+    detected activity.
+    """
+    audio = read_wav(wav)
+    activity = detect_speech(audio.pcm, audio.sample_rate, audio.channels, audio.sample_width, **vad_options)
+    if not activity.has_speech:
+        return b"", activity
+    start, end = activity.bounds
+    frame_bytes = audio.channels * audio.sample_width
+    trimmed = audio.pcm[start * frame_bytes:end * frame_bytes]
+    return pcm_to_wav(trimmed, audio.sample_rate, audio.channels, audio.sample_width), activity
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict
+
+
+class LatencyTracker:
+    """Rolling latency samples for named voice pipeline stages.
+
+    Keeps the last ``window`` samples per stage, which is enough for stable
+    p50/p95 figures without growing over a long session. Running totals
+    (bytes saved, calls skipped) are kept alongside as plain counters.
+    """
+
+    def __init__(self, window: int = 200):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._counters = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self._samples[name].append(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time a block and record it under ``name``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def last(self, name: str):
+        with self._lock:
+            samples = self._samples.get(name)
+            return samples[-1] if samples else None
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, last, mean, p50 and p95 (milliseconds) per stage"""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items() if samples}
+            lasts = {name: self._samples[name][-1] for name in snapshot}
+
+        def percentile(ordered, fraction):
+            return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+        return {
+            name: {
+                'count': len(ordered),
+                'last_ms': round(lasts[name] * 1000, 1),
+                'mean_ms': round(sum(ordered) / len(ordered) * 1000, 1),
+                'p50_ms': round(percentile(ordered, 0.5) * 1000, 1),
+                'p95_ms': round(percentile(ordered, 0.95) * 1000, 1),
+            }
+            for name, ordered in snapshot.items()
+        }